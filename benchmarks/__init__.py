@@ -0,0 +1,3 @@
+from . import payload
+from . import director
+from . import runner
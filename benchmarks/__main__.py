@@ -0,0 +1,53 @@
+import argparse
+import json
+import sys
+
+from . import runner
+
+
+def main(argv: list[str]=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks the rApi and uApi clients against a local synthetic smartdirector."
+    )
+    parser.add_argument("--fixtures", type=int, default=10000, help="number of fixtures of the /rApi document")
+    parser.add_argument("--repeat", type=int, default=20, help="number of measured calls per case")
+    parser.add_argument("--warmup", type=int, default=2, help="number of unmeasured calls per case")
+    parser.add_argument("--messages", type=int, default=100, help="number of messages per subscription stream")
+    parser.add_argument("--chunk-bytes", type=int, default=1024, help="chunk size of the subscription streams")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="only run cases whose name contains NAME")
+    parser.add_argument("--save", metavar="PATH", help="store the results as a JSON baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results with a stored baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.10, help="relative p50 change that counts as regression (default 0.10)"
+    )
+    arguments = parser.parse_args(argv)
+
+    results = runner.run(
+        fixtures=arguments.fixtures,
+        repeat=arguments.repeat,
+        warmup=arguments.warmup,
+        messages=arguments.messages,
+        chunk_bytes=arguments.chunk_bytes,
+        only=arguments.only,
+        progress=lambda name: print(f"running {name}", file=sys.stderr)
+    )
+    print(runner.format_results(results))
+
+    if arguments.save:
+        with open(arguments.save, "w") as file:
+            json.dump(results, file, indent=4)
+
+    if arguments.baseline:
+        with open(arguments.baseline, "r") as file:
+            baseline = json.load(file)
+        rows = runner.compare(results, baseline, tolerance=arguments.tolerance)
+        print()
+        print(runner.format_comparison(rows))
+        if any(row["status"] == "regression" for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
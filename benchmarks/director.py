@@ -0,0 +1,288 @@
+import json
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import payload
+
+
+class SyntheticDirector:
+    """
+    A local HTTPS stand-in for the /rApi and /uApi endpoints of a smartdirector.
+
+    The director serves a given /rApi document and answers uApi "set" requests like a real smartdirector. Subscribe
+    requests get a chunked stream of 'messages' subscription messages for the requested entities. Each message is
+    followed by the uApi message delimiter, and the stream is written in chunks of 'chunk_bytes' bytes, so message
+    boundaries fall at arbitrary positions within the chunks. The self-signed certificate is created with the
+    openssl command line tool on start.
+
+    Attributes:
+        document (dict): The /rApi document that is served.
+        messages (int): Number of messages sent per subscription stream.
+        chunk_bytes (int): Size of the chunks the subscription streams are written in.
+        ip (str): The "host:port" address to use as 'ipv4_adress' of the API objects, set on start.
+        requests (dict): Number of requests received per endpoint and request type.
+
+    Methods:
+        start: Creates the certificate and starts serving on a background thread.
+        stop: Stops the server and removes the certificate.
+
+    Example:
+        with SyntheticDirector(payload.generate_document(fixtures=10000)) as director:
+            api = restful.rApi("bench", "bench", director.ip)
+    """
+    DELIMITER = b"\r\n\r\n\r\n"
+
+    def __init__(self, document: dict, messages: int=100, chunk_bytes: int=1024, host: str="127.0.0.1", port: int=0):
+        self.document = document
+        self.messages = messages
+        self.chunk_bytes = chunk_bytes
+        self.host = host
+        self.port = port
+        self.ip = None
+        self.requests = {}
+        self._body = json.dumps(document).encode()
+        self._server = None
+        self._directory = None
+        self._lock = threading.Lock()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(fixtures={len(self.document.get('fixture', []))}, ip={self.ip})"
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+    def start(self) -> None:
+        """
+        Creates a self-signed certificate and starts serving on a background thread.
+
+        Raises:
+        - RuntimeError: If the openssl command line tool is not available.
+        """
+        if shutil.which("openssl") is None:
+            raise RuntimeError("Error: the synthetic director needs the openssl command line tool")
+        self._directory = tempfile.mkdtemp(prefix="smartengine-bench-")
+        certificate = os.path.join(self._directory, "cert.pem")
+        key = os.path.join(self._directory, "key.pem")
+        subprocess.run(
+            [
+                "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                "-subj", "/CN=localhost", "-keyout", key, "-out", certificate
+            ],
+            check=True,
+            capture_output=True
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certificate, key)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler(self))
+        self._server.daemon_threads = True
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self.ip = f"{self.host}:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, name="synthetic-director", daemon=True).start()
+
+
+    def stop(self) -> None:
+        """
+        Stops the server and removes the certificate.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+
+
+
+def _handler(director: SyntheticDirector) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/rApi":
+                self._send_json(404, {"error": "not found"})
+                return
+            director._count("rApi")
+            self._send(200, director._body)
+
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/uApi":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                request_type = request["requestType"]
+                request_data = request["requestData"]
+            except (ValueError, KeyError, TypeError):
+                self._send_json(400, {"error": "malformed request"})
+                return
+            director._count(f"uApi.{request_type}")
+
+            if request_type == "subscribe":
+                self._stream(request_data)
+            else:
+                self._send_json(200, {
+                    "protocolVersion": "1",
+                    "responseType": request_type,
+                    "responseData": request_data,
+                })
+
+
+        def _stream(self, request_data: dict) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            rng = random.Random(0)
+            pending = bytearray()
+            try:
+                for tick in range(director.messages):
+                    pending += json.dumps(payload.subscription_message(request_data, tick, rng)).encode()
+                    pending += director.DELIMITER
+                    while len(pending) >= director.chunk_bytes:
+                        self._write_chunk(pending[:director.chunk_bytes])
+                        del pending[:director.chunk_bytes]
+                if pending:
+                    self._write_chunk(pending)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError, ssl.SSLError):
+                self.close_connection = True
+
+
+        def _write_chunk(self, chunk: bytes) -> None:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+
+
+        def _send_json(self, status: int, body: dict) -> None:
+            self._send(status, json.dumps(body).encode())
+
+
+        def _send(self, status: int, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+
+
+class DirectorProcess:
+    """
+    Runs a SyntheticDirector with a generated /rApi document in a separate process.
+
+    Serving from another process keeps the director's work out of the measured process, so it neither competes for
+    the GIL nor shows up in the tracemalloc peaks of the benchmarks.
+
+    Attributes:
+        ip (str): The "host:port" address of the director, set on start.
+
+    Example:
+        with DirectorProcess(fixtures=10000) as director:
+            api = restful.rApi("bench", "bench", director.ip)
+    """
+    def __init__(self, fixtures: int=1000, messages: int=100, chunk_bytes: int=1024, seed: int=0):
+        self.fixtures = fixtures
+        self.messages = messages
+        self.chunk_bytes = chunk_bytes
+        self.seed = seed
+        self.ip = None
+        self._process = None
+        self._stop = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+    def start(self, timeout: float=120.0) -> None:
+        """
+        Starts the director process and waits until it serves requests.
+
+        Raises:
+        - RuntimeError: If the director could not be started within 'timeout' seconds.
+        """
+        context = multiprocessing.get_context("spawn")
+        ready = context.Queue()
+        self._stop = context.Event()
+        self._process = context.Process(
+            target=_serve,
+            args=(self.fixtures, self.messages, self.chunk_bytes, self.seed, ready, self._stop),
+            name="synthetic-director",
+            daemon=True
+        )
+        self._process.start()
+        try:
+            self.ip = ready.get(timeout=timeout)
+        except queue.Empty:
+            self.stop()
+            raise RuntimeError(f"Error: the synthetic director did not start within {timeout} seconds") from None
+        if isinstance(self.ip, Exception):
+            error, self.ip = self.ip, None
+            self.stop()
+            raise RuntimeError(f"Error: the synthetic director failed to start - {error}")
+
+
+    def stop(self) -> None:
+        """
+        Stops the director process.
+        """
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join(10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+
+
+
+
+def _serve(fixtures: int, messages: int, chunk_bytes: int, seed: int, ready, stop) -> None:
+    try:
+        director = SyntheticDirector(
+            payload.generate_document(fixtures=fixtures, seed=seed), messages=messages, chunk_bytes=chunk_bytes
+        )
+        director.start()
+    except Exception as error:
+        ready.put(error)
+        return
+    ready.put(director.ip)
+    stop.wait()
+    director.stop()
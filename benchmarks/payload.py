@@ -0,0 +1,133 @@
+import random
+
+
+FIXTURE_TYPES = {
+    "LUMINAIRE": ("power", "brightness", "temperature", "illuminance", "motion"),
+    "SENSOR": ("power", "temperature", "humidity", "pressure", "co2", "voc", "indoorAirQuality", "motion"),
+    "WALL_SWITCH_5B": ("power",),
+}
+
+LOCATION_STATS = ("power", "ceillingTemperature", "roomTemperature", "illuminance", "brightness", "motion")
+
+SCENES = ("Off", "Evening", "Morning", "Presentation", "Cleaning")
+
+
+def generate_document(
+    fixtures: int=1000,
+    fixtures_per_room: int=20,
+    rooms_per_floor: int=10,
+    seed: int=0
+) -> dict:
+    """
+    Generates a synthetic /rApi document of a building with the given number of fixtures.
+
+    The building is a single root location with one floor location per 'rooms_per_floor' rooms and one room per
+    'fixtures_per_room' fixtures. Fixtures are luminaires, sensors and wall switches in a 6:3:1 ratio, and report the
+    sensor stats a real smartdirector reports for their type. Every location has the usual scenes and room stats.
+
+    Parameters:
+    - fixtures (int, optional): Number of fixtures. Defaults to 1000.
+    - fixtures_per_room (int, optional): Number of fixtures per room. Defaults to 20.
+    - rooms_per_floor (int, optional): Number of rooms per floor. Defaults to 10.
+    - seed (int, optional): Seed of the random values, so runs with the same arguments get the same document.
+
+    Returns:
+    - dict: The /rApi document.
+    """
+    rng = random.Random(seed)
+    types = ["LUMINAIRE"] * 6 + ["SENSOR"] * 3 + ["WALL_SWITCH_5B"]
+
+    fixture_elements = []
+    for number in range(fixtures):
+        type_ = types[number % len(types)]
+        element = {
+            "serialNum": f"000000000SVS1Z{number:013d}",
+            "type": type_,
+            "beaconSupported": type_ != "WALL_SWITCH_5B",
+            "sensorStats": {stat: {"instant": sensor_value(rng, stat)} for stat in FIXTURE_TYPES[type_]},
+        }
+        if number % 50:
+            element["name"] = f"{type_.title()} {number}"
+        fixture_elements.append(element)
+
+    rooms = max(1, -(-fixtures // fixtures_per_room))
+    floors = max(1, -(-rooms // rooms_per_floor))
+    building = {"id": 1, "name": "Building", "childLocation": [], "childFixture": []}
+    location_elements = [building]
+    floor_elements = []
+    for floor in range(floors):
+        element = {"id": 100 + floor, "name": f"Floor {floor}", "childLocation": [], "childFixture": []}
+        building["childLocation"].append(f"/location/{element['id']}")
+        floor_elements.append(element)
+        location_elements.append(element)
+
+    first_room = 100 + floors
+    for room in range(rooms):
+        element = {
+            "id": first_room + room,
+            "name": f"Room {room}",
+            "childLocation": [],
+            "childFixture": [
+                f"/fixture/{fixture['serialNum']}"
+                for fixture in fixture_elements[room * fixtures_per_room:(room + 1) * fixtures_per_room]
+            ],
+        }
+        floor_elements[room // rooms_per_floor]["childLocation"].append(f"/location/{element['id']}")
+        location_elements.append(element)
+
+    for element in location_elements:
+        element["sceneControl"] = {
+            "activeSceneName": SCENES[0],
+            "scene": [{"name": name, "order": order} for order, name in enumerate(SCENES, start=1)],
+        }
+        element["sensorStats"] = {stat: {"instant": sensor_value(rng, stat)} for stat in LOCATION_STATS}
+
+    return {"name": "Synthetic Director", "fixture": fixture_elements, "location": location_elements}
+
+
+def sensor_value(rng: random.Random, stat: str) -> float:
+    """
+    Returns a plausible random value of a sensor stat.
+    """
+    if stat == "motion":
+        return 1700000000 + rng.randrange(10 ** 6)
+    if stat == "pressure":
+        return round(rng.uniform(98000, 103000), 1)
+    if stat == "co2":
+        return round(rng.uniform(400, 1500), 2)
+    if stat in ("illuminance", "indoorAirQuality"):
+        return round(rng.uniform(0, 800), 1)
+    if stat in ("humidity", "brightness"):
+        return round(rng.uniform(0, 100), 1)
+    if stat.endswith("emperature"):
+        return round(rng.uniform(18, 28), 2)
+    return round(rng.uniform(0, 40), 2)
+
+
+def subscription_message(request_data: dict, tick: int, rng: random.Random) -> dict:
+    """
+    Builds one message of a uApi subscription stream for the entities of a subscribe request.
+
+    Every subscribed entity reports a new value for each requested sensor stat, or for "power" if no stat was
+    requested.
+
+    Parameters:
+    - request_data (dict): The "requestData" section of the subscribe request.
+    - tick (int): The number of the message within the stream.
+    - rng (random.Random): The source of the random values.
+
+    Returns:
+    - dict: The subscription message.
+    """
+    response_data = {}
+    for entity, id_key in (("location", "id"), ("fixture", "serialNum")):
+        elements = []
+        for requested in request_data.get(entity) or []:
+            stats = requested.get("sensorStats") or {"power": {}}
+            elements.append({
+                id_key: requested[id_key],
+                "sensorStats": {stat: {"instant": sensor_value(rng, stat)} for stat in stats},
+            })
+        if elements:
+            response_data[entity] = elements
+    return {"protocolVersion": "1", "responseType": "subscribe", "sequence": tick, "responseData": response_data}
@@ -0,0 +1,244 @@
+import gc
+import json
+import math
+import platform
+import random
+import time
+import tracemalloc
+
+import urllib3
+from smartengine.r_api import cache, restful
+from smartengine.u_api import framing, unified
+
+from . import director, payload
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """
+    Returns the nearest-rank percentile of a list of samples.
+    """
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(function, repeat: int=20, warmup: int=2, units: int=1, unit: str="calls") -> dict:
+    """
+    Measures the latency, throughput and peak memory of a function.
+
+    The function is called 'warmup' times without being measured, then 'repeat' times with a timer around every call.
+    The peak memory is measured in one additional call under tracemalloc, so its overhead does not distort the
+    timings.
+
+    Parameters:
+    - function (callable): The function to measure, called without arguments.
+    - repeat (int, optional): Number of measured calls. Defaults to 20.
+    - warmup (int, optional): Number of unmeasured calls before the measured ones. Defaults to 2.
+    - units (int, optional): Number of items one call processes, e.g. the messages of a stream. Defaults to 1.
+    - unit (str, optional): The name of the items. Defaults to "calls".
+
+    Returns:
+    - dict: The keys "repeat", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "throughput" (units per second),
+    "unit" and "peak_kib".
+    """
+    for _ in range(warmup):
+        function()
+
+    gc.collect()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    total = sum(samples)
+    return {
+        "repeat": repeat,
+        "mean_ms": total / repeat * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000,
+        "throughput": units * repeat / total if total > 0 else math.inf,
+        "unit": unit,
+        "peak_kib": peak / 1024,
+    }
+
+
+def cases(rapi: restful.rApi, uapi: unified.uApi, messages: int) -> dict:
+    """
+    Returns the benchmark cases for the public methods of an rApi and a uApi object.
+
+    Parameters:
+    - rapi (restful.rApi): The rApi object, connected to a synthetic director.
+    - uapi (unified.uApi): The uApi object, connected to the same director.
+    - messages (int): Number of messages the director sends per subscription stream.
+
+    Returns:
+    - dict: Maps every case name to a tuple of (function, units, unit).
+    """
+    document = rapi.json_
+    serials = [element["serialNum"] for element in document["fixture"]]
+    sample = serials[::max(1, len(serials) // 100)][:100]
+    rooms = [element["id"] for element in document["location"] if element.get("childFixture")]
+    room = rooms[len(rooms) // 2]
+    names = [element["name"] for element in document["location"]][:10]
+    operations = [{"location": location, "scene_name": "Evening"} for location in rooms[:100]]
+    message = json.dumps(payload.subscription_message(
+        {"fixture": [{"serialNum": serial, "sensorStats": {"power": {}}} for serial in serials]}, 0, random.Random(0)
+    )).encode() + director.SyntheticDirector.DELIMITER
+    chunks = [message[start:start + 4096] for start in range(0, len(message), 4096)]
+
+    def stream(generator):
+        for _ in generator:
+            pass
+
+    return {
+        "rApi.refresh": (rapi.refresh, 1, "calls"),
+        "rApi.get_all_fixtures": (rapi.get_all_fixtures, 1, "calls"),
+        "rApi.get_beacons": (rapi.get_beacons, 1, "calls"),
+        "rApi.get_sensor_stats[all]": (rapi.get_sensor_stats, 1, "calls"),
+        "rApi.get_sensor_stats[100]": (lambda: rapi.get_sensor_stats(*sample), 1, "calls"),
+        "rApi.sort_fixtures[all]": (rapi.sort_fixtures, 1, "calls"),
+        "rApi.sort_fixtures[top10]": (lambda: rapi.sort_fixtures(order="DESC", limit=10), 1, "calls"),
+        "rApi.fixture_in_location[100]": (lambda: rapi.fixture_in_location(*sample), 1, "calls"),
+        "rApi.get_all_locations": (rapi.get_all_locations, 1, "calls"),
+        "rApi.get_scenes": (rapi.get_scenes, 1, "calls"),
+        "rApi.get_scenes[10]": (lambda: rapi.get_scenes(*names), 1, "calls"),
+        "rApi.get_location_stats": (rapi.get_location_stats, 1, "calls"),
+        "rApi.get_subtree_stats": (rapi.get_subtree_stats, 1, "calls"),
+        "uApi.set_scene": (lambda: uapi.set_scene(room, "Evening"), 1, "calls"),
+        "uApi.set_brightness": (lambda: uapi.set_brightness(room, 50), 1, "calls"),
+        "uApi.set_many[100]": (lambda: uapi.set_many(operations), len(operations), "operations"),
+        "uApi.stream_location_data": (lambda: stream(uapi.stream_location_data(location=room)), messages, "messages"),
+        "uApi.stream_fixture_data": (lambda: stream(uapi.stream_fixture_data(fixture=sample[0])), messages, "messages"),
+        "uApi.stream_many[100]": (lambda: stream(uapi.stream_many(fixtures=sample)), messages, "messages"),
+        "framing.messages[all fixtures]": (
+            lambda: stream(framing.StreamFramer().messages(chunks)), 1, "messages"
+        ),
+    }
+
+
+def run(
+    fixtures: int=10000,
+    repeat: int=20,
+    warmup: int=2,
+    messages: int=100,
+    chunk_bytes: int=1024,
+    only: list[str]=None,
+    progress=None
+) -> dict:
+    """
+    Runs the benchmark cases against a synthetic director with the given number of fixtures.
+
+    Parameters:
+    - fixtures (int, optional): Number of fixtures of the generated /rApi document. Defaults to 10000.
+    - repeat (int, optional): Number of measured calls per case. Defaults to 20.
+    - warmup (int, optional): Number of unmeasured calls per case. Defaults to 2.
+    - messages (int, optional): Number of messages per subscription stream. Defaults to 100.
+    - chunk_bytes (int, optional): Size of the chunks the streams are sent in. Defaults to 1024.
+    - only (list[str], optional): Only run the cases whose name contains one of these strings.
+    - progress (callable, optional): Called with the name of every case before it runs.
+
+    Returns:
+    - dict: The keys "meta" (the run's settings and environment) and "results" (maps every case name to the
+    result of measure).
+    """
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    results = {}
+    with director.DirectorProcess(fixtures=fixtures, messages=messages, chunk_bytes=chunk_bytes) as server:
+        rapi = restful.rApi("bench", "bench", server.ip, snapshot_cache=cache.SnapshotCache(ttl=None))
+        uapi = unified.uApi("bench", "bench", server.ip)
+        for name, (function, units, unit) in cases(rapi, uapi, messages).items():
+            if only and not any(part in name for part in only):
+                continue
+            if progress is not None:
+                progress(name)
+            results[name] = measure(function, repeat=repeat, warmup=warmup, units=units, unit=unit)
+        rapi.session_pool.close()
+        uapi.session_pool.close()
+
+    return {
+        "meta": {
+            "fixtures": fixtures,
+            "repeat": repeat,
+            "messages": messages,
+            "chunk_bytes": chunk_bytes,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float=0.10) -> list[dict]:
+    """
+    Compares the results of a run with a stored baseline.
+
+    A case counts as a regression if its median latency grew by more than 'tolerance' (a fraction of the baseline),
+    and as an improvement if it shrank by more than that. Cases missing from either run are skipped.
+
+    Returns:
+    - list[dict]: One dictionary per case with the keys "name", "p50_ms", "baseline_p50_ms", "ratio", "peak_kib",
+    "baseline_peak_kib" and "status" ("regression", "improvement" or "unchanged").
+    """
+    rows = []
+    for name, result in results["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        ratio = result["p50_ms"] / reference["p50_ms"] if reference["p50_ms"] > 0 else math.inf
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 - tolerance:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        rows.append({
+            "name": name,
+            "p50_ms": result["p50_ms"],
+            "baseline_p50_ms": reference["p50_ms"],
+            "ratio": ratio,
+            "peak_kib": result["peak_kib"],
+            "baseline_peak_kib": reference["peak_kib"],
+            "status": status,
+        })
+    return rows
+
+
+def format_results(results: dict) -> str:
+    """
+    Formats the results of a run as a plain-text table.
+    """
+    lines = [
+        f"{'case':<34} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'throughput':>22} {'peak KiB':>12}"
+    ]
+    for name, result in results["results"].items():
+        throughput = f"{result['throughput']:.1f} {result['unit']}/s"
+        lines.append(
+            f"{name:<34} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+            f"{throughput:>22} {result['peak_kib']:>12.1f}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list[dict]) -> str:
+    """
+    Formats the rows returned by compare as a plain-text table.
+    """
+    lines = [f"{'case':<34} {'p50 ms':>10} {'baseline':>10} {'ratio':>7} {'peak KiB':>12} {'baseline':>12}  status"]
+    for row in rows:
+        lines.append(
+            f"{row['name']:<34} {row['p50_ms']:>10.3f} {row['baseline_p50_ms']:>10.3f} {row['ratio']:>7.2f} "
+            f"{row['peak_kib']:>12.1f} {row['baseline_peak_kib']:>12.1f}  {row['status']}"
+        )
+    return "\n".join(lines)
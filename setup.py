@@ -18,5 +18,9 @@ setup(
     url="https://github.com/timnw2000/smartengine",
     requires=["setuptools"],
     install_requires=install_requires,
+    extras_require={
+        "async": ["aiohttp>=3.8"],
+        "numpy": ["numpy>=1.22"],
+    },
     license="MIT"
 )
\ No newline at end of file
@@ -1,2 +1,5 @@
+from . import instrumentation
+from . import session
 from . import r_api
-from . import u_api
\ No newline at end of file
+from . import u_api
+from . import fleet
\ No newline at end of file
@@ -0,0 +1,238 @@
+import concurrent.futures
+import threading
+import time
+
+from . import session
+from .r_api import cache, restful
+from .u_api import unified
+
+
+class Fleet:
+    """
+    A client for many smartdirectors that queries all of them concurrently.
+
+    Every director of the fleet is called a site. The fleet downloads the /rApi snapshots of all sites at the same
+    time through a bounded pool of worker threads and merges the results of the rApi getters into single lists, with
+    every entry tagged by the site it came from. uApi set calls are fanned out to all or some of the sites the same
+    way. Each call waits at most 'timeout' seconds; sites that fail or do not answer in time are left out of the
+    result and reported in 'errors' instead of failing the whole call.
+
+    Attributes:
+        sites (dict): Maps every site name to its connection settings.
+        max_workers (int): Maximum number of sites queried at the same time.
+        timeout (float): Number of seconds a single call waits for each site.
+        errors (dict): Maps every site that failed during the last call to the exception it raised.
+        NotFoundInApiError (int): Custom error code for sites that are not part of the fleet.
+
+    Methods:
+        refresh: Downloads the /rApi snapshots of all sites concurrently.
+        get_all_fixtures: Returns the fixtures of all sites.
+        get_sensor_stats: Returns the sensor stats of the fixtures of all sites.
+        get_location_stats: Returns the location stats of all sites.
+        set_scene: Sets a scene on all or some sites.
+        set_brightness: Sets the brightness on all or some sites.
+        set_many: Sends batched set operations to all or some sites.
+        close: Stops the worker threads.
+
+    Example:
+        fleet = Fleet([
+            {"site": "Berlin", "user": "admin", "password": "secret", "ipv4_adress": "10.0.1.1"},
+            {"site": "Hamburg", "user": "admin", "password": "secret", "ipv4_adress": "10.0.2.1"},
+        ], timeout=10)
+        for fixture in fleet.get_all_fixtures():
+            print(fixture["site"], fixture["serial_number"])
+        print(fleet.errors)
+    """
+    def __init__(
+        self,
+        directors: list[dict],
+        max_workers: int=8,
+        timeout: float=30.0,
+        cache_ttl: float=None,
+        snapshot_cache: cache.SnapshotCache=None
+    ):
+        self.sites = {}
+        for director in directors:
+            site = director.get("site", director["ipv4_adress"])
+            self.sites[site] = {
+                "user": director["user"],
+                "password": director["password"],
+                "ipv4_adress": director["ipv4_adress"],
+            }
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.snapshot_cache = snapshot_cache
+        self.errors = {}
+        self.NotFoundInApiError = 8080
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="smartengine-fleet"
+        )
+        self._pools = {site: session.SessionPool(timeout=timeout) for site in self.sites}
+        self._rapis = {}
+        self._uapis = {}
+        self._lock = threading.Lock()
+        self.refresh()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(sites={list(self.sites)}, max_workers={self.max_workers}, timeout={self.timeout})"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def refresh(self, sites: list[str]=None) -> list[str]:
+        """
+        Downloads the /rApi snapshots of all or some sites concurrently.
+
+        Parameters:
+        - sites (list[str], optional): The sites to refresh. Defaults to all sites.
+
+        Returns:
+        - list[str]: The sites whose snapshot was downloaded successfully. Failed sites are listed in 'errors'.
+        """
+        def refresh_site(site):
+            with self._lock:
+                api = self._rapis.get(site)
+            if api is None:
+                self._rapi(site)
+            else:
+                api.refresh()
+            return site
+
+        return list(self._fan_out(refresh_site, sites))
+
+
+    def get_all_fixtures(self, sites: list[str]=None) -> list[dict]:
+        """
+        Returns the fixtures of all sites, see FixturesApi.get_all_fixtures. Every entry has an additional "site" key.
+        """
+        return self._merge(self._fan_out(lambda site: self._rapi(site).get_all_fixtures(), sites))
+
+
+    def get_sensor_stats(self, *sensors: str, sensor_type: list[str]=None, sites: list[str]=None) -> list[dict]:
+        """
+        Returns the sensor stats of the fixtures of all sites, see FixturesApi.get_sensor_stats. Every entry has an
+        additional "site" key.
+        """
+        return self._merge(self._fan_out(
+            lambda site: self._rapi(site).get_sensor_stats(*sensors, sensor_type=sensor_type), sites
+        ))
+
+
+    def get_location_stats(self, *locations: str, sites: list[str]=None) -> list[dict]:
+        """
+        Returns the stats of the locations of all sites, see LocationsApi.get_location_stats. Every entry has an
+        additional "site" key.
+        """
+        return self._merge(self._fan_out(lambda site: self._rapi(site).get_location_stats(*locations), sites))
+
+
+    def set_scene(self, location: int=None, scene_name: str=None, sites: list[str]=None) -> dict:
+        """
+        Sets a scene on all or some sites, see ApiSetting.set_scene.
+
+        Returns:
+        - dict: Maps every site that answered to its requests.Response.
+        """
+        return self._fan_out(lambda site: self._uapi(site).set_scene(location=location, scene_name=scene_name), sites)
+
+
+    def set_brightness(self, location: int=None, brightness: int=None, sites: list[str]=None) -> dict:
+        """
+        Sets the brightness on all or some sites, see ApiSetting.set_brightness.
+
+        Returns:
+        - dict: Maps every site that answered to its requests.Response.
+        """
+        return self._fan_out(
+            lambda site: self._uapi(site).set_brightness(location=location, brightness=brightness), sites
+        )
+
+
+    def set_many(self, operations: list[dict], batch_size: int=50, sites: list[str]=None) -> dict:
+        """
+        Sends batched set operations to all or some sites, see ApiSetting.set_many.
+
+        Returns:
+        - dict: Maps every site that answered to its list of per-location results.
+        """
+        return self._fan_out(lambda site: self._uapi(site).set_many(operations, batch_size=batch_size), sites)
+
+
+    def close(self) -> None:
+        """
+        Stops the worker threads and closes the connections of all sites.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for pool in self._pools.values():
+            pool.close()
+
+
+    def _rapi(self, site: str) -> restful.rApi:
+        with self._lock:
+            api = self._rapis.get(site)
+        if api is None:
+            director = self.sites[site]
+            api = restful.rApi(
+                director["user"],
+                director["password"],
+                director["ipv4_adress"],
+                cache_ttl=self.cache_ttl,
+                snapshot_cache=self.snapshot_cache,
+                session_pool=self._pools[site]
+            )
+            with self._lock:
+                api = self._rapis.setdefault(site, api)
+        return api
+
+
+    def _uapi(self, site: str) -> unified.uApi:
+        with self._lock:
+            api = self._uapis.get(site)
+            if api is None:
+                director = self.sites[site]
+                api = unified.uApi(
+                    director["user"], director["password"], director["ipv4_adress"], session_pool=self._pools[site]
+                )
+                self._uapis[site] = api
+        return api
+
+
+    def _fan_out(self, function, sites: list[str]=None) -> dict:
+        if sites is None:
+            sites = list(self.sites)
+        for site in sites:
+            if site not in self.sites:
+                raise ValueError(f"Error: {self.NotFoundInApiError} - Site {site} is not part of the fleet")
+
+        futures = {site: self._executor.submit(function, site) for site in sites}
+        deadline = time.monotonic() + self.timeout
+        results = {}
+        errors = {}
+        for site, future in futures.items():
+            try:
+                results[site] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                errors[site] = TimeoutError(f"Site {site} did not answer within {self.timeout} seconds")
+            except Exception as error:
+                errors[site] = error
+        self.errors = errors
+        return results
+
+
+    @staticmethod
+    def _merge(results: dict) -> list[dict]:
+        merged = []
+        for site, entries in results.items():
+            for entry in entries:
+                entry["site"] = site
+                merged.append(entry)
+        return merged
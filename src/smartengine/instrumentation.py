@@ -0,0 +1,388 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+
+
+class _NullSpan:
+    """
+    The span handed out while no instrumentation records spans. Entering and leaving it does nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+
+
+_NULL_SPAN = _NullSpan()
+
+
+
+
+class _Span:
+    """
+    Times the code of a 'with' block and reports the duration to an instrumentation when the block is left.
+    """
+    __slots__ = ("instrumentation", "name", "tags", "start")
+
+    def __init__(self, instrumentation, name: str, tags: dict):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.tags = tags
+        self.start = None
+
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.tags = {**self.tags, "error": exc_type.__name__}
+        self.instrumentation.on_span(self.name, time.perf_counter() - self.start, self.tags)
+        return False
+
+
+
+
+class Instrumentation:
+    """
+    The interface through which smartengine reports what its requests, downloads and methods cost.
+
+    Every module of smartengine reports to the instrumentation returned by get_instrumentation(). The default
+    instrumentation is this class itself, whose hooks do nothing, so reporting costs next to nothing unless an
+    instrumentation is installed with set_instrumentation(). Subclasses override the hooks they are interested in.
+    Spans are only timed when 'on_span' is overridden.
+
+    The following spans are reported:
+        connect: Opening a TCP/TLS connection to a director, including the TLS handshake.
+        request: Sending a request until the response headers arrived.
+        download: Reading the response body.
+        decode: Decoding a JSON document or streamed message. The /rApi document is decoded while it is downloaded,
+        so its decode span includes the download.
+        transform: The Python post-processing of an rApi method such as get_location_stats. A transform span
+        includes the spans of a download it triggers.
+        gap: The time a resilient uApi subscription went without data, from losing the connection until the first
+        message after the reconnect.
+
+    Every hook receives a 'tags' dictionary with details such as the director's "ip", the "method" or the "api".
+
+    Methods:
+        span: Returns a context manager that times its block and reports it through on_span.
+        on_span: Receives the duration of a span in seconds.
+        on_bytes: Receives the size of a request or response body.
+        on_status: Receives the HTTP status code of a response.
+        on_message: Receives every message decoded from a subscription stream.
+        on_call: Receives every call of a public API method.
+
+    Example:
+        class Printer(Instrumentation):
+            def on_span(self, name, seconds, tags):
+                print(name, round(seconds * 1000, 2), "ms", tags)
+
+        set_instrumentation(Printer())
+    """
+    def __repr__(self):
+        return f"{type(self).__name__}()"
+
+
+    def span(self, name: str, **tags) -> _Span:
+        """
+        Returns a context manager that measures the time spent in its block and reports it through on_span.
+
+        Parameters:
+        - name (str): The name of the span, e.g. "request" or "decode".
+        - tags: Details passed on to on_span.
+        """
+        if type(self).on_span is Instrumentation.on_span:
+            return _NULL_SPAN
+        return _Span(self, name, tags)
+
+
+    def on_span(self, name: str, seconds: float, tags: dict) -> None:
+        """
+        Called with the duration of every finished span. Spans that ended with an exception carry the name of the
+        exception class as "error" tag.
+        """
+
+
+    def on_bytes(self, name: str, count: int, tags: dict) -> None:
+        """
+        Called with the size of every request body ("upload"), response body ("download") and streamed message
+        ("message").
+        """
+
+
+    def on_status(self, status: int, tags: dict) -> None:
+        """
+        Called with the HTTP status code of every response.
+        """
+
+
+    def on_message(self, tags: dict) -> None:
+        """
+        Called for every message decoded from a subscription stream.
+        """
+
+
+    def on_call(self, method: str, tags: dict) -> None:
+        """
+        Called for every call of a public API method, e.g. "FixturesApi.get_sensor_stats".
+        """
+
+
+
+
+class Histogram:
+    """
+    A histogram of durations with logarithmic buckets.
+
+    Each bucket is twice as wide as the previous one, from 'lowest' seconds up to 'highest' seconds; smaller and larger
+    values are counted in the first and last bucket. Percentiles are estimated from the upper bound of the bucket they
+    fall into, while count, sum, minimum and maximum are exact.
+
+    Attributes:
+        bounds (list[float]): The upper bounds of the buckets in seconds.
+        counts (list[int]): The number of values per bucket, with one extra bucket for values above the last bound.
+        count (int): The number of recorded values.
+        total (float): The sum of all recorded values.
+        minimum (float): The smallest recorded value, None if nothing was recorded.
+        maximum (float): The largest recorded value, None if nothing was recorded.
+
+    Methods:
+        add: Records a value.
+        percentile: Estimates a percentile of the recorded values.
+        summary: Returns count, mean, minimum, maximum and the usual percentiles as a dictionary.
+    """
+    def __init__(self, lowest: float=1e-5, highest: float=100.0):
+        self.bounds = []
+        bound = lowest
+        while bound < highest:
+            self.bounds.append(bound)
+            bound *= 2
+        self.bounds.append(bound)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(count={self.count})"
+
+
+    def add(self, value: float) -> None:
+        """
+        Records a value.
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimates the given percentile (0-100) of the recorded values. Returns None if nothing was recorded.
+        """
+        if self.count == 0:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if position == len(self.bounds):
+                    return self.maximum
+                return min(self.bounds[position], self.maximum)
+        return self.maximum
+
+
+    def summary(self) -> dict:
+        """
+        Returns the keys "count", "mean", "min", "p50", "p90", "p99" and "max". Durations are in seconds.
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.minimum,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.maximum,
+        }
+
+
+
+
+class InMemoryAggregator(Instrumentation):
+    """
+    An instrumentation that aggregates everything it receives in memory.
+
+    Spans are collected in one Histogram per span name and, for methods, per span and method. Byte counts, status codes
+    and calls are summed up, and stream messages are counted together with the time of the first and last message,
+    so the message rate can be reported. The aggregator is thread-safe.
+
+    Methods:
+        report: Returns everything aggregated so far as a dictionary.
+        reset: Drops everything aggregated so far.
+
+    Example:
+        aggregator = InMemoryAggregator()
+        set_instrumentation(aggregator)
+        api.get_location_stats()
+        print(aggregator.report()["spans"]["transform"])
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+
+    def reset(self) -> None:
+        """
+        Drops everything aggregated so far.
+        """
+        with self._lock:
+            self._spans = {}
+            self._bytes = {}
+            self._statuses = {}
+            self._calls = {}
+            self._messages = {}
+
+
+    def on_span(self, name: str, seconds: float, tags: dict) -> None:
+        keys = [name]
+        if "method" in tags:
+            keys.append(f"{name}:{tags['method']}")
+        with self._lock:
+            for key in keys:
+                histogram = self._spans.get(key)
+                if histogram is None:
+                    histogram = self._spans[key] = Histogram()
+                histogram.add(seconds)
+
+
+    def on_bytes(self, name: str, count: int, tags: dict) -> None:
+        with self._lock:
+            self._bytes[name] = self._bytes.get(name, 0) + count
+
+
+    def on_status(self, status: int, tags: dict) -> None:
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+
+
+    def on_message(self, tags: dict) -> None:
+        now = time.monotonic()
+        stream = tags.get("ip")
+        with self._lock:
+            messages = self._messages.get(stream)
+            if messages is None:
+                self._messages[stream] = [1, now, now]
+            else:
+                messages[0] += 1
+                messages[2] = now
+
+
+    def on_call(self, method: str, tags: dict) -> None:
+        with self._lock:
+            self._calls[method] = self._calls.get(method, 0) + 1
+
+
+    def report(self) -> dict:
+        """
+        Returns everything aggregated so far.
+
+        Returns:
+        - dict: With the following structure:
+            {
+                "spans": {<span or span:method>: {"count", "mean", "min", "p50", "p90", "p99", "max"}, ...},
+                "bytes": {"upload": <int>, "download": <int>, "message": <int>},
+                "statuses": {<status code>: <count>, ...},
+                "calls": {<method>: <count>, ...},
+                "messages": {<director ip>: {"count": <int>, "per_second": <float>}, ...}
+            }
+        """
+        with self._lock:
+            messages = {}
+            for stream, (count, first, last) in self._messages.items():
+                messages[stream] = {"count": count, "per_second": (count - 1) / (last - first) if last > first else None}
+            return {
+                "spans": {name: histogram.summary() for name, histogram in self._spans.items()},
+                "bytes": dict(self._bytes),
+                "statuses": dict(self._statuses),
+                "calls": dict(self._calls),
+                "messages": messages,
+            }
+
+
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    """
+    Returns the instrumentation every module of smartengine reports to.
+    """
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Instrumentation=None) -> Instrumentation:
+    """
+    Installs the instrumentation every module of smartengine reports to. None installs the no-op default again.
+
+    Returns:
+    - Instrumentation: The previously installed instrumentation.
+    """
+    global _instrumentation
+    previous = _instrumentation
+    _instrumentation = Instrumentation() if instrumentation is None else instrumentation
+    return previous
+
+
+def instrumented(span: str="transform"):
+    """
+    Decorates a public API method so every call is reported through on_call and, unless 'span' is None, timed as a
+    span with the method's name as "method" tag.
+    """
+    def decorator(function):
+        method = function.__qualname__
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(self, *args, **kwargs):
+                current = _instrumentation
+                if type(current) is Instrumentation:
+                    return await function(self, *args, **kwargs)
+                tags = {"method": method, "ip": getattr(self, "ip", None)}
+                current.on_call(method, tags)
+                if span is None:
+                    return await function(self, *args, **kwargs)
+                with current.span(span, **tags):
+                    return await function(self, *args, **kwargs)
+            return wrapper
+
+        @functools.wraps(function)
+        def wrapper(self, *args, **kwargs):
+            current = _instrumentation
+            if type(current) is Instrumentation:
+                return function(self, *args, **kwargs)
+            tags = {"method": method, "ip": getattr(self, "ip", None)}
+            current.on_call(method, tags)
+            if span is None:
+                return function(self, *args, **kwargs)
+            with current.span(span, **tags):
+                return function(self, *args, **kwargs)
+        return wrapper
+    return decorator
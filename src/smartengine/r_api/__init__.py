@@ -1,3 +1,12 @@
+from . import cache
+from . import decoder
+from . import indexes
 from . import restful
 from . import fixtures
-from . import locations
\ No newline at end of file
+from . import locations
+from . import columnar
+from . import hierarchy
+from . import query
+from . import records
+from . import mirror
+from . import asynchronous
\ No newline at end of file
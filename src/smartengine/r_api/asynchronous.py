@@ -0,0 +1,153 @@
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import cache, decoder, restful
+from .. import instrumentation, session
+
+
+_inflight = {}
+
+
+class AsyncRApi(restful.rApi):
+    """
+    An asyncio counterpart of rApi that downloads the /rApi document without blocking the event loop.
+
+    The constructor does not download anything. The /rApi document is fetched with 'await fetch()' (or by using the
+    object as an async context manager) through an aiohttp session and stored in the same SnapshotCache the
+    synchronous classes use. All parsing methods of FixturesApi and LocationsApi, such as get_all_fixtures,
+    get_location_stats or sensor_frame, are inherited unchanged and work on the last fetched snapshot, so they never
+    block. The constructor takes the arguments of rApi as well, but the document is only ever downloaded through
+    aiohttp, and refresh is an awaitable.
+
+    Attributes:
+        Inherits all attributes from rApi.
+        limit (int): Maximum number of simultaneous connections of the aiohttp session. 0 means no limit.
+
+    Methods:
+        fetch: Awaitable that makes sure a snapshot younger than the TTL is available.
+        refresh: Awaitable that downloads a new snapshot regardless of the age of the cached one.
+        close: Awaitable that closes the aiohttp session if it was created by this object.
+
+    Example:
+        async with AsyncRApi(user='admin', password='secret', ipv4_adress='192.168.0.10') as api:
+            print(api.get_all_fixtures())
+            await api.refresh()
+            print(api.get_location_stats(101))
+    """
+    def __init__(
+        self,
+        user: str,
+        password: str,
+        ipv4_adress: str="192.168.1.1",
+        cache_ttl: float=None,
+        snapshot_cache: cache.SnapshotCache=None,
+        client_session: "aiohttp.ClientSession"=None,
+        limit: int=0,
+        session_pool: session.SessionPool=None,
+        pool_maxsize: int=10,
+        as_dict: bool=True
+    ):
+        if aiohttp is None:
+            raise ImportError("AsyncRApi requires the aiohttp package - install it with 'pip install smartengine[async]'")
+        self._configure(user, password, ipv4_adress, cache_ttl, snapshot_cache, session_pool, pool_maxsize, as_dict)
+        self.limit = limit
+        self.system_name = None
+        self._client_session = client_session
+        self._owns_client_session = client_session is None
+        self._snapshot = None
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.user}, {self.password}, ip_adress={self.ip})"
+
+
+    async def __aenter__(self):
+        await self.fetch()
+        return self
+
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+    @property
+    def snapshot(self) -> cache.Snapshot:
+        """
+        The newest snapshot available without downloading. Raises a RuntimeError if nothing was fetched yet.
+        """
+        snapshot = self.snapshot_cache.peek(self.ip, self.user, ttl=self.cache_ttl, sections=self.sections)
+        if snapshot is not None:
+            self._snapshot = snapshot
+        if self._snapshot is None:
+            raise RuntimeError(f"{__class__.__name__}: no /rApi snapshot available - await fetch() first")
+        return self._snapshot
+
+
+    async def fetch(self) -> cache.Snapshot:
+        """
+        Makes sure a snapshot younger than the TTL is available, downloading it if necessary.
+
+        Concurrent calls for the same director and cache on the same event loop share a single download.
+
+        Returns:
+        - cache.Snapshot: The snapshot the parsing methods will read from.
+        """
+        snapshot = self.snapshot_cache.peek(self.ip, self.user, ttl=self.cache_ttl, sections=self.sections)
+        if snapshot is None:
+            snapshot = await self._download()
+        self._snapshot = snapshot
+        self.system_name = snapshot.json_["name"]
+        return snapshot
+
+
+    async def refresh(self) -> None:
+        """
+        Downloads a new copy of the /rApi document into the cache, regardless of the age of the cached one.
+        """
+        self._snapshot = await self._download()
+        self.system_name = self._snapshot.json_["name"]
+
+
+    async def close(self) -> None:
+        """
+        Closes the aiohttp session if it was created by this object.
+        """
+        if self._owns_client_session and self._client_session is not None:
+            await self._client_session.close()
+            self._client_session = None
+
+
+    async def _download(self) -> cache.Snapshot:
+        key = (asyncio.get_running_loop(), id(self.snapshot_cache), self.ip, self.user)
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._get_document())
+            _inflight[key] = task
+            task.add_done_callback(lambda done: _inflight.pop(key, None) if _inflight.get(key) is done else None)
+        return await asyncio.shield(task)
+
+
+    async def _get_document(self) -> cache.Snapshot:
+        if self._client_session is None:
+            self._client_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit, ssl=False))
+        current = instrumentation.get_instrumentation()
+        tags = {"ip": self.ip, "http_method": "GET"}
+        with current.span("request", **tags):
+            response = await self._client_session.get(
+                f"https://{self.ip}/rApi", auth=aiohttp.BasicAuth(self.user, self.password), ssl=False
+            )
+        try:
+            current.on_status(response.status, tags)
+            with current.span("decode", ip=self.ip, api="rApi"):
+                section_decoder = decoder.SectionDecoder(self.sections)
+                async for chunk in response.content.iter_chunked(cache.SnapshotCache.CHUNK_SIZE):
+                    section_decoder.feed(chunk)
+                json_ = section_decoder.close()
+            current.on_bytes("download", section_decoder.bytes_read, tags)
+        finally:
+            response.release()
+        return self.snapshot_cache.put(self.ip, self.user, cache.Snapshot(json_, sections=self.sections))
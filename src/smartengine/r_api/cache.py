@@ -0,0 +1,436 @@
+import marshal
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+
+from . import decoder, indexes
+from .. import instrumentation, session
+
+
+class Snapshot:
+    """
+    A single downloaded copy of a smartdirector's /rApi document.
+
+    A Snapshot wraps the decoded JSON of one /rApi download together with the time it was fetched. Structures that
+    are derived from the document (for example lookup indexes) are built once per snapshot and stored alongside it,
+    so every API object reading the same snapshot shares them. A snapshot may hold only some of the top-level
+    sections of the document, e.g. "name" and "fixture" for a FixturesApi.
+
+    Attributes:
+        json_ (dict): The decoded /rApi document.
+        fetched_at (float): UNIX timestamp of the moment the document was downloaded.
+        version (int): Number of in-place updates applied to the document since it was fetched.
+        stale (bool): True if the snapshot was loaded from a snapshot file and has not been revalidated with the
+        director yet.
+        sections (frozenset): The top-level sections the document was decoded with. None means the whole document.
+
+    Methods:
+        age: Returns the number of seconds since the snapshot was fetched.
+        covers: Returns whether the snapshot holds the given top-level sections.
+        derived: Returns a structure derived from the snapshot, building it on first access.
+        update_stats: Applies changed sensor stat values to a fixture or location in place.
+    """
+    def __init__(self, json_: dict, fetched_at: float=None, stale: bool=False, sections=None):
+        self.json_ = json_
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.version = 0
+        self.stale = stale
+        self.sections = None if sections is None else frozenset(sections)
+        self._derived = {}
+        self._derived_lock = threading.RLock()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(fetched_at={self.fetched_at}, stale={self.stale})"
+
+
+    def age(self) -> float:
+        """
+        Returns the age of the snapshot in seconds.
+        """
+        return time.time() - self.fetched_at
+
+
+    def covers(self, sections=None) -> bool:
+        """
+        Returns True if the snapshot was decoded with all of the given top-level sections. None stands for the whole
+        document.
+        """
+        if self.sections is None:
+            return True
+        return sections is not None and self.sections.issuperset(sections)
+
+
+    def derived(self, name: str, factory) -> object:
+        """
+        Returns a structure derived from this snapshot, building it only once.
+
+        Parameters:
+        - name (str): The name the derived structure is stored under.
+        - factory (callable): Called with the snapshot to build the structure when it does not exist yet.
+
+        Returns:
+        - object: The derived structure.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._derived_lock:
+            if name not in self._derived:
+                self._derived[name] = factory(self)
+            return self._derived[name]
+
+
+    def update_stats(self, entity: str, id_, stats: dict) -> bool:
+        """
+        Applies changed sensor stat values to a fixture or location of the snapshot in place.
+
+        Values are written to the 'instant' field of the element's 'sensorStats', the way the /rApi document reports 
+        them. Derived structures that implement an 'element_updated(entity, id_, element)' method are updated 
+        through it, all others are dropped and rebuilt on their next access. Readers iterating a 'sensorStats' 
+        dictionary at the same time are safe, because a stat that did not exist before is added to a copy that then 
+        replaces the original dictionary.
+
+        Parameters:
+        - entity (str): Either "fixture" or "location".
+        - id_ (str | int): The serial number of the fixture or the id of the location.
+        - stats (dict): Maps every changed stat to its new value. Dictionaries replace the stat as a whole.
+
+        Returns:
+        - bool: False if the snapshot has no such fixture or location, True otherwise.
+        """
+        index = indexes.of(self)
+        if entity == "fixture":
+            element = index.fixtures_by_serial.get(id_)
+        else:
+            element = index.locations_by_id.get(id_)
+        if element is None:
+            return False
+
+        sensor_stats = element.get("sensorStats")
+        if sensor_stats is None or any(stat not in sensor_stats for stat in stats):
+            sensor_stats = dict(sensor_stats or {})
+        for stat, value in stats.items():
+            current = sensor_stats.get(stat)
+            if isinstance(value, dict) or not isinstance(current, dict):
+                sensor_stats[stat] = value if isinstance(value, dict) else {"instant": value}
+            else:
+                current["instant"] = value
+        element["sensorStats"] = sensor_stats
+
+        with self._derived_lock:
+            self.version += 1
+            for name, structure in list(self._derived.items()):
+                handler = getattr(structure, "element_updated", None)
+                if handler is None:
+                    del self._derived[name]
+                else:
+                    handler(entity, id_, element)
+        return True
+
+
+
+
+class _Fetch:
+    """
+    Book-keeping for a single in-flight /rApi download that other threads can wait on.
+    """
+    def __init__(self, sections=None):
+        self.sections = sections
+        self.done = threading.Event()
+        self.snapshot = None
+        self.error = None
+
+
+
+
+class SnapshotCache:
+    """
+    A thread-safe, TTL-bounded cache of /rApi snapshots keyed by director IP and user.
+
+    The cache makes sure a smartdirector's /rApi document is downloaded at most once per TTL, no matter how many
+    FixturesApi, LocationsApi or rApi objects are created for that director. When several threads ask for an expired
+    or missing snapshot at the same time, only one of them downloads it and the others wait for its result.
+
+    With a 'directory', every downloaded snapshot is also written to a snapshot file. When a process starts, the
+    first lookup of a director loads this file in a few milliseconds instead of waiting for the download, and marks
+    the snapshot as stale. The director is then revalidated on a background thread, and the fresh snapshot replaces
+    the stale one as soon as it arrives. Until then, and for as long as the director cannot be reached, lookups keep
+    returning the stale snapshot.
+
+    Lookups can ask for only some of the top-level sections of the /rApi document. The document is then decoded
+    while it is downloaded and the other sections are skipped, see decoder.SectionDecoder. A cached snapshot
+    serves every lookup whose sections it holds. A lookup for sections it is missing downloads the document again
+    with the union of both, so API objects of different kinds still share one snapshot per director.
+
+    Attributes:
+        ttl (float): Default number of seconds a snapshot stays valid. None means snapshots never expire.
+        directory (str): Directory the snapshot files are kept in. None disables snapshot files.
+        retry_interval (float): Minimum number of seconds between two background revalidations of a stale snapshot.
+
+    Methods:
+        get: Returns a valid snapshot for a director, downloading it if needed.
+        refresh: Downloads a new snapshot for a director regardless of the age of the cached one.
+        peek: Returns a valid cached snapshot without ever downloading one.
+        put: Stores a snapshot that was downloaded elsewhere.
+        invalidate: Drops cached snapshots so the next get downloads them again.
+
+    Example:
+        cache = SnapshotCache(ttl=60, directory="/var/cache/smartengine")
+        snapshot = cache.get("192.168.1.1", "admin", "password123")
+        print(snapshot.json_["name"], snapshot.stale)
+    """
+    FILE_MAGIC = b"SESNAP"
+    FILE_VERSION = 2
+    _FILE_HEADER = struct.Struct("<6sBd")
+    CHUNK_SIZE = 65536
+
+    def __init__(self, ttl: float=30.0, directory: str=None, retry_interval: float=10.0):
+        self.ttl = ttl
+        self.directory = directory
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._inflight = {}
+        self._loaded = set()
+        self._revalidated_at = {}
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(ttl={self.ttl}, directory={self.directory!r})"
+
+
+    def get(
+        self, 
+        ip: str, 
+        user: str, 
+        password: str, 
+        ttl: float=None, 
+        session_pool: session.SessionPool=None,
+        sections=None
+    ) -> Snapshot:
+        """
+        Returns a snapshot of the director's /rApi document that is younger than the TTL.
+
+        Parameters:
+        - ip (str): IP address of the smartdirector.
+        - user (str): Username for authentication.
+        - password (str): Password for authentication.
+        - ttl (float, optional): Overrides the cache's default TTL for this lookup.
+        - session_pool (session.SessionPool, optional): The pool used to download the document. Defaults to the 
+        shared session pool.
+        - sections (iterable[str], optional): The top-level sections the snapshot must hold, e.g. 
+        ("name", "fixture"). None asks for the whole document.
+
+        Returns:
+        - Snapshot: The cached snapshot, or a freshly downloaded one if the cached snapshot is missing, expired or
+        lacks some of the sections. A stale snapshot loaded from a snapshot file is returned as-is while it is 
+        revalidated in the background.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        key = (ip, user)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is None and self.directory is not None:
+            snapshot = self._load(key)
+        if snapshot is not None and not snapshot.covers(sections):
+            snapshot = None
+        if snapshot is not None and snapshot.stale:
+            self._revalidate(key, password, session_pool, snapshot.sections)
+            return snapshot
+        if snapshot is not None and (ttl is None or snapshot.age() < ttl):
+            return snapshot
+        return self._fetch(key, password, session_pool, sections)
+
+
+    def refresh(
+        self, 
+        ip: str, 
+        user: str, 
+        password: str, 
+        session_pool: session.SessionPool=None, 
+        sections=None
+    ) -> Snapshot:
+        """
+        Downloads a new snapshot of the director's /rApi document and stores it in the cache.
+
+        If another thread is already downloading the same document with the requested sections, this call waits for 
+        that download instead of starting a second one.
+
+        Returns:
+        - Snapshot: The freshly downloaded snapshot.
+        """
+        return self._fetch((ip, user), password, session_pool, sections)
+
+
+    def peek(self, ip: str, user: str, ttl: float=None, sections=None) -> Snapshot:
+        """
+        Returns the cached snapshot of a director if it is younger than the TTL, without ever downloading it.
+
+        Returns:
+        - Snapshot: The cached snapshot, or None if it is missing, expired or lacks some of the given sections.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            snapshot = self._snapshots.get((ip, user))
+        if snapshot is not None and snapshot.covers(sections) and (ttl is None or snapshot.age() < ttl):
+            return snapshot
+        return None
+
+
+    def put(self, ip: str, user: str, json_: dict | Snapshot) -> Snapshot:
+        """
+        Stores a /rApi document that was downloaded outside of the cache, e.g. by an asynchronous client.
+
+        Parameters:
+        - json_ (dict | Snapshot): The decoded document, or an existing snapshot to share with another cache.
+
+        Returns:
+        - Snapshot: The stored snapshot.
+        """
+        snapshot = json_ if isinstance(json_, Snapshot) else Snapshot(json_)
+        with self._lock:
+            self._snapshots[(ip, user)] = snapshot
+        return snapshot
+
+
+    def invalidate(self, ip: str=None, user: str=None) -> None:
+        """
+        Drops cached snapshots. Without arguments every snapshot is dropped, otherwise only those matching the given
+        IP address and/or user. Snapshot files are kept, but are not loaded again by this cache.
+        """
+        with self._lock:
+            for key in list(self._snapshots):
+                if (ip is None or key[0] == ip) and (user is None or key[1] == user):
+                    del self._snapshots[key]
+
+
+    def _fetch(self, key: tuple, password: str, session_pool: session.SessionPool=None, sections=None) -> Snapshot:
+        while True:
+            with self._lock:
+                fetch = self._inflight.get(key)
+                owner = fetch is None
+                if owner:
+                    cached = self._snapshots.get(key)
+                    if cached is not None and sections is not None:
+                        sections = None if cached.sections is None else cached.sections.union(sections)
+                    fetch = _Fetch(sections)
+                    self._inflight[key] = fetch
+            if owner:
+                break
+
+            fetch.done.wait()
+            if fetch.error is not None:
+                raise fetch.error
+            if fetch.snapshot.covers(sections):
+                return fetch.snapshot
+
+        try:
+            ip, user = key
+            if session_pool is None:
+                session_pool = session.shared_pool
+            response = session_pool.get(ip, f"https://{ip}/rApi", auth=(user, password), stream=True)
+            current = instrumentation.get_instrumentation()
+            with response, current.span("decode", ip=ip, api="rApi"):
+                section_decoder = decoder.SectionDecoder(sections)
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    section_decoder.feed(chunk)
+                json_ = section_decoder.close()
+            current.on_bytes("download", section_decoder.bytes_read, {"ip": ip, "http_method": "GET"})
+            fetch.snapshot = Snapshot(json_, sections=sections)
+            with self._lock:
+                self._snapshots[key] = fetch.snapshot
+            if self.directory is not None:
+                self._write(key, fetch.snapshot)
+            return fetch.snapshot
+        except Exception as error:
+            fetch.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            fetch.done.set()
+
+
+    def path(self, ip: str, user: str) -> str:
+        """
+        Returns the path of the snapshot file of a director and user, or None if snapshot files are disabled.
+        """
+        if self.directory is None:
+            return None
+        name = re.sub(r"[^\w.-]", "_", f"{ip}_{user}")
+        return os.path.join(self.directory, f"{name}.snapshot")
+
+
+    def _write(self, key: tuple, snapshot: Snapshot) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(self._FILE_HEADER.pack(self.FILE_MAGIC, self.FILE_VERSION, snapshot.fetched_at))
+                marshal.dump(None if snapshot.sections is None else sorted(snapshot.sections), file)
+                marshal.dump(snapshot.json_, file)
+            os.replace(temporary, self.path(*key))
+        except (OSError, ValueError):
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+
+
+    def _load(self, key: tuple) -> Snapshot:
+        with self._lock:
+            if key in self._loaded:
+                return self._snapshots.get(key)
+            self._loaded.add(key)
+        try:
+            with open(self.path(*key), "rb") as file:
+                magic, version, fetched_at = self._FILE_HEADER.unpack(file.read(self._FILE_HEADER.size))
+                if magic != self.FILE_MAGIC or version != self.FILE_VERSION:
+                    return None
+                sections = marshal.load(file)
+                json_ = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError, struct.error):
+            return None
+        with self._lock:
+            return self._snapshots.setdefault(key, Snapshot(json_, fetched_at, stale=True, sections=sections))
+
+
+    def _revalidate(self, key: tuple, password: str, session_pool: session.SessionPool=None, sections=None) -> None:
+        with self._lock:
+            if key in self._inflight or time.time() - self._revalidated_at.get(key, 0) < self.retry_interval:
+                return
+            self._revalidated_at[key] = time.time()
+        threading.Thread(
+            target=self._fetch_quietly,
+            args=(key, password, session_pool, sections),
+            name="smartengine-revalidate",
+            daemon=True
+        ).start()
+
+
+    def _fetch_quietly(
+        self, 
+        key: tuple, 
+        password: str, 
+        session_pool: session.SessionPool=None, 
+        sections=None
+    ) -> None:
+        try:
+            self._fetch(key, password, session_pool, sections)
+        except Exception:
+            pass
+
+
+
+
+default_cache = SnapshotCache()
@@ -0,0 +1,231 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import hierarchy, indexes
+
+
+class StatsFrame:
+    """
+    A columnar NumPy view of the sensor stats of fixtures or locations.
+
+    The frame holds the identifiers of all entities in one array and the 'instant' value of every stat in one float64
+    array per stat, with NaN where an entity does not report the stat. Entities can additionally be grouped by labels
+    such as their type, owning location or parent location; the groups are stored as integer codes, so aggregations by
+    group run as single vectorized NumPy operations without building any intermediate dictionaries.
+
+    Attributes:
+        ids (numpy.ndarray): The serial numbers or location ids of the entities, in document order.
+        columns (dict): Maps every stat to a float64 array with one value per entity.
+        groups (dict): Maps every grouping (e.g. "type") to a tuple of (labels, codes), where 'codes' is an int
+        array with the position of each entity's label in 'labels'. The first grouping is the default of mean_by,
+        min_by and max_by.
+        entity (str): "fixture" or "location", the kind of entity the frame holds.
+        NotFoundInApiError (int): Custom error code for unknown groupings.
+
+    Methods:
+        column: Returns the value array of a stat.
+        position: Returns the row of an entity.
+        mask: Returns a boolean array selecting the entities whose stat lies within the given bounds.
+        select: Returns the identifiers selected by a boolean mask.
+        mean_by: Returns the mean of a stat per group.
+        min_by: Returns the minimum of a stat per group.
+        max_by: Returns the maximum of a stat per group.
+        element_updated: Writes changed sensor stats of an entity into the value arrays.
+
+    Example:
+        frame = api.sensor_frame()
+        hot = frame.select(frame.mask("temperature", gt=30))
+        print(frame.mean_by("power", by="type"))
+        print(api.location_frame().mean_by("power", by="parent"))
+    """
+    def __init__(self, elements: list[dict], id_key: str, stats: list[str], groups: dict=None, entity: str=None):
+        if numpy is None:
+            raise ImportError("StatsFrame requires the numpy package - install it with 'pip install smartengine[numpy]'")
+        self.ids = numpy.array([element[id_key] for element in elements], dtype=object)
+        self.columns = {stat: numpy.full(len(elements), numpy.nan) for stat in stats}
+        self.groups = {}
+        self.entity = entity
+        self.NotFoundInApiError = 8080
+        self._positions = {id_: row for row, id_ in enumerate(self.ids.tolist())}
+
+        for row, element in enumerate(elements):
+            self._read_row(row, element)
+
+        for name, labels_per_row in (groups or {}).items():
+            labels = {}
+            codes = numpy.fromiter(
+                (labels.setdefault(label, len(labels)) for label in labels_per_row), dtype=numpy.intp, count=len(elements)
+            )
+            self.groups[name] = (list(labels), codes)
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(rows={len(self.ids)}, stats={list(self.columns)})"
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    def element_updated(self, entity: str, id_, element: dict) -> None:
+        """
+        Called by the snapshot when the sensor stats of an element change in place. Rewrites the entity's row of 
+        every value array, so the frame stays current without being rebuilt.
+        """
+        if entity == self.entity and id_ in self._positions:
+            self._read_row(self._positions[id_], element)
+
+
+    def column(self, stat: str) -> "numpy.ndarray":
+        """
+        Returns the float64 value array of a stat. The array is shared, not copied.
+
+        Raises:
+        - KeyError: If the stat is not part of the frame.
+        """
+        return self.columns[stat]
+
+
+    def position(self, id_) -> int:
+        """
+        Returns the row of the entity with the given serial number or location id.
+
+        Raises:
+        - KeyError: If the entity is not part of the frame.
+        """
+        return self._positions[id_]
+
+
+    def mask(self, stat: str, gt: float=None, ge: float=None, lt: float=None, le: float=None) -> "numpy.ndarray":
+        """
+        Returns a boolean array that is True for every entity whose stat lies within all given bounds.
+
+        Entities without a value for the stat are never selected.
+
+        Parameters:
+        - stat (str): The stat to compare.
+        - gt, ge, lt, le (float, optional): Lower and upper bounds (greater than, greater or equal, less than, less or
+        equal).
+
+        Returns:
+        - numpy.ndarray: The boolean mask.
+        """
+        values = self.columns[stat]
+        result = ~numpy.isnan(values)
+        if gt is not None:
+            result &= values > gt
+        if ge is not None:
+            result &= values >= ge
+        if lt is not None:
+            result &= values < lt
+        if le is not None:
+            result &= values <= le
+        return result
+
+
+    def select(self, mask: "numpy.ndarray") -> "numpy.ndarray":
+        """
+        Returns the identifiers of the entities selected by a boolean mask.
+        """
+        return self.ids[mask]
+
+
+    def mean_by(self, stat: str, by: str=None) -> dict:
+        """
+        Returns the mean of a stat for every group. Missing values are ignored; groups without values yield NaN.
+
+        Parameters:
+        - stat (str): The stat to aggregate.
+        - by (str, optional): The grouping to aggregate by. Defaults to the first grouping of the frame, "type" for
+        fixtures and "parent" for locations.
+
+        Returns:
+        - dict: Maps every group label to its mean.
+
+        Raises:
+        - ValueError: If the grouping is not part of the frame.
+        """
+        labels, codes, values, present = self._grouped(stat, by)
+        sums = numpy.bincount(codes[present], weights=values[present], minlength=len(labels))
+        counts = numpy.bincount(codes[present], minlength=len(labels))
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        return dict(zip(labels, means.tolist()))
+
+
+    def min_by(self, stat: str, by: str=None) -> dict:
+        """
+        Returns the minimum of a stat for every group. Groups without values yield NaN.
+        """
+        return self._reduce_by(stat, by, numpy.fmin)
+
+
+    def max_by(self, stat: str, by: str=None) -> dict:
+        """
+        Returns the maximum of a stat for every group. Groups without values yield NaN.
+        """
+        return self._reduce_by(stat, by, numpy.fmax)
+
+
+    def _read_row(self, row: int, element: dict) -> None:
+        sensor_stats = element.get("sensorStats") or {}
+        for stat, column in self.columns.items():
+            try:
+                column[row] = float(sensor_stats[stat]["instant"])
+            except (KeyError, TypeError, ValueError):
+                column[row] = numpy.nan
+
+
+    def _grouped(self, stat: str, by: str) -> tuple:
+        if by is None:
+            by = next(iter(self.groups), None)
+        try:
+            labels, codes = self.groups[by]
+        except KeyError:
+            raise ValueError(f"Error: {self.NotFoundInApiError} - Grouping {by} is not available, choose one of {list(self.groups)}") from None
+        values = self.columns[stat]
+        return labels, codes, values, ~numpy.isnan(values)
+
+
+    def _reduce_by(self, stat: str, by: str, ufunc) -> dict:
+        labels, codes, values, present = self._grouped(stat, by)
+        result = numpy.full(len(labels), numpy.nan)
+        ufunc.at(result, codes[present], values[present])
+        return dict(zip(labels, result.tolist()))
+
+
+
+
+def fixture_frame(snapshot, stats: list[str]) -> StatsFrame:
+    """
+    Builds the columnar view of the fixtures of a snapshot, grouped by "type" and by owning "location" id.
+    """
+    index = indexes.of(snapshot)
+    fixtures = snapshot.json_["fixture"]
+    owners = []
+    for element in fixtures:
+        locations = index.locations_by_fixture.get(element["serialNum"])
+        owners.append(locations[0]["id"] if locations else None)
+    return StatsFrame(
+        fixtures,
+        "serialNum",
+        stats,
+        groups={"type": [element.get("type") for element in fixtures], "location": owners},
+        entity="fixture"
+    )
+
+
+def location_frame(snapshot) -> StatsFrame:
+    """
+    Builds the columnar view of the locations of a snapshot with one column for every stat any location reports,
+    grouped by the id of their "parent" location (None for root locations).
+    """
+    tree = hierarchy.of(snapshot)
+    locations = snapshot.json_["location"]
+    stats = {}
+    for element in locations:
+        stats.update(dict.fromkeys(element.get("sensorStats") or {}))
+    parents = [tree.parent(element["id"]) for element in locations]
+    return StatsFrame(locations, "id", list(stats), groups={"parent": parents}, entity="location")
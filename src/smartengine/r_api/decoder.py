@@ -0,0 +1,303 @@
+import codecs
+import json
+import re
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(r"[^ \t\n\r,\]}]*")
+_SKIP = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*', re.DOTALL)
+_COMPLETE = re.compile(r'[^"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"]*)*', re.DOTALL)
+_NON_BRACKETS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[^"\[\]{}]+', re.DOTALL)
+_OTHER_BYTES = bytes(byte for byte in range(256) if byte not in b"[]{}")
+_INCOMPLETE = object()
+
+
+class SectionDecoder:
+    """
+    An incremental decoder for /rApi documents that only builds the top-level sections it is asked for.
+
+    The decoder is fed the response body chunk by chunk while it is downloaded. Requested sections that hold a list,
+    like "fixture" and "location", are decoded one element at a time as soon as an element is complete. Other
+    requested sections are decoded as a whole. Sections that were not requested are skipped with a regular expression
+    that only tracks the nesting of brackets, so they are never turned into Python objects. Bytes that were consumed
+    are dropped from the buffer, so the peak memory grows with the requested sections instead of the whole document.
+
+    Attributes:
+        sections (frozenset): The names of the top-level sections to build. None builds every section.
+        skipped (list[str]): The names of the sections that were skipped so far.
+        bytes_read (int): Number of bytes fed to the decoder so far.
+
+    Methods:
+        feed: Decodes the next chunk of the document.
+        close: Finishes decoding and returns the document.
+
+    Example:
+        decoder = SectionDecoder({"name", "fixture"})
+        for chunk in response.iter_content(65536):
+            decoder.feed(chunk)
+        document = decoder.close()
+    """
+    def __init__(self, sections=None):
+        self.sections = None if sections is None else frozenset(sections)
+        self.skipped = []
+        self.bytes_read = 0
+        self._document = {}
+        self._text = ""
+        self._position = 0
+        self._state = "start"
+        self._key = None
+        self._items = None
+        self._depth = 0
+        self._retry_at = 0
+        self._closed = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+
+
+    def __repr__(self):
+        sections = None if self.sections is None else sorted(self.sections)
+        return f"{__class__.__name__}(sections={sections}, bytes_read={self.bytes_read})"
+
+
+    def feed(self, chunk: bytes | str) -> None:
+        """
+        Decodes the next chunk of the document. Chunks may split the document at any byte.
+
+        Raises:
+        - json.JSONDecodeError: If the document is not a valid JSON object.
+        """
+        if isinstance(chunk, bytes):
+            self.bytes_read += len(chunk)
+            chunk = self._utf8.decode(chunk)
+        if not chunk:
+            return
+        self._text = self._text[self._position:] + chunk
+        self._position = 0
+        self._run()
+
+
+    def close(self) -> dict:
+        """
+        Finishes decoding after the last chunk was fed.
+
+        Returns:
+        - dict: The document with the requested top-level sections.
+
+        Raises:
+        - json.JSONDecodeError: If the document is incomplete or not a valid JSON object.
+        """
+        tail = self._utf8.decode(b"", final=True)
+        self._text = self._text[self._position:] + tail
+        self._position = 0
+        self._closed = True
+        self._retry_at = 0
+        self._run()
+        if self._state != "end":
+            self._error("Unexpected end of document")
+        return self._document
+
+
+    def _run(self) -> None:
+        while self._step():
+            pass
+
+
+    def _step(self) -> bool:
+        text = self._text
+        position = _WHITESPACE.match(text, self._position).end()
+        self._position = position
+        if position == len(text):
+            return False
+        state = self._state
+        char = text[position]
+
+        if state == "start":
+            if char != "{":
+                self._error("Expecting '{'")
+            self._position += 1
+            self._state = "key"
+
+        elif state == "key":
+            if char == "}" and not self._document and not self.skipped:
+                self._position += 1
+                self._state = "end"
+                return True
+            match = _STRING.match(text, position)
+            if match is None:
+                if char != '"' or self._closed:
+                    self._error("Expecting property name enclosed in double quotes")
+                return False
+            self._key = json.loads(match.group())
+            self._position = match.end()
+            self._state = "colon"
+
+        elif state == "colon":
+            if char != ":":
+                self._error("Expecting ':' delimiter")
+            self._position += 1
+            self._state = "value"
+
+        elif state == "value":
+            if self.sections is not None and self._key not in self.sections:
+                self._depth = 0
+                self._state = "skip"
+            elif char == "[":
+                self._items = []
+                self._position += 1
+                self._state = "item"
+            else:
+                self._state = "whole"
+
+        elif state == "whole":
+            value = self._value(text, position)
+            if value is _INCOMPLETE:
+                return False
+            self._document[self._key] = value
+            self._state = "next"
+
+        elif state == "item":
+            if char == "]" and not self._items:
+                self._store_items()
+                return True
+            value = self._value(text, position)
+            if value is _INCOMPLETE:
+                return False
+            self._items.append(value)
+            self._state = "item_next"
+
+        elif state == "item_next":
+            if char == ",":
+                self._position += 1
+                self._state = "item"
+            elif char == "]":
+                self._store_items()
+            else:
+                self._error("Expecting ',' delimiter")
+
+        elif state == "skip":
+            if not self._skip(text, position):
+                return False
+            self.skipped.append(self._key)
+            self._state = "next"
+
+        elif state == "next":
+            if char == ",":
+                self._position += 1
+                self._state = "key"
+            elif char == "}":
+                self._position += 1
+                self._state = "end"
+            else:
+                self._error("Expecting ',' delimiter")
+
+        else:
+            self._error("Extra data")
+        return True
+
+
+    def _value(self, text: str, position: int) -> object:
+        if not self._closed and len(text) - position < self._retry_at:
+            return _INCOMPLETE
+        try:
+            value, end = self._decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            if self._closed:
+                raise
+            self._retry_at = 2 * (len(text) - position)
+            return _INCOMPLETE
+        if not self._closed and (end == len(text) or _SCALAR.match(text, position).end() == len(text)):
+            return _INCOMPLETE
+        self._retry_at = 0
+        self._position = end
+        return value
+
+
+    def _store_items(self) -> None:
+        self._document[self._key] = self._items
+        self._items = None
+        self._position += 1
+        self._state = "next"
+
+
+    def _skip(self, text: str, position: int) -> bool:
+        if self._depth == 0:
+            char = text[position]
+            if char == '"':
+                match = _STRING.match(text, position)
+                if match is None:
+                    if self._closed:
+                        self._error("Unterminated string")
+                    return False
+                self._position = match.end()
+                return True
+            if char not in "[{":
+                end = _SCALAR.match(text, position).end()
+                if end == position:
+                    self._error("Expecting value")
+                if end == len(text) and not self._closed:
+                    return False
+                self._position = end
+                return True
+
+        end = _COMPLETE.match(text, position).end()
+        depth = self._depth
+        for char in _brackets(text[position:end]):
+            if char in b"[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    break
+        else:
+            if self._closed:
+                self._error("Unexpected end of document")
+            self._depth = depth
+            self._position = end
+            return False
+
+        while True:
+            position = _SKIP.match(text, position).end()
+            char = text[position]
+            position += 1
+            if char in "[{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._position = position
+                    return True
+
+
+    def _error(self, message: str) -> None:
+        raise json.JSONDecodeError(message, self._text, self._position)
+
+
+
+
+def _brackets(segment: str) -> bytes:
+    if "\\" in segment:
+        return _NON_BRACKETS.sub("", segment).encode()
+    return b"".join(segment.encode().split(b'"')[::2]).translate(None, _OTHER_BYTES)
+
+
+def decode(chunks, sections=None) -> dict:
+    """
+    Decodes a /rApi document from an iterable of byte or text chunks, building only the given top-level sections.
+
+    Parameters:
+    - chunks (iterable): The chunks of the document, e.g. response.iter_content(65536).
+    - sections (iterable[str], optional): The top-level sections to build, e.g. {"name", "fixture"}. None builds
+    every section.
+
+    Returns:
+    - dict: The document with the requested sections. Requested sections missing from the document are missing
+    from the result as well.
+
+    Raises:
+    - json.JSONDecodeError: If the chunks do not form a valid JSON object.
+    """
+    decoder = SectionDecoder(sections)
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
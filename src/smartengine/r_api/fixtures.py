@@ -1,5 +1,8 @@
+import heapq
 import json
-import requests
+
+from . import cache, columnar, indexes, records
+from .. import instrumentation, session
 
 
 class FixturesApi:
@@ -15,14 +18,27 @@ class FixturesApi:
         user (str): Username for authentication to access the network system.
         password (str): Password for authentication.
         system_name (str): Name of the smartengine-system extracted from the JSON data.
+        snapshot_cache (cache.SnapshotCache): The cache the /rApi document is read from. Defaults to the 
+        process-wide cache shared by all rApi objects.
+        cache_ttl (float): Number of seconds a cached /rApi document stays valid for this object. None uses the 
+        TTL of the cache.
+        session_pool (session.SessionPool): The pool of keep-alive connections used to talk to the smartdirector. 
+        Pass session.shared_pool or any other pool to share connections between instances.
+        as_dict (bool): If True (the default), the get_* methods return new dictionaries on every call. If False, 
+        they return read-only RecordView mappings of compact records that are built once per snapshot.
+        sections (tuple): The top-level sections of the /rApi document that are decoded, "name" and "fixture". The other 
+        sections are skipped while the document is downloaded. None decodes the whole document. sensor_frame 
+        additionally reads the "location" section to group fixtures by location.
 
     Methods:
         __repr__: Returns a formal string representation of the FixturesApi instance.
         __str__: Returns a string representation of fixture information in JSON format.
+        refresh: Downloads a new copy of the /rApi document into the cache.
         get_all_fixtures: Retrieves detailed information about all fixtures.
         get_beacons: Fetches beacon information for fixtures based on specified sensor types.
         get_sensor_stats: Retrieves sensor statistics for specific sensors and sensor types.
         sort_fixtures: Sorts a list of fixtures based on a specified attribute and order.
+        sensor_frame: Returns a columnar NumPy view of the sensor stats of all fixtures.
 
     The class uses HTTP requests to communicate smartdirector and is capable of handling various fixture-related 
     queries and operations, such as retrieving all fixture data, filtering beacons, fetching sensor statistics, and 
@@ -33,12 +49,42 @@ class FixturesApi:
         fixture_data = api.get_all_fixtures()
         print(fixture_data)
     """
-    def __init__(self, user: str, password: str, ipv4_adress: str="192.168.1.1"):
+    as_dict = True
+    sections = ("name", "fixture")
+
+    def __init__(
+        self, 
+        user: str, 
+        password: str, 
+        ipv4_adress: str="192.168.1.1", 
+        cache_ttl: float=None, 
+        snapshot_cache: cache.SnapshotCache=None,
+        session_pool: session.SessionPool=None,
+        pool_maxsize: int=10,
+        as_dict: bool=True
+    ):
+        self._configure(user, password, ipv4_adress, cache_ttl, snapshot_cache, session_pool, pool_maxsize, as_dict)
+        self.system_name = self.json_["name"]
+
+
+    def _configure(
+        self,
+        user: str,
+        password: str,
+        ipv4_adress: str,
+        cache_ttl: float,
+        snapshot_cache: cache.SnapshotCache,
+        session_pool: session.SessionPool,
+        pool_maxsize: int,
+        as_dict: bool
+    ) -> None:
         self.ip = ipv4_adress
         self.user = user
         self.password = password
-        self.json_ = requests.get(f"https://{self.ip}/rApi", auth=(self.user, self.password), verify=False).json()
-        self.system_name = self.json_["name"]
+        self.cache_ttl = cache_ttl
+        self.as_dict = as_dict
+        self.snapshot_cache = cache.default_cache if snapshot_cache is None else snapshot_cache
+        self.session_pool = session.SessionPool(pool_maxsize=pool_maxsize) if session_pool is None else session_pool
         self.sensor_stats = [
             "illuminance",
             "ceillingTemperature",
@@ -63,6 +109,57 @@ class FixturesApi:
         return json.dumps(self.json_["fixture"], indent=4)
 
 
+    @property
+    def snapshot(self) -> cache.Snapshot:
+        """
+        The current snapshot of the /rApi document, downloaded through the cache if it is missing or expired.
+        """
+        return self.snapshot_cache.get(
+            self.ip, 
+            self.user, 
+            self.password, 
+            ttl=self.cache_ttl, 
+            session_pool=self.session_pool, 
+            sections=self.sections
+        )
+
+
+    @property
+    def json_(self) -> dict:
+        """
+        The decoded /rApi document of the current snapshot.
+        """
+        return self.snapshot.json_
+
+
+    @property
+    def index(self) -> indexes.SnapshotIndex:
+        """
+        The lookup indexes of the current snapshot, built once per snapshot.
+        """
+        return indexes.of(self.snapshot)
+
+
+    @property
+    def record_set(self) -> records.RecordSet:
+        """
+        The Fixture and Location records of the current snapshot, built once per snapshot.
+        """
+        return records.of(self.snapshot)
+
+
+    def refresh(self) -> None:
+        """
+        Downloads a new copy of the /rApi document into the cache, regardless of the age of the cached one.
+
+        Every object reading from the same cache and director sees the new document afterwards.
+        """
+        self.system_name = self.snapshot_cache.refresh(
+            self.ip, self.user, self.password, session_pool=self.session_pool, sections=self.sections
+        ).json_["name"]
+
+
+    @instrumentation.instrumented()
     def get_all_fixtures(self) -> list[dict]:
         """
         Retrieves all fixture information from the stored JSON data.
@@ -88,8 +185,12 @@ class FixturesApi:
         """
 
 
+        if not self.as_dict:
+            return [records.RecordView(fixture, records.FIXTURE) for fixture in self.record_set.fixtures]
+
+        json_ = self.json_
         all_fixtures = []
-        for element in self.json_["fixture"]:
+        for element in json_["fixture"]:
             fixture = {}
             fixture["serial_number"] = element["serialNum"]
             try:
@@ -106,6 +207,7 @@ class FixturesApi:
     
 
 
+    @instrumentation.instrumented()
     def get_beacons(self, sensor_type: list[str]=None) -> list[dict]:
         """
         Retrieves a list of beacons from the stored JSON data based on specified sensor types.
@@ -140,8 +242,16 @@ class FixturesApi:
         if sensor_type is None:
             sensor_type = ["LUMINAIRE", "WALL_SWITCH_5B", "SENSOR"]
 
+        if not self.as_dict:
+            return [
+                records.RecordView(fixture, records.BEACON) 
+                for fixture in self.record_set.fixtures 
+                if fixture.beacon_supported and fixture.type in sensor_type
+            ]
+
+        json_ = self.json_
         all_beacons = []
-        for element in self.json_["fixture"]:
+        for element in json_["fixture"]:
             try:
                 if element["beaconSupported"] == True and element["type"] in sensor_type:
                     beacon = {}
@@ -163,6 +273,7 @@ class FixturesApi:
 
 
 
+    @instrumentation.instrumented()
     def get_sensor_stats(self, *sensors: str, sensor_type: list[str]=None) -> list[dict]:
         """
         Retrieves sensor statistics for specified sensors and sensor types from stored JSON data.
@@ -199,28 +310,41 @@ class FixturesApi:
         if sensor_type is None:
             sensor_type = ["LUMINAIRE", "WALL_SWITCH_5B", "SENSOR"]
 
+        if not self.as_dict:
+            record_set = self.record_set
+            if len(sensors) > 0:
+                fixtures = [record_set.fixtures_by_serial.get(sensor) for sensor in sensors]
+            else:
+                fixtures = record_set.fixtures
+            return [
+                records.RecordView(fixture, records.SENSOR_STATS) 
+                for fixture in fixtures 
+                if fixture is not None and fixture.type in sensor_type
+            ]
+
+        index = self.index
         all_sensor_stats = []
         if len(sensors) > 0:
             for sensor in sensors:
-                for element in self.json_["fixture"]:
-                    if element["serialNum"] == sensor and element["type"] in sensor_type:
-                        stats = {}
-                        stats["serial_number"] = element["serialNum"]
-                        stats["stats"] = {}
-                        try:
-                            for key in element["sensorStats"]:
-                                try:
-                                    stats["stats"][key] = float(element["sensorStats"][key]["instant"])
-                                except KeyError:
-                                    stats["stats"][key] = None
-                        except KeyError:
-                            pass
-
-                        all_sensor_stats.append(stats)
+                element = index.fixtures_by_serial.get(sensor)
+                if element is not None and element["type"] in sensor_type:
+                    stats = {}
+                    stats["serial_number"] = element["serialNum"]
+                    stats["stats"] = {}
+                    try:
+                        for key in element["sensorStats"]:
+                            try:
+                                stats["stats"][key] = float(element["sensorStats"][key]["instant"])
+                            except KeyError:
+                                stats["stats"][key] = None
+                    except KeyError:
+                        pass
+
+                    all_sensor_stats.append(stats)
             
             return all_sensor_stats
         else:
-            for element in self.json_["fixture"]:
+            for element in index.json_["fixture"]:
                 if element["type"] in sensor_type:
                     stats = {}
                     stats["serial_number"] = element["serialNum"]
@@ -242,83 +366,168 @@ class FixturesApi:
         
 
 
-    def sort_fixtures(self, *fixtures: str, sort_by: str="power", order: str="ASC") -> list[dict]:
+    @instrumentation.instrumented()
+    def sort_fixtures(
+        self, 
+        *fixtures: str, 
+        sort_by: str | list="power", 
+        order: str="ASC", 
+        limit: int=None, 
+        lazy: bool=False
+    ) -> list[dict]:
         """
-        Sorts a list of fixtures based on a specified attribute and order.
+        Sorts a list of fixtures based on one or more attributes and orders.
 
         This method sorts fixtures by a specified attribute such as power, temperature, illuminance, etc., 
         in either ascending (ASC) or descending (DESC) order. If no fixtures are specified, it sorts all fixtures 
         in 'self.json_["fixture"]'. The method defaults to sorting by 'power' in ascending order if 'sort_by' or 
-        'order' parameters are not provided or are invalid.
+        'order' parameters are not provided or are invalid. Several attributes can be given to break ties, each 
+        with its own order, e.g. power DESC, then temperature ASC.
+
+        When only the first entries are needed, 'limit' selects them with a heap instead of sorting every fixture, 
+        and 'lazy' returns an iterator that only builds the dictionaries of the entries that are actually consumed.
 
         Parameters:
         - fixtures (str): Variable number of arguments, each a string representing a fixture's serial number.
-        - sort_by (str, optional): The attribute to sort the fixtures by. Defaults to "power".
+        - sort_by (str | list, optional): The attribute to sort the fixtures by, or a list of attributes. Entries 
+        of the list are either attribute names, which use 'order', or (attribute, order) tuples. Defaults to "power".
         - order (str, optional): The order of sorting, either "ASC" for ascending or "DESC" for descending. 
         Defaults to "ASC".
+        - limit (int, optional): Maximum number of fixtures to return. Defaults to None (all fixtures).
+        - lazy (bool, optional): If True, returns an iterator instead of a list. Defaults to False.
 
         Returns:
         - list[dict]: A sorted list of dictionaries, each representing a fixture. Each dictionary includes 
-        the fixture's serial number, name (if available), type, and the specified sorting attribute.
+        the fixture's serial number, name (if available), type, and every sorting attribute. An iterator over the 
+        same dictionaries if 'lazy' is True.
 
         Each dictionary in the returned list has the following structure:
             {
                 "serial_number": <fixture_serial_number>,
                 "name": <fixture_name> or None if not specified,
                 "type": <fixture_type>,
-                <sort_by>: <value_of_sort_by_attribute>
+                <sort_by>: <value_of_sort_by_attribute>,
+                ...
             }
 
         Notes:
-        - The method ensures the 'sort_by' attribute is one of the predefined sensor attributes. If not, it defaults 
-        to "power".
+        - The method ensures the 'sort_by' attributes are predefined sensor attributes. Unknown attributes are 
+        ignored, and if none is left it defaults to "power". Invalid orders default to "ASC".
         - The method converts the sorting attribute value to a float for numerical sorting. In cases where the 
         attribute value is missing, it is set to infinity (float("inf")).
-        - Sorting is applied based on the provided 'order' parameter (ascending or descending).
-        """
-        if sort_by in self.sensor_stats:
-            pass
-        else:
-            sort_by = "power"
+        - Sorting is stable: fixtures with equal values keep their document order (or the order they were given in).
 
+        Example:
+        >>> api.sort_fixtures(sort_by=[("power", "DESC"), ("temperature", "ASC")], limit=10)
+        """
         if order in ["ASC", "DESC"]:
             pass
         else:
             order = "ASC"
-        sorted_fixtures = []
+
+        sort_keys = []
+        for key in [sort_by] if isinstance(sort_by, str) else sort_by:
+            stat, key_order = (key, order) if isinstance(key, str) else key
+            if stat in self.sensor_stats:
+                sort_keys.append((stat, key_order == "DESC"))
+        if not sort_keys:
+            sort_keys = [("power", order == "DESC")]
+
+        index = self.index
         if len(fixtures) > 0:
-            for serialnumber in fixtures:
-                for element in self.json_["fixture"]:
-                    if element["serialNum"] == serialnumber:
-                        fixture = {}
-                        fixture["serial_number"] = element["serialNum"]
-                        try:
-                            fixture["name"] = element["name"]
-                        except KeyError:
-                             fixture["name"] = None
-                        fixture["type"] = element["type"]
-                        try:
-                            fixture[sort_by] = float(element["sensorStats"][sort_by]["instant"])
-                        except KeyError:
-                            fixture[sort_by] = float("inf")
-                        sorted_fixtures.append(fixture)
+            elements = [index.fixtures_by_serial[serial] for serial in fixtures if serial in index.fixtures_by_serial]
         else:
-            for element in self.json_["fixture"]:
-                fixture = {}
-                fixture["serial_number"] = element["serialNum"]
-                try:
-                    fixture["name"] = element["name"]
-                except KeyError:
-                    fixture["name"] = None
-                fixture["type"] = element["type"]
-                try:
-                    fixture[sort_by] = float(element["sensorStats"][sort_by]["instant"])
-                except KeyError:
-                    fixture[sort_by] = float("inf")
-                sorted_fixtures.append(fixture)
-        if order == "ASC":
-            sorted_fixtures.sort(key=lambda element: element[sort_by])
-            return sorted_fixtures
+            elements = index.json_["fixture"]
+
+        def sort_key(element):
+            values = []
+            for stat, descending in sort_keys:
+                value = self._stat_value(element, stat)
+                values.append(-value if descending else value)
+            return values
+
+        if limit is None:
+            selected = sorted(elements, key=sort_key)
+        else:
+            selected = heapq.nsmallest(limit, elements, key=sort_key)
+
+        if self.as_dict:
+            sorted_fixtures = (self._sort_entry(element, sort_keys) for element in selected)
         else:
-            sorted_fixtures.sort(key=lambda element: element[sort_by], reverse=True)
+            record_set = self.record_set
+            shape = self._sort_shape(sort_keys)
+            sorted_fixtures = (
+                records.RecordView(record_set.fixtures_by_serial[element["serialNum"]], shape) for element in selected
+            )
+        if lazy:
             return sorted_fixtures
+        return list(sorted_fixtures)
+
+
+    @staticmethod
+    def _stat_value(element: dict, stat: str) -> float:
+        try:
+            return float(element["sensorStats"][stat]["instant"])
+        except KeyError:
+            return float("inf")
+
+
+    def _sort_shape(self, sort_keys: list[tuple]) -> records.Shape:
+        getters = dict(records.FIXTURE.getters)
+        for stat, descending in sort_keys:
+            getters[stat] = lambda record, stat=stat: self._stat_value(record._element, stat)
+        return records.Shape(**getters)
+
+
+    def _sort_entry(self, element: dict, sort_keys: list[tuple]) -> dict:
+        fixture = {}
+        fixture["serial_number"] = element["serialNum"]
+        try:
+            fixture["name"] = element["name"]
+        except KeyError:
+            fixture["name"] = None
+        fixture["type"] = element["type"]
+        for stat, descending in sort_keys:
+            fixture[stat] = self._stat_value(element, stat)
+        return fixture
+
+
+
+
+    @instrumentation.instrumented()
+    def sensor_frame(self) -> columnar.StatsFrame:
+        """
+        Returns a columnar NumPy view of the sensor stats of all fixtures.
+
+        The frame is built once per snapshot and holds one float64 array per stat in 'self.sensor_stats', with NaN 
+        where a fixture does not report a stat. Fixtures can be aggregated by "type" and by owning "location" id 
+        without building any dictionaries per fixture. Since the owning locations are listed in the "location" 
+        section, the snapshot is read with that section in addition to 'self.sections'. Requires the optional numpy 
+        dependency.
+
+        Returns:
+        - columnar.StatsFrame: The columnar view of the current snapshot.
+
+        Raises:
+        - ImportError: If numpy is not installed.
+
+        Example:
+        >>> frame = api.sensor_frame()
+        >>> frame.mean_by("power", by="type")
+        {'LUMINAIRE': 12.4, 'SENSOR': 0.8}
+        >>> frame.select(frame.mask("temperature", gt=30))
+        array(['000000000SVS1Z00977HS999000'], dtype=object)
+        """
+        stats = self.sensor_stats
+        sections = None if self.sections is None else (*self.sections, "location")
+        snapshot = self.snapshot
+        if not snapshot.covers(sections):
+            snapshot = self.snapshot_cache.get(
+                self.ip, 
+                self.user, 
+                self.password, 
+                ttl=self.cache_ttl, 
+                session_pool=self.session_pool, 
+                sections=sections
+            )
+        return snapshot.derived("sensor_frame", lambda snapshot: columnar.fixture_frame(snapshot, stats))
@@ -0,0 +1,322 @@
+import collections
+
+from . import indexes
+
+
+class LocationTree:
+    """
+    The location hierarchy of one /rApi snapshot with precomputed subtree aggregates of the location sensor stats.
+
+    The tree is built once per snapshot from the 'childLocation' and 'childFixture' fields of the locations. Parents,
+    children and the fixtures of a whole subtree are stored per location, so every lookup is a single dictionary
+    access. For every location, the sum, count, minimum and maximum of each numeric sensor stat over the location
+    and all of its descendant locations are computed up front, bottom-up: the aggregates of a location are rolled up
+    from its own values and the aggregates of its children, so every location is visited once. When the stats of a
+    location change in place (see SnapshotMirror), only the aggregates of that location and its ancestors are
+    adjusted.
+
+    Stat values are converted with float() like in get_sensor_stats, so numeric strings count. Booleans, NaN and
+    values that are not numbers are left out.
+
+    A location listed by several parents belongs to the subtree of each of them, but is counted only once per
+    subtree. Entries of 'childLocation' that do not match a location of the snapshot are ignored, and cycles are
+    broken at the first repeated location. Subtrees that contain such shared locations or cycles cannot be rolled up
+    from their children and are aggregated over their descendants instead.
+
+    Attributes:
+        roots (list): The ids of all locations without a parent, in document order.
+        NotFoundInApiError (int): Custom error code for unknown locations.
+
+    Methods:
+        parent: Returns the id of the parent of a location.
+        children: Returns the ids of the direct children of a location.
+        ancestors: Returns the ids of all ancestors of a location, nearest first.
+        descendants: Returns the ids of all descendant locations.
+        fixtures: Returns the serial numbers of all fixtures in the subtree of a location.
+        aggregate: Returns the subtree aggregate of a single stat.
+        aggregates: Returns the subtree aggregates of all stats.
+        element_updated: Recomputes the aggregates along the ancestor path of a changed location.
+
+    Example:
+        tree = api.location_tree()
+        for child in tree.children(101):
+            print(child, tree.aggregate(child, "power")["sum"])
+    """
+    def __init__(self, snapshot):
+        index = indexes.of(snapshot)
+        self.NotFoundInApiError = 8080
+        self._index = index
+        self._parents = {id_: [] for id_ in index.locations_by_id}
+        self._children = {}
+        self._values = {}
+        self._aggregates = {}
+        self._fixtures = {}
+        self._rolled_up = {}
+
+        ids_by_text = {str(id_): id_ for id_ in index.locations_by_id}
+        for id_, element in index.locations_by_id.items():
+            children = []
+            for child_location in element.get("childLocation") or []:
+                child = ids_by_text.get(str(child_location).rsplit("/", 1)[-1])
+                if child is not None and child != id_ and child not in children:
+                    children.append(child)
+                    self._parents[child].append(id_)
+            self._children[id_] = children
+            self._values[id_] = self._numeric_stats(element)
+
+        self.roots = [id_ for id_, parents in self._parents.items() if not parents]
+        for id_ in index.locations_by_id:
+            self._build(id_)
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(locations={len(self._children)}, roots={len(self.roots)})"
+
+
+    def __contains__(self, location):
+        try:
+            self._resolve(location)
+        except ValueError:
+            return False
+        return True
+
+
+    def parent(self, location) -> object:
+        """
+        Returns the id of the parent of a location, or None for a root location. A location with several parents
+        returns the first one in document order.
+
+        Parameters:
+        - location (str | int): A location id or name.
+
+        Raises:
+        - ValueError: If the location is not part of the snapshot.
+        """
+        parents = self._parents[self._resolve(location)]
+        return parents[0] if parents else None
+
+
+    def children(self, location) -> list:
+        """
+        Returns the ids of the direct children of a location, in the order of its 'childLocation' field.
+        """
+        return list(self._children[self._resolve(location)])
+
+
+    def ancestors(self, location) -> list:
+        """
+        Returns the ids of all ancestors of a location, nearest first.
+        """
+        location = self._resolve(location)
+        ancestors = []
+        seen = {location}
+        pending = collections.deque(self._parents[location])
+        while pending:
+            id_ = pending.popleft()
+            if id_ not in seen:
+                seen.add(id_)
+                ancestors.append(id_)
+                pending.extend(self._parents[id_])
+        return ancestors
+
+
+    def descendants(self, location) -> list:
+        """
+        Returns the ids of all locations below a location, depth first.
+        """
+        location = self._resolve(location)
+        descendants = []
+        seen = {location}
+        pending = list(reversed(self._children[location]))
+        while pending:
+            id_ = pending.pop()
+            if id_ not in seen:
+                seen.add(id_)
+                descendants.append(id_)
+                pending.extend(reversed(self._children[id_]))
+        return descendants
+
+
+    def fixtures(self, location) -> tuple:
+        """
+        Returns the serial numbers of all fixtures in a location and its descendant locations, without duplicates.
+        """
+        return self._fixtures[self._resolve(location)]
+
+
+    def aggregate(self, location, stat: str) -> dict:
+        """
+        Returns the aggregate of a sensor stat over a location and all of its descendant locations.
+
+        Parameters:
+        - location (str | int): A location id or name.
+        - stat (str): The sensor stat to aggregate, e.g. "power".
+
+        Returns:
+        - dict: The keys "sum", "count", "min", "max" and "mean". All of them are None, and "count" is 0, if no
+        location of the subtree reports the stat.
+
+        Raises:
+        - ValueError: If the location is not part of the snapshot.
+        """
+        return self._summary(self._aggregates[self._resolve(location)].get(stat))
+
+
+    def aggregates(self, location) -> dict:
+        """
+        Returns the subtree aggregates of every sensor stat reported anywhere in the subtree of a location.
+
+        Returns:
+        - dict: Maps every stat to a dictionary as returned by aggregate.
+        """
+        return {
+            stat: self._summary(aggregate) for stat, aggregate in self._aggregates[self._resolve(location)].items()
+        }
+
+
+    def element_updated(self, entity: str, id_, element: dict) -> None:
+        """
+        Called by the snapshot when the sensor stats of an element change in place. Adjusts the aggregates of the
+        changed location and of its ancestors by the difference between the old and the new values. When the minimum
+        or maximum of a location was the value that changed, it is rolled up again from the aggregates of its children.
+        """
+        if entity != "location" or id_ not in self._values:
+            return
+        old = self._values[id_]
+        new = self._values[id_] = self._numeric_stats(element)
+        changed = [stat for stat in dict.fromkeys([*old, *new]) if old.get(stat) != new.get(stat)]
+        if not changed:
+            return
+        for node in dict.fromkeys([id_, *self.ancestors(id_)]):
+            aggregates = self._aggregates[node]
+            for stat in changed:
+                before, after = old.get(stat), new.get(stat)
+                aggregate = aggregates.get(stat)
+                if aggregate is None:
+                    aggregates[stat] = [after, 1, after, after]
+                    continue
+                aggregate[0] += (after or 0.0) - (before or 0.0)
+                aggregate[1] += (after is not None) - (before is not None)
+                if aggregate[1] == 0:
+                    del aggregates[stat]
+                elif before is not None and before in (aggregate[2], aggregate[3]):
+                    aggregates[stat] = self._roll_up(node, stat)[stat]
+                elif after is not None:
+                    aggregate[2] = min(aggregate[2], after)
+                    aggregate[3] = max(aggregate[3], after)
+
+
+    def _resolve(self, location) -> object:
+        try:
+            if location in self._children:
+                return location
+        except TypeError:
+            pass
+        elements = self._index.find_locations(location)
+        if not elements:
+            raise ValueError(f"Error: {self.NotFoundInApiError} - Location {location} could not be found")
+        return elements[0]["id"]
+
+
+    def _build(self, id_) -> None:
+        if id_ in self._aggregates:
+            return
+        visiting = {id_}
+        cut = set()
+        pending = [(id_, iter(self._children[id_]))]
+        while pending:
+            location, children = pending[-1]
+            child = next(children, _DONE)
+            if child is _DONE:
+                pending.pop()
+                visiting.discard(location)
+                self._finish(location, location in cut)
+            elif child in visiting:
+                cut.add(location)
+            elif child not in self._aggregates:
+                visiting.add(child)
+                pending.append((child, iter(self._children[child])))
+
+
+    def _finish(self, id_, cut: bool) -> None:
+        children = self._children[id_]
+        rolled_up = not cut and all(self._rolled_up[child] and len(self._parents[child]) == 1 for child in children)
+        self._rolled_up[id_] = rolled_up
+        if rolled_up:
+            fixtures = dict.fromkeys(self._index.fixtures_in_location.get(id_, []))
+            for child in children:
+                fixtures.update(dict.fromkeys(self._fixtures[child]))
+        else:
+            fixtures = {}
+            for location in [id_, *self.descendants(id_)]:
+                fixtures.update(dict.fromkeys(self._index.fixtures_in_location.get(location, [])))
+        self._fixtures[id_] = tuple(fixtures)
+        self._aggregates[id_] = self._roll_up(id_)
+
+
+    def _roll_up(self, id_, *stats: str) -> dict:
+        if self._rolled_up[id_]:
+            locations, parts = [id_], [self._aggregates[child] for child in self._children[id_]]
+        else:
+            locations, parts = [id_, *self.descendants(id_)], []
+        aggregates = {}
+        for location in locations:
+            for stat, value in self._values[location].items():
+                if not stats or stat in stats:
+                    self._merge(aggregates, stat, value, 1, value, value)
+        for part in parts:
+            for stat, (total, count, minimum, maximum) in part.items():
+                if not stats or stat in stats:
+                    self._merge(aggregates, stat, total, count, minimum, maximum)
+        return aggregates
+
+
+    @staticmethod
+    def _merge(aggregates: dict, stat: str, total: float, count: int, minimum: float, maximum: float) -> None:
+        aggregate = aggregates.get(stat)
+        if aggregate is None:
+            aggregates[stat] = [total, count, minimum, maximum]
+        else:
+            aggregate[0] += total
+            aggregate[1] += count
+            aggregate[2] = min(aggregate[2], minimum)
+            aggregate[3] = max(aggregate[3], maximum)
+
+
+    @staticmethod
+    def _numeric_stats(element: dict) -> dict:
+        values = {}
+        for stat, value in (element.get("sensorStats") or {}).items():
+            if isinstance(value, dict):
+                value = value.get("instant")
+            if isinstance(value, bool):
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if value == value:
+                values[stat] = value
+        return values
+
+
+    @staticmethod
+    def _summary(aggregate: list) -> dict:
+        if aggregate is None:
+            return {"sum": None, "count": 0, "min": None, "max": None, "mean": None}
+        total, count, minimum, maximum = aggregate
+        return {"sum": total, "count": count, "min": minimum, "max": maximum, "mean": total / count}
+
+
+
+
+def of(snapshot) -> LocationTree:
+    """
+    Returns the location tree of a snapshot, building it on first access.
+    """
+    return snapshot.derived("hierarchy", LocationTree)
+
+
+
+
+_DONE = object()
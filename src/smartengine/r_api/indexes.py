@@ -0,0 +1,91 @@
+class SnapshotIndex:
+    """
+    Hash indexes over the fixtures and locations of one /rApi snapshot.
+
+    The index is built once per snapshot with a single pass over the 'fixture' and 'location' lists, so lookups by
+    serial number, location id or location name no longer need a scan of the whole document. All indexes reference
+    the original elements of the document instead of copying them.
+
+    Attributes:
+        json_ (dict): The /rApi document the index was built from.
+        fixtures_by_serial (dict): Maps a fixture serial number to its fixture element.
+        fixtures_by_type (dict): Maps a fixture type to the list of fixture elements of that type.
+        locations_by_id (dict): Maps a location id to its location element.
+        locations_by_name (dict): Maps a location name to the list of location elements with that name.
+        locations_by_fixture (dict): Maps a fixture serial number to the list of location elements that list the
+        fixture in their 'childFixture' field.
+        fixtures_in_location (dict): Maps a location id to the list of fixture serial numbers in its 'childFixture'
+        field.
+
+    Methods:
+        find_locations: Returns all locations whose id or name matches the given identifier.
+        element_updated: Called when the sensor stats of an element change in place; the index stays valid.
+
+    Example:
+        index = SnapshotIndex(snapshot)
+        fixture = index.fixtures_by_serial["000000000SVS1Z00977HS999000"]
+    """
+    def __init__(self, snapshot):
+        self.json_ = snapshot.json_
+        self.fixtures_by_serial = {}
+        self.fixtures_by_type = {}
+        self.locations_by_id = {}
+        self.locations_by_name = {}
+        self.locations_by_fixture = {}
+        self.fixtures_in_location = {}
+        self._locations_by_key = {}
+
+        for element in self.json_.get("fixture", []):
+            self.fixtures_by_serial.setdefault(element["serialNum"], element)
+            self.fixtures_by_type.setdefault(element.get("type"), []).append(element)
+
+        for element in self.json_.get("location", []):
+            self.locations_by_id.setdefault(element["id"], element)
+            self.locations_by_name.setdefault(element["name"], []).append(element)
+            self._locations_by_key.setdefault(element["id"], []).append(element)
+            if element["name"] != element["id"]:
+                self._locations_by_key.setdefault(element["name"], []).append(element)
+
+            serials = [child_fixture[9:] for child_fixture in element.get("childFixture") or []]
+            self.fixtures_in_location.setdefault(element["id"], serials)
+            for serial in dict.fromkeys(serials):
+                self.locations_by_fixture.setdefault(serial, []).append(element)
+
+
+    def __repr__(self):
+        return (
+            f"{__class__.__name__}(fixtures={len(self.fixtures_by_serial)}, "
+            f"locations={len(self.locations_by_id)})"
+        )
+
+
+    def element_updated(self, entity: str, id_, element: dict) -> None:
+        """
+        Called by the snapshot when the sensor stats of an element change in place. The index only references the 
+        elements, so it stays valid and nothing needs to be done.
+        """
+
+
+    def find_locations(self, location: str) -> list[dict]:
+        """
+        Returns every location element whose id or name equals the given identifier, in document order.
+
+        Parameters:
+        - location (str | int): A location id or name.
+
+        Returns:
+        - list[dict]: The matching location elements. Empty if nothing matches.
+        """
+        try:
+            return self._locations_by_key.get(location, [])
+        except TypeError:
+            return []
+
+
+
+
+def of(snapshot) -> SnapshotIndex:
+    """
+    Returns the index of a snapshot, building it on first access.
+    """
+    return snapshot.derived("index", SnapshotIndex)
@@ -1,5 +1,7 @@
 import json
-import requests
+
+from . import cache, columnar, hierarchy, indexes, records
+from .. import instrumentation, session
 
 
 class LocationsApi:
@@ -15,14 +17,28 @@ class LocationsApi:
         user (str): Username for authentication to access the network system.
         password (str): Password for authentication.
         system_name (str): Name of the smartengine-system extracted from the JSON data.
+        snapshot_cache (cache.SnapshotCache): The cache the /rApi document is read from. Defaults to the 
+        process-wide cache shared by all rApi objects.
+        cache_ttl (float): Number of seconds a cached /rApi document stays valid for this object. None uses the 
+        TTL of the cache.
+        session_pool (session.SessionPool): The pool of keep-alive connections used to talk to the smartdirector. 
+        Pass session.shared_pool or any other pool to share connections between instances.
+        as_dict (bool): If True (the default), the get_* methods return new dictionaries on every call. If False, 
+        they return read-only RecordView mappings of compact records that are built once per snapshot.
+        sections (tuple): The top-level sections of the /rApi document that are decoded, "name" and "location". The other 
+        sections are skipped while the document is downloaded. None decodes the whole document.
 
     Methods:
         __repr__: Returns a formal representation of the LocationsApi instance.
         __str__: Returns a string representation of the location information in JSON format.
+        refresh: Downloads a new copy of the /rApi document into the cache.
         get_all_locations: Retrieves a list of all locations along with their details from the JSON data.
         fixture_in_location: Maps fixture serial numbers to their respective locations.
         get_scenes: Gathers scene control information for specified locations.
         get_location_stats: Collects and returns statistics for specified locations.
+        location_frame: Returns a columnar NumPy view of the sensor stats of all locations.
+        location_tree: Returns the location hierarchy with precomputed subtree aggregates.
+        get_subtree_stats: Collects the aggregated sensor stats of locations and everything below them.
 
     The class uses HTTP requests to fetch data from the specified IP address. It parses the JSON data to provide 
     easy access to various location-based information like fixtures, scenes, and location statistics.
@@ -32,12 +48,27 @@ class LocationsApi:
         locations = api.get_all_locations()
         print(locations)
     """
-
-    def __init__(self, user: str, password: str, ipv4_adress: str="192.168.1.1"):
+    as_dict = True
+    sections = ("name", "location")
+
+    def __init__(
+        self, 
+        user: str, 
+        password: str, 
+        ipv4_adress: str="192.168.1.1", 
+        cache_ttl: float=None, 
+        snapshot_cache: cache.SnapshotCache=None,
+        session_pool: session.SessionPool=None,
+        pool_maxsize: int=10,
+        as_dict: bool=True
+    ):
         self.ip = ipv4_adress
         self.user = user
         self.password = password
-        self.json_ = requests.get(f"https://{self.ip}/rApi", auth=(self.user, self.password), verify=False).json()
+        self.cache_ttl = cache_ttl
+        self.as_dict = as_dict
+        self.snapshot_cache = cache.default_cache if snapshot_cache is None else snapshot_cache
+        self.session_pool = session.SessionPool(pool_maxsize=pool_maxsize) if session_pool is None else session_pool
         self.system_name = self.json_["name"]
 
 
@@ -47,8 +78,59 @@ class LocationsApi:
     
     def __str__(self):
         return json.dumps(self.json_["location"], indent=4)
+
+
+    @property
+    def snapshot(self) -> cache.Snapshot:
+        """
+        The current snapshot of the /rApi document, downloaded through the cache if it is missing or expired.
+        """
+        return self.snapshot_cache.get(
+            self.ip, 
+            self.user, 
+            self.password, 
+            ttl=self.cache_ttl, 
+            session_pool=self.session_pool, 
+            sections=self.sections
+        )
+
+
+    @property
+    def json_(self) -> dict:
+        """
+        The decoded /rApi document of the current snapshot.
+        """
+        return self.snapshot.json_
+
+
+    @property
+    def index(self) -> indexes.SnapshotIndex:
+        """
+        The lookup indexes of the current snapshot, built once per snapshot.
+        """
+        return indexes.of(self.snapshot)
+
+
+    @property
+    def record_set(self) -> records.RecordSet:
+        """
+        The Fixture and Location records of the current snapshot, built once per snapshot.
+        """
+        return records.of(self.snapshot)
+
+
+    def refresh(self) -> None:
+        """
+        Downloads a new copy of the /rApi document into the cache, regardless of the age of the cached one.
+
+        Every object reading from the same cache and director sees the new document afterwards.
+        """
+        self.system_name = self.snapshot_cache.refresh(
+            self.ip, self.user, self.password, session_pool=self.session_pool, sections=self.sections
+        ).json_["name"]
     
 
+    @instrumentation.instrumented()
     def get_all_locations(self) -> list[dict]:
         """
         Retrieves all location information from the stored JSON data.
@@ -72,8 +154,12 @@ class LocationsApi:
         - The method safely handles 'KeyError' if the 'childLocation' key is missing in any of the location entries 
         in 'self.json_', defaulting the 'child_location' value to False in such cases.
         """
+        if not self.as_dict:
+            return [records.RecordView(location, records.LOCATION) for location in self.record_set.locations]
+
+        json_ = self.json_
         all_locations = []
-        for element in self.json_["location"]:
+        for element in json_["location"]:
             location = {}
             location["id"] = element["id"]
             location["name"] = element["name"]
@@ -89,6 +175,7 @@ class LocationsApi:
 
 
     
+    @instrumentation.instrumented()
     def fixture_in_location(self, *fixtures: str) -> list[dict]:
         """
         Maps given fixture serial numbers to their corresponding room details.
@@ -121,27 +208,21 @@ class LocationsApi:
         - The method handles 'KeyError' if the 'childFixture' key is missing in the JSON object and continues 
         processing other fixtures.
         """
+        index = self.index
         mapping = []
         if len(fixtures) > 0:
             for sensor in fixtures:
-                for element in self.json_["location"]:
-                    try:
-                        if element["childFixture"]:
-                            for serial in element["childFixture"]:
-                                if sensor == serial[9:]:
-                                    link = {}
-                                    link["fixture"] = sensor
-                                    link["room_id"] = element["id"]
-                                    link["room_name"] = element["name"]
-                                    link["room_fixtures"] = []
-
-                                    for childFixture in element["childFixture"]:
-                                        childFixture = childFixture[9:]
-                                        link["room_fixtures"].append(childFixture)
-                                    mapping.append(link)
-                                    break
-                    except KeyError:
-                        continue
+                for element in index.locations_by_fixture.get(sensor, []):
+                    link = {}
+                    link["fixture"] = sensor
+                    link["room_id"] = element["id"]
+                    link["room_name"] = element["name"]
+                    link["room_fixtures"] = []
+
+                    for childFixture in element["childFixture"]:
+                        childFixture = childFixture[9:]
+                        link["room_fixtures"].append(childFixture)
+                    mapping.append(link)
             return mapping
         else:
             raise ValueError("Argument - fixtures - is missing")
@@ -150,6 +231,7 @@ class LocationsApi:
 
 
 
+    @instrumentation.instrumented()
     def get_scenes(self, *locations: str) -> list[dict]:
         """
         Gathers scene control data for specified rooms based on location identifiers.
@@ -184,28 +266,29 @@ class LocationsApi:
         - If a location identifier in the 'locations' list does not match any room in 'self.json_', it is 
         ignored and processing continues with the next identifier.
         """
+        index = self.index
+        if not self.as_dict:
+            return self._views(index, locations, records.SCENES)
+
         all_room_scenes = []
         if len(locations) > 0:
             for location in locations:
-                for element in self.json_["location"]:
-                    if element["id"] == location or element["name"] == location:
-                        room = {}
-                        room["id"] = element["id"]
-                        room["name"] = element["name"]
-                        room["scenes"] = {}
-                        try:
-                            for scene in element["sceneControl"]["scene"]:
-                                room["scenes"][scene["name"]] = scene["order"]
-                        except KeyError:
-                            all_room_scenes.append(room)
-                            pass
-                        else:
-                            all_room_scenes.append(room)
-                    else:
+                for element in index.find_locations(location):
+                    room = {}
+                    room["id"] = element["id"]
+                    room["name"] = element["name"]
+                    room["scenes"] = {}
+                    try:
+                        for scene in element["sceneControl"]["scene"]:
+                            room["scenes"][scene["name"]] = scene["order"]
+                    except KeyError:
+                        all_room_scenes.append(room)
                         pass
+                    else:
+                        all_room_scenes.append(room)
             return all_room_scenes
         else:
-            for element in self.json_["location"]:
+            for element in index.json_["location"]:
                 room = {}
                 room["id"] = element["id"]
                 room["name"] = element["name"]
@@ -224,6 +307,7 @@ class LocationsApi:
 
 
 
+    @instrumentation.instrumented()
     def get_location_stats(self, *locations: str) -> list[dict]:
         """
         Collects and returns statistics for specified locations.
@@ -257,28 +341,29 @@ class LocationsApi:
         - If a location identifier in the 'locations' list does not match any location in 'self.json_', it is 
         ignored and processing continues with the next identifier.
         """
+        index = self.index
+        if not self.as_dict:
+            return self._views(index, locations, records.LOCATION_STATS)
+
         all_location_stats = []
         if len(locations) > 0:
             for location in locations:
-                for element in self.json_["location"]:
-                    if element["id"] == location or element["name"] == location:
-                        room = {}
-                        room["id"] = element["id"]
-                        room["name"] = element["name"]
-                        room["room_stats"] = {}
-                        try:
-                            for key in element["sensorStats"]:
-                                room["room_stats"][key] = element["sensorStats"][key]["instant"]
-                        except KeyError:
-                            all_location_stats.append(room)
-                            pass
-                        else:
-                            all_location_stats.append(room)
-                    else:
+                for element in index.find_locations(location):
+                    room = {}
+                    room["id"] = element["id"]
+                    room["name"] = element["name"]
+                    room["room_stats"] = {}
+                    try:
+                        for key in element["sensorStats"]:
+                            room["room_stats"][key] = element["sensorStats"][key]["instant"]
+                    except KeyError:
+                        all_location_stats.append(room)
                         pass
+                    else:
+                        all_location_stats.append(room)
             return all_location_stats
         else:
-            for element in self.json_["location"]:
+            for element in index.json_["location"]:
                 room = {}
                 room["id"] = element["id"]
                 room["name"] = element["name"]
@@ -293,3 +378,88 @@ class LocationsApi:
                     all_location_stats.append(room)
             return all_location_stats
         
+
+
+
+
+    def _views(self, index: indexes.SnapshotIndex, locations: tuple, shape: records.Shape) -> list[records.RecordView]:
+        record_set = self.record_set
+        if len(locations) == 0:
+            return [records.RecordView(location, shape) for location in record_set.locations]
+        return [
+            records.RecordView(record_set.record_of(element), shape) 
+            for location in locations 
+            for element in index.find_locations(location)
+        ]
+
+
+    @instrumentation.instrumented()
+    def location_frame(self) -> columnar.StatsFrame:
+        """
+        Returns a columnar NumPy view of the sensor stats of all locations.
+
+        The frame is built once per snapshot and holds one float64 array for every stat any location reports, with 
+        NaN where a location does not report a stat. Locations are grouped by the id of their "parent" location, so
+        mean_by, min_by and max_by aggregate the rooms of every floor. Requires the optional numpy dependency.
+
+        Returns:
+        - columnar.StatsFrame: The columnar view of the current snapshot.
+
+        Raises:
+        - ImportError: If numpy is not installed.
+        """
+        return self.snapshot.derived("location_frame", columnar.location_frame)
+
+
+    def location_tree(self) -> hierarchy.LocationTree:
+        """
+        Returns the location hierarchy of the current snapshot.
+
+        The tree is built once per snapshot from the 'childLocation' and 'childFixture' fields and answers parent,
+        children and descendant-fixture lookups without scanning the document. It also holds the sum, count, minimum,
+        maximum and mean of every numeric sensor stat over each location and its descendants.
+
+        Returns:
+        - hierarchy.LocationTree: The location tree of the current snapshot.
+        """
+        return hierarchy.of(self.snapshot)
+
+
+    @instrumentation.instrumented()
+    def get_subtree_stats(self, *locations: str) -> list[dict]:
+        """
+        Collects the sensor stats of locations aggregated over the location and all locations below it, e.g. the 
+        total power and the average temperature of a floor or a building.
+
+        Parameters:
+        - locations (str | int): Location ids or names. If empty, the stats of all root locations are returned.
+
+        Returns:
+        - list[dict]: One dictionary per matching location, in the order of 'locations'. Unknown locations are 
+        skipped. Each dictionary has the following structure:
+            {
+                "id": <location_id>,
+                "name": <location_name>,
+                "fixtures": <number of fixtures in the subtree>,
+                "subtree_stats": {
+                    <sensor_stat_key>: {"sum": ..., "count": ..., "min": ..., "max": ..., "mean": ...},
+                    ...
+                }
+            }
+        """
+        index = self.index
+        tree = self.location_tree()
+        if len(locations) > 0:
+            elements = [element for location in locations for element in index.find_locations(location)]
+        else:
+            elements = [index.locations_by_id[id_] for id_ in tree.roots]
+
+        all_subtree_stats = []
+        for element in elements:
+            all_subtree_stats.append({
+                "id": element["id"],
+                "name": element["name"],
+                "fixtures": len(tree.fixtures(element["id"])),
+                "subtree_stats": tree.aggregates(element["id"]),
+            })
+        return all_subtree_stats
@@ -0,0 +1,267 @@
+import threading
+import time
+
+from . import cache, indexes
+from ..u_api import subscribe
+
+
+class SnapshotMirror:
+    """
+    Keeps the /rApi snapshot of an rApi object current with the change-only payloads of a uApi subscription.
+
+    The mirror loads the snapshot of the rApi object once and pins it, so the object no longer downloads the /rApi
+    document when the cache TTL expires. The pinned snapshot holds every section the object reads, including the
+    "location" section sensor_frame needs, and lookups the snapshot cannot serve raise a RuntimeError instead of
+    replacing it. A background thread then subscribes to every fixture and location of the snapshot over a single
+    uApi stream and writes each changed value into the in-memory fixture and location records. Every get_* call of
+    the rApi object therefore returns near-real-time values without polling. Derived structures such as the columnar
+    frames are updated along with the records.
+
+    The subscription is a ResilientStream, so it reconnects when the connection is lost and catches up with the
+    full payload the uApi sends after each reconnect. If it ends anyway, e.g. because the director rejects the
+    credentials or 'max_reconnects' attempts failed, 'running' turns False, 'error' holds the reason and check()
+    raises it.
+
+    Attributes:
+        rapi (rApi): The rApi (or FixturesApi/LocationsApi) object whose snapshot is mirrored.
+        uapi (ApiSubscription): The uApi object used for the subscription.
+        sensor_stats (list[str]): The sensor stats to subscribe to. None subscribes to all of them.
+        options (dict): Passed on to resilient.ResilientStream, e.g. idle_timeout or max_reconnects.
+        snapshot (cache.Snapshot): The mirrored snapshot, None before start() was called.
+        stream (resilient.ResilientStream): The subscription, None before start() was called.
+        last_update (float): UNIX timestamp of the last applied update, None if nothing was applied yet.
+        error (Exception): The exception that ended the subscription thread, if any.
+
+    Methods:
+        start: Pins the snapshot and starts the subscription thread.
+        stop: Stops the subscription and gives the rApi object its original cache back.
+        check: Raises the error that ended the subscription.
+        apply: Applies a single uApi subscription message to the snapshot.
+        staleness: Returns the number of seconds since a fixture or location was last updated.
+        stale: Returns all fixtures and locations that were not updated within a given number of seconds.
+
+    Example:
+        mirror = SnapshotMirror(rapi, uapi)
+        mirror.start()
+        print(rapi.get_location_stats(101), mirror.version, mirror.staleness("location", 101))
+        mirror.check()
+        mirror.stop()
+    """
+    def __init__(self, rapi, uapi: subscribe.ApiSubscription, sensor_stats: list[str]=None, **options):
+        self.rapi = rapi
+        self.uapi = uapi
+        self.sensor_stats = sensor_stats
+        self.options = options
+        self.snapshot = None
+        self.stream = None
+        self.last_update = None
+        self.error = None
+        self._updated_at = {}
+        self._original_cache = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.rapi!r}, {self.uapi!r}, version={self.version})"
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+    @property
+    def version(self) -> int:
+        """
+        Number of updates applied to the mirrored snapshot. Grows with every changed fixture or location.
+        """
+        return 0 if self.snapshot is None else self.snapshot.version
+
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the subscription thread is running. False before start(), after stop() and once the stream ended.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+
+    def start(self) -> None:
+        """
+        Pins the current snapshot of the rApi object and starts the subscription thread.
+
+        The rApi object is switched to a private cache that never expires, holds only the mirrored snapshot and
+        never downloads.
+
+        Raises:
+        - ValueError: If the snapshot has neither fixtures nor locations to subscribe to.
+        """
+        if self._thread is not None:
+            return
+        sections = self._sections()
+        snapshot = self.rapi.snapshot
+        if not snapshot.covers(sections):
+            snapshot = self.rapi.snapshot_cache.get(
+                self.rapi.ip,
+                self.rapi.user,
+                self.rapi.password,
+                ttl=self.rapi.cache_ttl,
+                session_pool=self.rapi.session_pool,
+                sections=sections
+            )
+        index = indexes.of(snapshot)
+        self.stream = self.uapi.resilient_stream(
+            locations=list(index.locations_by_id),
+            fixtures=list(index.fixtures_by_serial),
+            sensor_stats=self.sensor_stats,
+            **self.options
+        )
+        self.snapshot = snapshot
+        self.error = None
+        self._original_cache = (self.rapi.snapshot_cache, self.rapi.cache_ttl)
+        pinned = _PinnedCache()
+        pinned.put(self.rapi.ip, self.rapi.user, self.snapshot)
+        self.rapi.snapshot_cache = pinned
+        self.rapi.cache_ttl = None
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="smartengine-mirror", daemon=True)
+        self._thread.start()
+
+
+    def stop(self, timeout: float=5.0) -> None:
+        """
+        Stops the subscription thread and gives the rApi object its original cache back.
+
+        Parameters:
+        - timeout (float, optional): Number of seconds to wait for the thread to end. Defaults to 5.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self.stream.close()
+        self._thread.join(timeout)
+        self._thread = None
+        self.rapi.snapshot_cache, self.rapi.cache_ttl = self._original_cache
+
+
+    def check(self) -> None:
+        """
+        Raises the error that ended the subscription, so callers can tell a mirror that is no longer kept current.
+
+        Raises:
+        - Exception: The exception that ended the subscription thread, e.g. a requests.HTTPError for wrong
+        credentials, or a RuntimeError if the stream ended without one.
+        """
+        if self.error is not None:
+            raise self.error
+
+
+    def apply(self, message: dict) -> int:
+        """
+        Applies a single uApi subscription message to the mirrored snapshot.
+
+        This is called for every message of the mirror's own subscription, but can also be used to feed the mirror
+        from a stream the caller already consumes.
+
+        Parameters:
+        - message (dict): A decoded message of a uApi subscription stream.
+
+        Returns:
+        - int: The number of fixtures and locations that were updated.
+        """
+        changes = {}
+        for entity, id_, stat, value in subscribe.iter_updates(message):
+            changes.setdefault((entity, id_), {})[stat] = value
+
+        now = time.time()
+        updated = 0
+        for (entity, id_), stats in changes.items():
+            if self.snapshot.update_stats(entity, id_, stats):
+                self._updated_at[(entity, id_)] = now
+                updated += 1
+        if updated:
+            self.last_update = now
+        return updated
+
+
+    def staleness(self, entity: str, id_) -> float:
+        """
+        Returns the number of seconds since a fixture or location was last updated.
+
+        Entities that have not received an update yet are as old as the snapshot itself.
+
+        Parameters:
+        - entity (str): Either "fixture" or "location".
+        - id_ (str | int): The serial number of the fixture or the id of the location.
+        """
+        return time.time() - self._updated_at.get((entity, id_), self.snapshot.fetched_at)
+
+
+    def stale(self, max_age: float) -> list[tuple]:
+        """
+        Returns all fixtures and locations that were not updated within the last 'max_age' seconds.
+
+        Returns:
+        - list[tuple]: (entity, id) pairs, with entity being "fixture" or "location".
+        """
+        index = indexes.of(self.snapshot)
+        threshold = time.time() - max_age
+        stale = []
+        for entity, ids in (("fixture", index.fixtures_by_serial), ("location", index.locations_by_id)):
+            for id_ in ids:
+                if self._updated_at.get((entity, id_), self.snapshot.fetched_at) < threshold:
+                    stale.append((entity, id_))
+        return stale
+
+
+    def _run(self) -> None:
+        try:
+            for message in self.stream.messages():
+                if self._stopping.is_set():
+                    break
+                self.apply(message)
+        except Exception as error:
+            if not self._stopping.is_set():
+                self.error = error
+            return
+        if not self._stopping.is_set():
+            self.error = RuntimeError(f"Error: the uApi subscription of {__class__.__name__} ended")
+
+
+    def _sections(self) -> tuple:
+        sections = self.rapi.sections
+        if sections is None or not hasattr(self.rapi, "sensor_frame"):
+            return sections
+        return tuple(dict.fromkeys([*sections, "location"]))
+
+
+
+
+class _PinnedCache(cache.SnapshotCache):
+    """
+    The private cache of a mirrored rApi object. It never expires and never downloads, so a lookup the mirrored
+    snapshot cannot serve raises instead of replacing it.
+    """
+    def __init__(self):
+        super().__init__(ttl=None)
+
+
+    def refresh(self, ip: str, user: str, password: str, session_pool=None, sections=None) -> cache.Snapshot:
+        raise RuntimeError(
+            f"Error: the snapshot is kept current by {SnapshotMirror.__name__} and cannot be refreshed - stop the "
+            f"mirror first"
+        )
+
+
+    def _fetch(self, key: tuple, password: str, session_pool=None, sections=None) -> cache.Snapshot:
+        wanted = "the whole document" if sections is None else f"the sections {sorted(sections)}"
+        raise RuntimeError(
+            f"Error: the snapshot mirrored by {SnapshotMirror.__name__} does not hold {wanted} - stop the mirror "
+            f"first"
+        )
@@ -0,0 +1,391 @@
+import fnmatch
+import heapq
+import itertools
+
+from . import hierarchy, indexes
+
+
+class Query:
+    """
+    A declarative query over the fixtures or locations of an rApi snapshot.
+
+    A query is built by chaining filter methods, each returning a new query, and runs only when it is iterated.
+    Before running, the filters are planned against the snapshot's indexes: of all filters an index can answer (fixture
+    type, location subtree and exact location name), the one with the fewest candidates is used to pick the elements
+    to look at, so a query for the luminaires of one floor only visits the fixtures of that floor. The remaining
+    filters are checked on each candidate, cheapest first: set lookups, then type and beacon checks, then name
+    patterns and finally stat ranges. Results are built one by one while they are consumed.
+
+    Without order_by, results come in the order of the index that was used: document order for the whole list and
+    within each type for the type index, with the types in the order they were passed to of_type. Elements without a
+    value for a stat never match a range on that stat, and order_by sorts them last in both directions.
+
+    Attributes:
+        api (rApi): The rApi (or FixturesApi/LocationsApi) object whose snapshot is queried.
+        entity (str): Either "fixture" or "location".
+        NotFoundInApiError (int): Custom error code for unknown locations.
+
+    Methods:
+        of_type: Keeps fixtures of the given types.
+        in_location: Keeps fixtures or locations in the subtree of a location.
+        beacon: Keeps fixtures with or without beacon support.
+        named: Keeps fixtures or locations whose name matches a pattern.
+        stat: Keeps fixtures or locations whose stat lies within the given bounds.
+        select: Chooses the fields of the results.
+        order_by: Sorts the results by a field or stat.
+        limit: Limits the number of results.
+        all: Runs the query and returns a list of the results.
+        first: Runs the query and returns the first result.
+        count: Runs the query and returns the number of matches.
+        explain: Returns the plan the query would run with.
+
+    Example:
+        luminaires = (
+            api.query()
+            .of_type("LUMINAIRE")
+            .in_location("Floor 3")
+            .beacon()
+            .stat("power", gt=20)
+            .select("serial_number", "name", "power")
+            .order_by("power", "DESC")
+        )
+        for fixture in luminaires:
+            print(fixture)
+    """
+    def __init__(self, api, entity: str="fixture"):
+        if entity not in _BASE_FIELDS:
+            raise ValueError(f"Error: entity must be 'fixture' or 'location', got {entity!r}")
+        self.api = api
+        self.entity = entity
+        self.NotFoundInApiError = 8080
+        self._types = None
+        self._locations = ()
+        self._beacon = None
+        self._names = ()
+        self._ranges = ()
+        self._fields = _BASE_FIELDS[entity]
+        self._order = ()
+        self._limit = None
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.api!r}, entity={self.entity!r})"
+
+
+    def __iter__(self):
+        snapshot = self.api.snapshot
+        index = indexes.of(snapshot)
+        plan = self._plan(snapshot, index)
+        matches = self._matches(plan)
+        if self._order:
+            order = self._order_key(index)
+            if self._limit is None:
+                matches = sorted(matches, key=order)
+            else:
+                matches = heapq.nsmallest(self._limit, matches, key=order)
+        elif self._limit is not None:
+            matches = itertools.islice(matches, self._limit)
+        fields = self._fields
+        for element in matches:
+            yield {field: self._field(index, element, field) for field in fields}
+
+
+    def of_type(self, *types: str) -> "Query":
+        """
+        Keeps the fixtures whose type is one of the given types, e.g. "LUMINAIRE". Repeated calls intersect and keep
+        the order of the first call.
+
+        Raises:
+        - ValueError: If the query is not a fixture query.
+        """
+        self._only_for("fixture", "of_type")
+        types = tuple(dict.fromkeys(types)) if self._types is None else tuple(
+            type_ for type_ in self._types if type_ in types
+        )
+        return self._copy(_types=types)
+
+
+    def in_location(self, location, subtree: bool=True) -> "Query":
+        """
+        Keeps the fixtures or locations in a location. Repeated calls intersect.
+
+        Parameters:
+        - location (str | int): A location id or name.
+        - subtree (bool, optional): If True (the default), the descendant locations are included. Otherwise only
+        the fixtures listed by the location itself, or for location queries only the location itself, are kept.
+        """
+        return self._copy(_locations=self._locations + ((location, subtree),))
+
+
+    def beacon(self, supported: bool=True) -> "Query":
+        """
+        Keeps the fixtures with (or, if 'supported' is False, without) beacon support.
+
+        Raises:
+        - ValueError: If the query is not a fixture query.
+        """
+        self._only_for("fixture", "beacon")
+        return self._copy(_beacon=supported)
+
+
+    def named(self, pattern: str) -> "Query":
+        """
+        Keeps the fixtures or locations whose name matches a case-sensitive shell-style pattern, e.g. "Room 1*".
+        A pattern without wildcards matches the name exactly. Elements without a name never match.
+        """
+        return self._copy(_names=self._names + (pattern,))
+
+
+    def stat(self, stat: str, gt: float=None, ge: float=None, lt: float=None, le: float=None) -> "Query":
+        """
+        Keeps the fixtures or locations whose 'instant' value of a stat lies within all given bounds.
+
+        Parameters:
+        - stat (str): The sensor stat to compare, e.g. "power".
+        - gt, ge, lt, le (float, optional): Lower and upper bounds (greater than, greater or equal, less than, less or
+        equal).
+        """
+        return self._copy(_ranges=self._ranges + ((stat, gt, ge, lt, le),))
+
+
+    def select(self, *fields: str) -> "Query":
+        """
+        Chooses the fields of the result dictionaries, in the given order.
+
+        Fixtures provide "serial_number", "name", "type", "beaconSupported" and "location" (the id of the first
+        location listing the fixture), locations provide "id" and "name". Every other field is read as the
+        'instant' value of the sensor stat of that name, or None if the element does not report it.
+        Without select, fixtures return serial_number, name and type, and locations id and name.
+        """
+        return self._copy(_fields=fields or _BASE_FIELDS[self.entity])
+
+
+    def order_by(self, field: str, order: str="ASC") -> "Query":
+        """
+        Sorts the results by a field or stat. Repeated calls add keys that break ties of the earlier ones.
+
+        Parameters:
+        - field (str): A field as accepted by select.
+        - order (str, optional): Either "ASC" or "DESC". Invalid orders default to "ASC".
+        """
+        return self._copy(_order=self._order + ((field, order == "DESC"),))
+
+
+    def limit(self, count: int) -> "Query":
+        """
+        Returns at most 'count' results. Combined with order_by, the first results are selected with a heap.
+        """
+        return self._copy(_limit=count)
+
+
+    def all(self) -> list[dict]:
+        """
+        Runs the query and returns a list of the results.
+        """
+        return list(self)
+
+
+    def first(self) -> dict:
+        """
+        Runs the query and returns the first result, or None if nothing matches.
+        """
+        return next(iter(self), None)
+
+
+    def count(self) -> int:
+        """
+        Runs the query and returns the number of matching elements, without building result dictionaries.
+        """
+        snapshot = self.api.snapshot
+        matches = self._matches(self._plan(snapshot, indexes.of(snapshot)))
+        if self._limit is not None:
+            matches = itertools.islice(matches, self._limit)
+        return sum(1 for element in matches)
+
+
+    def explain(self) -> dict:
+        """
+        Returns the plan the query would run with against the current snapshot.
+
+        Returns:
+        - dict: The keys "source" (the index used to pick candidates), "candidates" (their number) and "checks"
+        (the filters checked on each candidate, in order).
+        """
+        snapshot = self.api.snapshot
+        plan = self._plan(snapshot, indexes.of(snapshot))
+        return {"source": plan[0], "candidates": len(plan[1]), "checks": [name for name, check in plan[2]]}
+
+
+    def _copy(self, **changes) -> "Query":
+        query = object.__new__(__class__)
+        query.__dict__.update(self.__dict__)
+        query.__dict__.update(changes)
+        return query
+
+
+    def _only_for(self, entity: str, method: str) -> None:
+        if self.entity != entity:
+            raise ValueError(f"Error: {method} is only available for {entity} queries")
+
+
+    def _plan(self, snapshot, index: indexes.SnapshotIndex) -> tuple:
+        sources = []
+        if self.entity == "fixture":
+            everything = ("all fixtures", snapshot.json_.get("fixture", []), None)
+            if self._types is not None:
+                types = self._types
+                type_set = frozenset(types)
+                candidates = [element for type_ in types for element in index.fixtures_by_type.get(type_, [])]
+                sources.append((
+                    f"type index {list(types)}",
+                    candidates,
+                    ("type", lambda element: element.get("type") in type_set)
+                ))
+            for location, subtree in self._locations:
+                serials = self._fixtures_in(snapshot, index, location, subtree)
+                by_serial = index.fixtures_by_serial
+                candidates = [by_serial[serial] for serial in serials if serial in by_serial]
+                serial_set = frozenset(serials)
+                sources.append((
+                    f"location index {location!r}",
+                    candidates,
+                    (f"location {location!r}", lambda element, serials=serial_set: element["serialNum"] in serials)
+                ))
+        else:
+            everything = ("all locations", snapshot.json_.get("location", []), None)
+            for location, subtree in self._locations:
+                ids = self._locations_in(snapshot, index, location, subtree)
+                candidates = [index.locations_by_id[id_] for id_ in ids]
+                id_set = frozenset(ids)
+                sources.append((
+                    f"location index {location!r}",
+                    candidates,
+                    (f"location {location!r}", lambda element, id_set=id_set: element["id"] in id_set)
+                ))
+            for pattern in self._names:
+                if not _has_wildcards(pattern):
+                    sources.append((
+                        f"name index {pattern!r}",
+                        index.locations_by_name.get(pattern, []),
+                        (f"name {pattern!r}", lambda element, pattern=pattern: element.get("name") == pattern)
+                    ))
+
+        sources.sort(key=lambda source: len(source[1]))
+        source_name, candidates, check = sources[0] if sources else everything
+        checks = [source[2] for source in sources[1:]]
+        if self._beacon is not None:
+            supported = self._beacon
+            checks.append(("beacon", lambda element: element.get("beaconSupported") is supported))
+        for pattern in self._names:
+            if self.entity == "location" and not _has_wildcards(pattern):
+                continue
+            checks.append((f"name {pattern!r}", lambda element, pattern=pattern: _name_matches(element, pattern)))
+        for stat, gt, ge, lt, le in self._ranges:
+            checks.append((f"stat {stat!r}", lambda element, bounds=(stat, gt, ge, lt, le): _within(element, *bounds)))
+        return source_name, candidates, checks
+
+
+    def _matches(self, plan: tuple):
+        source_name, candidates, checks = plan
+        tests = [check for name, check in checks]
+        for element in candidates:
+            if all(test(element) for test in tests):
+                yield element
+
+
+    def _resolve(self, index: indexes.SnapshotIndex, location) -> object:
+        elements = index.find_locations(location)
+        if not elements:
+            raise ValueError(f"Error: {self.NotFoundInApiError} - Location {location} could not be found")
+        return elements[0]["id"]
+
+
+    def _fixtures_in(self, snapshot, index: indexes.SnapshotIndex, location, subtree: bool) -> tuple:
+        id_ = self._resolve(index, location)
+        if subtree:
+            return hierarchy.of(snapshot).fixtures(id_)
+        return tuple(dict.fromkeys(index.fixtures_in_location.get(id_, [])))
+
+
+    def _locations_in(self, snapshot, index: indexes.SnapshotIndex, location, subtree: bool) -> list:
+        id_ = self._resolve(index, location)
+        if subtree:
+            return [id_, *hierarchy.of(snapshot).descendants(id_)]
+        return [id_]
+
+
+    def _field(self, index: indexes.SnapshotIndex, element: dict, field: str) -> object:
+        if field == "serial_number":
+            return element.get("serialNum")
+        if field in ("id", "name", "type", "beaconSupported"):
+            return element.get(field)
+        if field == "location" and self.entity == "fixture":
+            locations = index.locations_by_fixture.get(element["serialNum"])
+            return locations[0]["id"] if locations else None
+        return _stat(element, field)
+
+
+    def _order_key(self, index: indexes.SnapshotIndex):
+        order = self._order
+
+        def key(element):
+            values = []
+            for field, descending in order:
+                value = self._field(index, element, field)
+                if value is None:
+                    values.append((True, None))
+                else:
+                    values.append((False, _Descending(value) if descending else value))
+            return values
+
+        return key
+
+
+
+
+class _Descending:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+
+
+_BASE_FIELDS = {"fixture": ("serial_number", "name", "type"), "location": ("id", "name")}
+
+
+def _has_wildcards(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+def _name_matches(element: dict, pattern: str) -> bool:
+    name = element.get("name")
+    return isinstance(name, str) and fnmatch.fnmatchcase(name, pattern)
+
+
+def _stat(element: dict, stat: str) -> float:
+    try:
+        return float(element["sensorStats"][stat]["instant"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _within(element: dict, stat: str, gt: float, ge: float, lt: float, le: float) -> bool:
+    value = _stat(element, stat)
+    if value is None or value != value:
+        return False
+    return (
+        (gt is None or value > gt)
+        and (ge is None or value >= ge)
+        and (lt is None or value < lt)
+        and (le is None or value <= le)
+    )
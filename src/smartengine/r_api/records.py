@@ -0,0 +1,296 @@
+import sys
+import types
+from collections.abc import Mapping
+
+
+class Scene:
+    """
+    A scene of a location.
+
+    Attributes:
+        name (str): The name of the scene.
+        order (int): The order of the scene within its location.
+    """
+    __slots__ = ("name", "order")
+
+    def __init__(self, name: str, order: int):
+        self.name = name
+        self.order = order
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.name!r}, order={self.order})"
+
+
+
+
+class Fixture:
+    """
+    A compact record of a fixture of an /rApi snapshot.
+
+    The record keeps the identifying fields of the fixture in slots, with the type string interned so all fixtures
+    of a type share one string. The sensor stats are only decoded from the underlying document element when they are
+    first accessed, and are decoded again after the element was updated in place.
+
+    Attributes:
+        serial_number (str): The serial number of the fixture.
+        name (str): The name of the fixture, None if it has none.
+        type (str): The fixture type, e.g. "LUMINAIRE".
+        beacon_supported (bool): Whether the fixture supports beacons.
+        stats (Mapping): Read-only mapping of every sensor stat to its 'instant' value as float, None if the stat
+        has no value.
+    """
+    __slots__ = ("serial_number", "name", "type", "beacon_supported", "_element", "_stats")
+
+    def __init__(self, element: dict):
+        self.serial_number = element["serialNum"]
+        self.name = element.get("name")
+        self.type = _intern(element.get("type"))
+        self.beacon_supported = element.get("beaconSupported") == True
+        self._element = element
+        self._stats = None
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.serial_number!r}, type={self.type!r})"
+
+
+    @property
+    def stats(self) -> Mapping:
+        if self._stats is None:
+            stats = {}
+            for key, value in (self._element.get("sensorStats") or {}).items():
+                try:
+                    stats[key] = float(value["instant"])
+                except (KeyError, TypeError):
+                    stats[key] = None
+            self._stats = types.MappingProxyType(stats)
+        return self._stats
+
+
+
+
+class Location:
+    """
+    A compact record of a location of an /rApi snapshot.
+
+    Attributes:
+        id (int): The id of the location.
+        name (str): The name of the location.
+        child_location (bool): Whether the location has child locations.
+        fixtures (tuple): The serial numbers of the fixtures in the location's 'childFixture' field.
+        scenes (tuple[Scene]): The scenes of the location.
+        scene_orders (Mapping): Read-only mapping of every scene name to its order.
+        stats (Mapping): Read-only mapping of every sensor stat to its 'instant' value, None if the stat has no value.
+    """
+    __slots__ = ("id", "name", "child_location", "fixtures", "scenes", "_scene_orders", "_element", "_stats")
+
+    def __init__(self, element: dict):
+        self.id = element["id"]
+        self.name = element["name"]
+        self.child_location = bool(element.get("childLocation"))
+        self.fixtures = tuple(child_fixture[9:] for child_fixture in element.get("childFixture") or [])
+        try:
+            self.scenes = tuple(Scene(scene["name"], scene["order"]) for scene in element["sceneControl"]["scene"])
+        except (KeyError, TypeError):
+            self.scenes = ()
+        self._scene_orders = None
+        self._element = element
+        self._stats = None
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.id!r}, name={self.name!r})"
+
+
+    @property
+    def scene_orders(self) -> Mapping:
+        if self._scene_orders is None:
+            self._scene_orders = types.MappingProxyType({scene.name: scene.order for scene in self.scenes})
+        return self._scene_orders
+
+
+    @property
+    def stats(self) -> Mapping:
+        if self._stats is None:
+            stats = {}
+            for key, value in (self._element.get("sensorStats") or {}).items():
+                try:
+                    stats[key] = value["instant"]
+                except (KeyError, TypeError):
+                    stats[key] = None
+            self._stats = types.MappingProxyType(stats)
+        return self._stats
+
+
+
+
+class RecordSet:
+    """
+    The Fixture and Location records of one /rApi snapshot, built once per snapshot.
+
+    Attributes:
+        fixtures (list[Fixture]): All fixture records in document order.
+        locations (list[Location]): All location records in document order.
+        fixtures_by_serial (dict): Maps a serial number to its fixture record.
+        locations_by_id (dict): Maps a location id to its location record.
+
+    Methods:
+        record_of: Returns the record built from a document element.
+        element_updated: Drops the decoded sensor stats of a record whose element changed in place.
+    """
+    def __init__(self, snapshot):
+        self.fixtures = [Fixture(element) for element in snapshot.json_.get("fixture", [])]
+        self.locations = [Location(element) for element in snapshot.json_.get("location", [])]
+        self.fixtures_by_serial = {}
+        self.locations_by_id = {}
+        self._by_element = {id(record._element): record for record in (*self.fixtures, *self.locations)}
+        for fixture in self.fixtures:
+            self.fixtures_by_serial.setdefault(fixture.serial_number, fixture)
+        for location in self.locations:
+            self.locations_by_id.setdefault(location.id, location)
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(fixtures={len(self.fixtures)}, locations={len(self.locations)})"
+
+
+    def record_of(self, element: dict) -> Fixture | Location:
+        """
+        Returns the Fixture or Location record built from the given element of the snapshot's document.
+
+        Raises:
+        - KeyError: If the element is not part of the snapshot's document.
+        """
+        return self._by_element[id(element)]
+
+
+    def element_updated(self, entity: str, id_, element: dict) -> None:
+        """
+        Called by the snapshot when the sensor stats of an element change in place. The record decodes its stats
+        again on the next access.
+        """
+        records = self.fixtures_by_serial if entity == "fixture" else self.locations_by_id
+        record = records.get(id_)
+        if record is not None:
+            record._element = element
+            record._stats = None
+
+
+
+
+class Shape:
+    """
+    The keys of a RecordView together with the function reading each key from a record.
+
+    A shape is shared by every view a method returns, so a view only stores its record and its shape.
+    """
+    __slots__ = ("keys", "getters")
+
+    def __init__(self, **getters):
+        self.keys = tuple(getters)
+        self.getters = getters
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}{self.keys}"
+
+
+
+
+class RecordView(Mapping):
+    """
+    A read-only, dictionary-like view of a Fixture or Location record.
+
+    The view behaves like the dictionaries returned by the rApi methods (indexing, iteration, 'in', 'get', 'keys',
+    'items', comparison with dictionaries), but reads every value from the shared record instead of copying it.
+    Use to_dict() where a real dictionary is needed, e.g. for json.dumps.
+
+    Methods:
+        to_dict: Returns the view as a plain dictionary.
+    """
+    __slots__ = ("record", "shape")
+
+    def __init__(self, record, shape: Shape):
+        self.record = record
+        self.shape = shape
+
+
+    def __getitem__(self, key):
+        return self.shape.getters[key](self.record)
+
+
+    def __iter__(self):
+        return iter(self.shape.keys)
+
+
+    def __len__(self):
+        return len(self.shape.keys)
+
+
+    def __contains__(self, key):
+        return key in self.shape.getters
+
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+    def to_dict(self) -> dict:
+        """
+        Returns the view as a plain dictionary. Nested mappings are copied into dictionaries as well.
+        """
+        return {
+            key: dict(value) if isinstance(value, Mapping) else value
+            for key, value in ((key, getter(self.record)) for key, getter in self.shape.getters.items())
+        }
+
+
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def of(snapshot) -> RecordSet:
+    """
+    Returns the records of a snapshot, building them on first access.
+    """
+    return snapshot.derived("records", RecordSet)
+
+
+FIXTURE = Shape(
+    serial_number=lambda record: record.serial_number,
+    name=lambda record: record.name,
+    type=lambda record: record.type,
+)
+
+BEACON = Shape(
+    serial_number=lambda record: record.serial_number,
+    name=lambda record: record.name,
+    type=lambda record: record.type,
+    beaconSupported=lambda record: record.beacon_supported,
+)
+
+SENSOR_STATS = Shape(
+    serial_number=lambda record: record.serial_number,
+    stats=lambda record: record.stats,
+)
+
+LOCATION = Shape(
+    id=lambda record: record.id,
+    name=lambda record: record.name,
+    child_location=lambda record: record.child_location,
+)
+
+SCENES = Shape(
+    id=lambda record: record.id,
+    name=lambda record: record.name,
+    scenes=lambda record: record.scene_orders,
+)
+
+LOCATION_STATS = Shape(
+    id=lambda record: record.id,
+    name=lambda record: record.name,
+    room_stats=lambda record: record.stats,
+)
@@ -1,7 +1,6 @@
-from . import fixtures, locations
+from . import fixtures, locations, query
 
 import json
-import requests
 
 
 class rApi(fixtures.FixturesApi, locations.LocationsApi):
@@ -14,11 +13,13 @@ class rApi(fixtures.FixturesApi, locations.LocationsApi):
 
     Attributes:
         Inherits all attributes from FixturesApi and LocationsApi, including user credentials, IP address, 
-        and JSON data pertaining to fixtures and locations.
+        and JSON data pertaining to fixtures and locations. The "name", "fixture" and "location" sections of the 
+        /rApi document are decoded.
 
     Methods:
         __repr__: Returns a formal string representation of the rApi instance.
-        __str__: Returns a string representation of the raw response from the rApi endpoint.
+        __str__: Returns a string representation of the cached /rApi document in JSON format.
+        query: Starts a declarative query over the fixtures or locations of the current snapshot.
 
     The rApi class is designed to be a versatile tool for managing and retrieving data from a smartdirector, 
     combining the functionalities related to fixtures and locations into one accessible class. It can be particularly 
@@ -31,11 +32,35 @@ class rApi(fixtures.FixturesApi, locations.LocationsApi):
         print(locations)
         print(fixtures)
     """
+    sections = ("name", "fixture", "location")
+
     def __repr__(self):
         return f"{__class__.__name__}({self.user}, {self.password}, ip_adress={self.ip})"
     
     
     def __str__(self):
-        return requests.get(f"https://{self.ip}/rApi", auth=(self.user, self.password), verify=False)
+        return json.dumps(self.json_, indent=4)
+
+
+    def query(self, entity: str="fixture") -> "query.Query":
+        """
+        Starts a declarative query over the fixtures or locations of the current snapshot.
+
+        Filters, projection and ordering are added by chaining the methods of the returned query. The query runs 
+        against the snapshot's indexes when it is iterated, using the most selective index first.
+
+        Parameters:
+        - entity (str, optional): Either "fixture" (the default) or "location".
+
+        Returns:
+        - query.Query: A query that matches every fixture or location until filters are added.
+
+        Raises:
+        - ValueError: If entity is neither "fixture" nor "location".
+
+        Example:
+        >>> api.query().of_type("LUMINAIRE").in_location("Floor 3").beacon().stat("power", gt=20).all()
+        """
+        return query.Query(self, entity)
 
     
\ No newline at end of file
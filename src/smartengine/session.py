@@ -0,0 +1,198 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import connection, connectionpool
+
+from . import instrumentation
+
+
+class SessionPool:
+    """
+    A thread-safe pool of keep-alive HTTP sessions, one per smartdirector.
+
+    Every smartdirector gets its own requests.Session with a connection pool, so consecutive rApi and uApi calls
+    reuse open TCP/TLS connections instead of doing a new handshake for every request. The session of a director is
+    created on first use and can be shared by any number of threads and API objects.
+
+    Attributes:
+        pool_maxsize (int): Maximum number of connections kept open per director.
+        pool_block (bool): If True, requests wait for a free connection when all 'pool_maxsize' connections are in
+        use instead of opening an additional, non-pooled one.
+        max_retries (int): Number of retries for failed connection attempts.
+        timeout (float | tuple): Default timeout passed to every request. None waits forever.
+        verify (bool): Whether TLS certificates are verified. smartdirectors use self-signed certificates, so this
+        defaults to False.
+
+    Methods:
+        session: Returns the pooled session of a director.
+        request: Sends a request to a director through its pooled session.
+        get: Sends a GET request to a director through its pooled session.
+        post: Sends a POST request to a director through its pooled session.
+        close: Closes every session and its connections.
+
+    Example:
+        pool = SessionPool(pool_maxsize=4)
+        response = pool.post("192.168.1.1", "https://192.168.1.1/uApi", data=payload, auth=("admin", "secret"))
+    """
+    def __init__(
+        self,
+        pool_maxsize: int=10,
+        pool_block: bool=False,
+        max_retries: int=0,
+        timeout: float=None,
+        verify: bool=False
+    ):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.verify = verify
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(pool_maxsize={self.pool_maxsize}, directors={len(self._sessions)})"
+
+
+    def session(self, ip: str) -> requests.Session:
+        """
+        Returns the pooled session of a director, creating it on first use.
+
+        Parameters:
+        - ip (str): IP address of the smartdirector.
+
+        Returns:
+        - requests.Session: The session whose connections are reused for every request to this director.
+        """
+        try:
+            return self._sessions[ip]
+        except KeyError:
+            pass
+        with self._lock:
+            if ip not in self._sessions:
+                session = requests.Session()
+                adapter = _InstrumentedAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=self.max_retries,
+                    pool_block=self.pool_block
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.verify = self.verify
+                self._sessions[ip] = session
+            return self._sessions[ip]
+
+
+    def request(self, ip: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request through the pooled session of a director.
+
+        The pool's 'verify' and 'timeout' settings are used unless they are given as keyword arguments.
+
+        Parameters:
+        - ip (str): IP address of the smartdirector.
+        - method (str): HTTP method, e.g. "GET" or "POST".
+        - url (str): The full URL of the request.
+        - kwargs: Any further keyword arguments accepted by requests.Session.request.
+
+        Returns:
+        - requests.Response: The response of the request.
+        """
+        kwargs.setdefault("verify", self.verify)
+        kwargs.setdefault("timeout", self.timeout)
+        stream = kwargs.get("stream", False)
+        kwargs["stream"] = True
+        current = instrumentation.get_instrumentation()
+        tags = {"ip": ip, "http_method": method}
+        body = kwargs.get("data")
+        if isinstance(body, (str, bytes)):
+            current.on_bytes("upload", len(body), tags)
+
+        with current.span("request", **tags):
+            response = self.session(ip).request(method, url, **kwargs)
+        current.on_status(response.status_code, tags)
+        if not stream:
+            with current.span("download", **tags):
+                content = response.content
+            current.on_bytes("download", len(content), tags)
+        return response
+
+
+    def get(self, ip: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request through the pooled session of a director.
+        """
+        return self.request(ip, "GET", url, **kwargs)
+
+
+    def post(self, ip: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a POST request through the pooled session of a director.
+        """
+        return self.request(ip, "POST", url, **kwargs)
+
+
+    def close(self) -> None:
+        """
+        Closes every session of the pool together with its open connections.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+
+
+class _InstrumentedHTTPConnection(connection.HTTPConnection):
+    """
+    An HTTP connection that reports the time spent opening it as "connect" span.
+    """
+    def connect(self):
+        with instrumentation.get_instrumentation().span("connect", ip=self.host, port=self.port):
+            super().connect()
+
+
+
+
+class _InstrumentedHTTPSConnection(connection.HTTPSConnection):
+    """
+    An HTTPS connection that reports the time spent opening it, including the TLS handshake, as "connect" span.
+    """
+    def connect(self):
+        with instrumentation.get_instrumentation().span("connect", ip=self.host, port=self.port):
+            super().connect()
+
+
+
+
+class _InstrumentedHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = _InstrumentedHTTPConnection
+
+
+
+
+class _InstrumentedHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _InstrumentedHTTPSConnection
+
+
+
+
+class _InstrumentedAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter whose connection pools report the time spent opening connections to the instrumentation.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _InstrumentedHTTPConnectionPool,
+            "https": _InstrumentedHTTPSConnectionPool,
+        }
+
+
+
+
+shared_pool = SessionPool()
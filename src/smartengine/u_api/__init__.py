@@ -1,3 +1,12 @@
+from . import framing
 from . import subscribe
+from . import resilient
+from . import hub
+from . import filters
+from . import catalog
 from . import set
-from . import unified
\ No newline at end of file
+from . import timeseries
+from . import coalesce
+from . import scheduler
+from . import unified
+from . import asynchronous
\ No newline at end of file
@@ -0,0 +1,253 @@
+import json
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from . import filters, framing, subscribe, unified
+from .. import instrumentation
+
+
+class AsyncUApi(unified.uApi):
+    """
+    An asyncio counterpart of uApi whose set calls and subscriptions run on an event loop.
+
+    Every set call is a coroutine and every subscription an async generator, all sharing one aiohttp session. This
+    allows thousands of concurrent streams and commands to run on a single event loop instead of one thread per
+    connection. Payloads are built and streams are framed and demultiplexed by the same code the synchronous
+    ApiSetting and ApiSubscription classes use.
+
+    Attributes:
+        Inherits all attributes from uApi.
+        limit (int): Maximum number of simultaneous connections of the aiohttp session. 0 means no limit, which is
+        required to hold more than a handful of long-lived subscriptions at the same time.
+
+    Methods:
+        set_scene: Awaitable that sets the scene of a location.
+        set_brightness: Awaitable that sets the brightness of a location.
+        set_many: Awaitable that sets scenes and brightness levels for many locations in batches.
+        stream_location_data: Async generator streaming the data of a location.
+        stream_fixture_data: Async generator streaming the data of a fixture.
+        stream_many: Async generator streaming events of many locations and fixtures over one connection.
+        close: Awaitable that closes the aiohttp session if it was created by this object.
+
+    Note:
+        The responses returned by the set calls are aiohttp.ClientResponse objects whose body has already been read,
+        so 'status' and 'await response.json()' can be used after the call returns.
+
+    Example:
+        async with AsyncUApi(user='admin', password='secret', ipv4_adress='192.168.0.10') as api:
+            response = await api.set_brightness(location=101, brightness=50)
+            print(response.status)
+            async for event in api.stream_many(locations=[101, 102], sensor_stats=["power"]):
+                print(event)
+    """
+    def __init__(
+        self,
+        user: str,
+        password: str,
+        ipv4_adress: str="192.168.1.1",
+        client_session: "aiohttp.ClientSession"=None,
+        limit: int=0
+    ):
+        if aiohttp is None:
+            raise ImportError("AsyncUApi requires the aiohttp package - install it with 'pip install smartengine[async]'")
+        unified.uApi.__init__(self, user, password, ipv4_adress)
+        self.__password = password
+        self.limit = limit
+        self._client_session = client_session
+        self._owns_client_session = client_session is None
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.user}, {self.__password}, {self.ip})"
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+    async def close(self) -> None:
+        """
+        Closes the aiohttp session if it was created by this object.
+        """
+        if self._owns_client_session and self._client_session is not None:
+            await self._client_session.close()
+            self._client_session = None
+
+
+    @instrumentation.instrumented(span=None)
+    async def set_scene(
+        self, location: int=None, scene_name: str=None, scene_order: int=None
+    ) -> "aiohttp.ClientResponse":
+        """
+        Sets the scene for a given location. See ApiSetting.set_scene.
+
+        Raises:
+        - ValueError: If the scene_name or the location is not provided.
+        - ValueError: If a catalog is loaded and the location or scene does not exist.
+        """
+        location, scene_name = self._scene_target(location, scene_name, scene_order)
+        return await self._post(self._set_payload([self._scene_location(location, scene_name)]))
+
+
+    @instrumentation.instrumented(span=None)
+    async def set_brightness(self, location: int=None, brightness: int=None) -> "aiohttp.ClientResponse":
+        """
+        Sets the brightness level for a given location. See ApiSetting.set_brightness.
+
+        Raises:
+        - ValueError: If either 'location' or 'brightness' arguments are not provided.
+        """
+        if location is None:
+            raise ValueError(f"{self.MissingArgumentError}: loctaion argument was not specfied")
+        if brightness is None:
+            raise ValueError(f"{self.MissingArgumentError}: brightness argument was not specified")
+        location = self._target_location(location)
+        return await self._post(self._set_payload([self._brightness_location(location, brightness)]))
+
+
+    @instrumentation.instrumented(span=None)
+    async def set_many(self, operations: list[dict], batch_size: int=50) -> list[dict]:
+        """
+        Sets scenes and brightness levels for many locations with as few requests as possible. See
+        ApiSetting.set_many.
+
+        Batches are sent one after another, so operations on the same location are applied in order. All operations
+        of a batch share the same response, and an answer with an HTTP error status is reported as an
+        aiohttp.ClientResponseError in the "error" of every operation of the batch.
+        """
+        entries, batches = self._batch_locations(operations, batch_size)
+        results = [None] * len(entries)
+        for batch in batches:
+            try:
+                response = None
+                response = await self._post(self._set_payload([entries[position] for position in batch]))
+                response.raise_for_status()
+                error = None
+            except aiohttp.ClientError as exception:
+                error = exception
+            for position in batch:
+                results[position] = {"location": entries[position]["id"], "response": response, "error": error}
+        return results
+
+
+    @instrumentation.instrumented(span=None)
+    async def stream_location_data(
+        self, location: int=None, sensor_stat: str=None, stream_filter: filters.StreamFilter=None
+    ) -> dict:
+        """
+        Generates a stream of data for a specified location. See ApiSubscription.stream_location_data.
+
+        Raises:
+        - ValueError: If the provided 'sensor_stat' is generally not available.
+        """
+        if sensor_stat is not None and sensor_stat not in self.sensor_stats:
+            raise ValueError(f"Error: {self.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available")
+        payload = self._subscribe_payload(locations=[location], sensor_stats=[] if sensor_stat is None else [sensor_stat])
+        async for message in self._stream(payload, stream_filter):
+            yield message
+
+
+    @instrumentation.instrumented(span=None)
+    async def stream_fixture_data(
+        self, fixture: str=None, sensor_stat: str=None, stream_filter: filters.StreamFilter=None
+    ) -> dict:
+        """
+        Generates a stream of data for a specified fixture. See ApiSubscription.stream_fixture_data.
+
+        Raises:
+        - ValueError: If 'fixture' is not provided or if the provided 'sensor_stat' is generally not available.
+        """
+        if fixture is None:
+            raise ValueError(f"Error: {self.MissingArgumentError} - Missing fixture Identification (Serialnumber)")
+        if sensor_stat is not None and sensor_stat not in self.sensor_stats:
+            raise ValueError(f"Error: {self.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available")
+        payload = self._subscribe_payload(fixtures=[fixture], sensor_stats=[] if sensor_stat is None else [sensor_stat])
+        async for message in self._stream(payload, stream_filter):
+            yield message
+
+
+    @instrumentation.instrumented(span=None)
+    async def stream_many(
+        self,
+        locations: list=None,
+        fixtures: list[str]=None,
+        sensor_stats: list[str]=None,
+        stream_filter: filters.StreamFilter=None
+    ) -> dict:
+        """
+        Generates one stream of events for many locations, fixtures and sensor stats. See
+        ApiSubscription.stream_many.
+
+        Raises:
+        - ValueError: If neither locations nor fixtures are provided.
+        - ValueError: If one of the provided 'sensor_stats' is generally not available.
+        """
+        if not locations and not fixtures:
+            raise ValueError(f"Error: {self.MissingArgumentError} - Missing locations or fixtures to subscribe to")
+        for sensor_stat in sensor_stats or []:
+            if sensor_stat not in self.sensor_stats:
+                raise ValueError(f"Error: {self.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available")
+        payload = self._subscribe_payload(locations=locations or [], fixtures=fixtures or [], sensor_stats=sensor_stats or [])
+        async for message in self._stream(payload, stream_filter):
+            for entity, id_, stat, value in subscribe.iter_updates(message):
+                yield {"entity": entity, "id": id_, "stat": stat, "value": value}
+
+
+    def _session(self) -> "aiohttp.ClientSession":
+        if self._client_session is None:
+            self._client_session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit, ssl=False))
+        return self._client_session
+
+
+    async def _post(self, payload: dict) -> "aiohttp.ClientResponse":
+        json_payload = json.dumps(payload)
+        current = instrumentation.get_instrumentation()
+        tags = {"ip": self.ip, "http_method": "POST"}
+        current.on_bytes("upload", len(json_payload), tags)
+        with current.span("request", **tags):
+            response = await self._session().post(
+                self.url, data=json_payload, auth=aiohttp.BasicAuth(self.user, self.__password), ssl=False
+            )
+        try:
+            current.on_status(response.status, tags)
+            with current.span("download", **tags):
+                body = await response.read()
+            current.on_bytes("download", len(body), tags)
+        finally:
+            response.release()
+        return response
+
+
+    async def _stream(self, payload: dict, stream_filter: filters.StreamFilter=None) -> dict:
+        framer = framing.StreamFramer(max_message_size=self.max_message_size, tags={"ip": self.ip, "api": "uApi"})
+        json_payload = json.dumps(payload)
+        current = instrumentation.get_instrumentation()
+        tags = {"ip": self.ip, "http_method": "POST"}
+        current.on_bytes("upload", len(json_payload), tags)
+        with current.span("request", **tags):
+            response = await self._session().post(
+                self.url,
+                data=json_payload,
+                auth=aiohttp.BasicAuth(self.user, self.__password),
+                ssl=False,
+                timeout=aiohttp.ClientTimeout(total=None)
+            )
+        try:
+            current.on_status(response.status, tags)
+            async for chunk in response.content.iter_any():
+                for message in framer.feed(chunk):
+                    message = framer.decode(message)
+                    if stream_filter is not None:
+                        message = stream_filter.apply(message)
+                        if message is None:
+                            continue
+                    yield message
+        finally:
+            response.release()
@@ -0,0 +1,179 @@
+from ..r_api import locations as r_locations
+
+
+class SceneCatalog:
+    """
+    A local catalog of the locations and scenes of a smartdirector, used to check set calls before they are sent.
+
+    The catalog is built once from the "location" section of the /rApi document, the same data
+    LocationsApi.get_scenes reads, and kept until refresh() is called. Location names are resolved to ids and scene
+    names are checked with single dictionary lookups, so a mistyped location or scene raises a ValueError right away
+    instead of costing a round trip to the director. Scenes can also be looked up by their 'order'.
+
+    Attributes:
+        rapi (LocationsApi): The rApi (or LocationsApi) object the catalog is loaded from.
+        NotFoundInApiError (int): Custom error code for unknown locations and scenes.
+        loaded_at (float): UNIX timestamp of the snapshot the catalog was built from.
+
+    Methods:
+        resolve: Returns the id of a location given by id or name.
+        scenes: Returns the scenes of a location with their order.
+        check_scene: Returns the location id if the location has a scene of the given name.
+        scene_name: Returns the name of the scene of a location with the given order.
+        refresh: Downloads the /rApi document again and rebuilds the catalog.
+        load: Creates a catalog for a smartdirector from its credentials.
+
+    Example:
+        catalog = SceneCatalog(LocationsApi("admin", "secret", "192.168.0.10"))
+        location = catalog.check_scene("Meeting Room", "Evening")
+        print(location, catalog.scene_name(location, 2))
+    """
+    def __init__(self, rapi: r_locations.LocationsApi):
+        self.rapi = rapi
+        self.NotFoundInApiError = 8080
+        self.loaded_at = None
+        self._tables = ({}, {}, {}, {})
+        self._load(rapi.snapshot)
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(locations={len(self._tables[2])})"
+
+
+    @classmethod
+    def load(cls, user: str, password: str, ipv4_adress: str, session_pool=None) -> "SceneCatalog":
+        """
+        Creates a catalog for a smartdirector, reading the /rApi document through the shared snapshot cache.
+
+        Parameters:
+        - user (str): Username for authentication.
+        - password (str): Password for authentication.
+        - ipv4_adress (str): The IP address of the smartdirector.
+        - session_pool (session.SessionPool, optional): The pool of keep-alive connections to download with.
+
+        Returns:
+        - SceneCatalog: The catalog, built from the current snapshot.
+        """
+        return cls(r_locations.LocationsApi(user, password, ipv4_adress, session_pool=session_pool))
+
+
+    def __contains__(self, location):
+        try:
+            self.resolve(location)
+        except ValueError:
+            return False
+        return True
+
+
+    def resolve(self, location) -> object:
+        """
+        Returns the id of a location.
+
+        Parameters:
+        - location (str | int): A location id, the id as text (e.g. "101") or a location name.
+
+        Returns:
+        - int | str: The id of the location as used by the /rApi document.
+
+        Raises:
+        - ValueError: If no location has this id or name, or several locations have this name.
+        """
+        ids_by_key, ids_by_name = self._tables[:2]
+        try:
+            id_ = ids_by_key.get(location)
+            if id_ is None:
+                id_ = ids_by_key.get(str(location))
+            if id_ is not None:
+                return id_
+            ids = ids_by_name.get(location, ())
+        except TypeError:
+            ids = ()
+        if len(ids) == 1:
+            return ids[0]
+        if ids:
+            raise ValueError(f"Error: {self.NotFoundInApiError} - Location name {location} is used by locations {ids}")
+        raise ValueError(f"Error: {self.NotFoundInApiError} - Location {location} could not be found")
+
+
+    def scenes(self, location) -> dict:
+        """
+        Returns the scenes of a location.
+
+        Returns:
+        - dict: Maps every scene name to its order, like the "scenes" of LocationsApi.get_scenes.
+
+        Raises:
+        - ValueError: If the location could not be found.
+        """
+        return dict(self._tables[2][self.resolve(location)])
+
+
+    def check_scene(self, location, scene_name: str) -> object:
+        """
+        Checks that a location has a scene of the given name.
+
+        Parameters:
+        - location (str | int): A location id or name.
+        - scene_name (str): The name of the scene.
+
+        Returns:
+        - int | str: The id of the location.
+
+        Raises:
+        - ValueError: If the location could not be found or has no scene of that name.
+        """
+        id_ = self.resolve(location)
+        scenes = self._tables[2][id_]
+        if scene_name not in scenes:
+            raise ValueError(
+                f"Error: {self.NotFoundInApiError} - Scene {scene_name} does not exist in location {location}, "
+                f"choose one of {list(scenes)}"
+            )
+        return id_
+
+
+    def scene_name(self, location, order: int) -> str:
+        """
+        Returns the name of the scene of a location with the given order.
+
+        Raises:
+        - ValueError: If the location could not be found or has no scene with that order.
+        """
+        scenes_by_order = self._tables[3][self.resolve(location)]
+        try:
+            return scenes_by_order[order]
+        except (KeyError, TypeError):
+            raise ValueError(
+                f"Error: {self.NotFoundInApiError} - Scene order {order} does not exist in location {location}, "
+                f"choose one of {list(scenes_by_order)}"
+            ) from None
+
+
+    def refresh(self) -> None:
+        """
+        Downloads the /rApi document again and rebuilds the catalog from it.
+        """
+        self.rapi.refresh()
+        self._load(self.rapi.snapshot)
+
+
+    def _load(self, snapshot) -> None:
+        ids_by_key = {}
+        ids_by_name = {}
+        scenes = {}
+        scenes_by_order = {}
+        for element in snapshot.json_.get("location", []):
+            id_ = element["id"]
+            if id_ in scenes:
+                continue
+            ids_by_key[id_] = id_
+            ids_by_key.setdefault(str(id_), id_)
+            ids_by_name.setdefault(element.get("name"), []).append(id_)
+            scenes[id_] = {}
+            scenes_by_order[id_] = {}
+            for scene in (element.get("sceneControl") or {}).get("scene") or []:
+                scenes[id_][scene.get("name")] = scene.get("order")
+                scenes_by_order[id_].setdefault(scene.get("order"), scene.get("name"))
+        ids_by_name = {name: tuple(ids) for name, ids in ids_by_name.items()}
+        self._tables = (ids_by_key, ids_by_name, scenes, scenes_by_order)
+        self.loaded_at = snapshot.fetched_at
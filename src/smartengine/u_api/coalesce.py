@@ -0,0 +1,219 @@
+import threading
+import time
+from concurrent import futures
+
+from . import set
+
+
+class CoalescingWriter:
+    """
+    Coalesces rapid scene and brightness changes into as few uApi requests as possible.
+
+    Values are not sent right away but kept as pending per location and control ("scene_name" or "brightness").
+    A newer value for the same location and control replaces the pending one. 'window' seconds after the first
+    pending value arrived, all pending values are sent with a single ApiSetting.set_many call on a background thread,
+    so a slider moved dozens of times per second results in at most one request per window with only the last value.
+    While a request is in flight, new values are collected for the next one.
+
+    Every call returns a concurrent.futures.Future. It resolves with the requests.Response of the request that sent
+    the value, or the value that replaced it, and fails with the exception of that request if it could not be sent.
+    If the pending values of a location are rejected before sending, e.g. because its scene no longer exists after
+    the catalog was refreshed, or the check itself fails, only the futures of that location fail with the raised
+    exception and the other locations are still sent.
+    A pending value is withdrawn if every future waiting for it was cancelled before it was sent.
+
+    Attributes:
+        api (set.ApiSetting): The ApiSetting (or uApi) object the values are sent with.
+        window (float): Number of seconds values are collected before they are sent.
+        batch_size (int): Maximum number of locations sent in a single request, passed on to set_many.
+        submitted (int): Number of values passed to the writer.
+        sent (int): Number of values that were actually sent. 'submitted - sent' values were coalesced.
+
+    Methods:
+        set_scene: Schedules a scene change for a location.
+        set_brightness: Schedules a brightness change for a location.
+        flush: Sends all pending values without waiting for the window to pass.
+        close: Sends all pending values and stops the background thread.
+
+    Example:
+        with CoalescingWriter(unified.uApi("admin", "password123", "192.168.1.1"), window=0.1) as writer:
+            for brightness in range(0, 101, 5):
+                future = writer.set_brightness(101, brightness)
+            print(future.result().status_code)
+    """
+    def __init__(self, api: set.ApiSetting, window: float=0.05, batch_size: int=50):
+        if window < 0:
+            raise ValueError(f"Error: window must not be negative, got {window}")
+        self.api = api
+        self.window = window
+        self.batch_size = batch_size
+        self.submitted = 0
+        self.sent = 0
+        self._pending = {}
+        self._first_pending_at = None
+        self._flush = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="smartengine-coalesce", daemon=True)
+        self._thread.start()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.api!r}, window={self.window}, pending={len(self._pending)})"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def set_scene(self, location: int=None, scene_name: str=None) -> futures.Future:
+        """
+        Schedules the activation of a scene for a location.
+
+        Parameters:
+        - location (int): The id of the location.
+        - scene_name (str): The name of the scene to activate.
+
+        Returns:
+        - concurrent.futures.Future: Resolves with the requests.Response of the request that sent the scene, or a
+        scene that replaced it.
+
+        Raises:
+        - ValueError: If location or scene_name is not provided.
+        - ValueError: If a catalog is loaded and the location or scene does not exist.
+        - RuntimeError: If the writer was closed.
+        """
+        if scene_name is None:
+            raise ValueError(f"{self.api.MissingArgumentError}: scene_name argument was not specified")
+        if location is not None and self.api.catalog is not None:
+            location = self.api.catalog.check_scene(location, scene_name)
+        return self._submit(location, "scene_name", scene_name)
+
+
+    def set_brightness(self, location: int=None, brightness: int=None) -> futures.Future:
+        """
+        Schedules a brightness change for a location.
+
+        Parameters:
+        - location (int): The id of the location.
+        - brightness (int): The brightness level from 0 to 100.
+
+        Returns:
+        - concurrent.futures.Future: Resolves with the requests.Response of the request that sent the brightness,
+        or a brightness that replaced it.
+
+        Raises:
+        - ValueError: If location or brightness is not provided.
+        - RuntimeError: If the writer was closed.
+        """
+        if brightness is None:
+            raise ValueError(f"{self.api.MissingArgumentError}: brightness argument was not specified")
+        return self._submit(location, "brightness", brightness)
+
+
+    def flush(self, timeout: float=None) -> bool:
+        """
+        Sends all pending values right away and waits until they were sent.
+
+        Parameters:
+        - timeout (float, optional): Maximum number of seconds to wait. None waits until the values were sent.
+
+        Returns:
+        - bool: True if every value that was pending when flush was called has been sent.
+        """
+        with self._condition:
+            pending = [future for value, waiting in self._pending.values() for future in waiting]
+            if pending:
+                self._flush = True
+                self._condition.notify_all()
+        not_done = futures.wait(pending, timeout=timeout).not_done
+        return len(not_done) == 0
+
+
+    def close(self, timeout: float=None) -> None:
+        """
+        Sends all pending values and stops the background thread. Further calls raise a RuntimeError.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+
+    def _submit(self, location: int, control: str, value) -> futures.Future:
+        if location is None:
+            raise ValueError(f"{self.api.MissingArgumentError}: location argument was not specified")
+        if self.api.catalog is not None:
+            location = self.api.catalog.resolve(location)
+        future = futures.Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"Error: {__class__.__name__} was closed")
+            key = (location, control)
+            replaced = self._pending.get(key)
+            waiting = [future] if replaced is None else replaced[1] + [future]
+            self._pending[key] = (value, waiting)
+            self.submitted += 1
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+                self._condition.notify_all()
+        return future
+
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                deadline = self._first_pending_at + self.window
+                while not self._flush and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                pending = self._pending
+                self._pending = {}
+                self._first_pending_at = None
+                self._flush = False
+            self._send(pending)
+
+
+    def _send(self, pending: dict) -> None:
+        operations = {}
+        waiting = {}
+        for (location, control), (value, waiting_futures) in pending.items():
+            waiting_futures = [future for future in waiting_futures if future.set_running_or_notify_cancel()]
+            if not waiting_futures:
+                continue
+            operations.setdefault(location, {"location": location})[control] = value
+            waiting.setdefault(location, []).extend(waiting_futures)
+        for location, operation in list(operations.items()):
+            try:
+                self.api._batch_locations([operation], 1)
+            except Exception as error:
+                del operations[location]
+                for future in waiting.pop(location):
+                    future.set_exception(error)
+        if not operations:
+            return
+
+        self.sent += sum(len(operation) - 1 for operation in operations.values())
+        try:
+            results = self.api.set_many(list(operations.values()), batch_size=self.batch_size)
+        except Exception as error:
+            for waiting_futures in waiting.values():
+                for future in waiting_futures:
+                    future.set_exception(error)
+            return
+        for result in results:
+            for future in waiting.pop(result["location"], []):
+                if result["error"] is not None:
+                    future.set_exception(result["error"])
+                else:
+                    future.set_result(result["response"])
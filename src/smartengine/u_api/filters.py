@@ -0,0 +1,166 @@
+import time
+
+from . import subscribe
+
+
+class StreamFilter:
+    """
+    Drops uninteresting sensor stat updates from a uApi subscription stream right after each message is decoded.
+
+    Sensors such as "power" or "illuminance" report tiny changes all the time. A StreamFilter passed to the stream
+    methods of ApiSubscription or AsyncUApi as 'stream_filter' removes every update that does not pass all of its
+    checks from the decoded message, before any event is built for the consumer. Data other than sensor stats, such
+    as scene changes, is kept. Messages left without any updates are not passed on at all. The checks are, per entity
+    and sensor stat:
+        - deadband: The absolute change to the last passed value must be at least the given amount.
+        - relative: The change relative to the last passed value must be at least the given fraction.
+        - min_interval: At least the given number of seconds must have passed since the last passed update.
+        - predicates: Every callable must return True for (entity, id, stat, value).
+
+    The first update of every entity and sensor stat passes the deadbands and the interval. For sensor stats with a
+    deadband, unchanged values are dropped, and values that are not numbers pass whenever they differ from the last
+    passed value. Since updates are compared with the last value that passed, slow drifts are reported once they add
+    up to the deadband.
+
+    Attributes:
+        deadband (dict): Maps sensor stats to the minimum absolute change, e.g. {"power": 0.5}.
+        relative (dict): Maps sensor stats to the minimum relative change, e.g. {"illuminance": 0.05} for 5%.
+        min_interval (float | dict): Minimum number of seconds between two updates of an entity and sensor stat,
+        either for all sensor stats or per sensor stat.
+        predicates (list[callable]): Callables taking (entity, id, stat, value) and returning whether to keep it.
+        passed (int): Number of updates that passed the filter.
+        dropped (int): Number of updates that were dropped.
+
+    Methods:
+        accept: Returns whether a single update passes the filter.
+        apply: Removes the updates that do not pass the filter from a decoded message.
+        reset: Forgets the last passed values and times.
+
+    Example:
+        quiet = StreamFilter(deadband={"power": 0.5}, relative={"illuminance": 0.1}, min_interval=1.0)
+        for event in api.stream_many(locations=[101, 102], stream_filter=quiet):
+            print(event)
+    """
+    def __init__(
+        self,
+        deadband: dict=None,
+        relative: dict=None,
+        min_interval: float | dict=None,
+        predicates: list=None
+    ):
+        self.deadband = dict(deadband or {})
+        self.relative = dict(relative or {})
+        self.min_interval = min_interval
+        self.predicates = list(predicates or [])
+        self.passed = 0
+        self.dropped = 0
+        self._last = {}
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(passed={self.passed}, dropped={self.dropped})"
+
+
+    def accept(self, entity: str, id_, stat: str, value) -> bool:
+        """
+        Returns whether a single update passes the filter and remembers it as the last passed update if so.
+
+        Parameters:
+        - entity (str): Either "location" or "fixture".
+        - id_ (int | str): The id of the location or the serial number of the fixture.
+        - stat (str): The name of the sensor stat.
+        - value: The instant value of the sensor stat.
+
+        Returns:
+        - bool: True if the update passes every check.
+        """
+        key = (entity, id_, stat)
+        last = self._last.get(key)
+        now = time.monotonic()
+        if last is not None and not self._changed(stat, last[0], value, now - last[1]):
+            self.dropped += 1
+            return False
+        for predicate in self.predicates:
+            if not predicate(entity, id_, stat, value):
+                self.dropped += 1
+                return False
+        self._last[key] = (value, now)
+        self.passed += 1
+        return True
+
+
+    def apply(self, message: dict) -> dict:
+        """
+        Removes the updates that do not pass the filter from a decoded uApi subscription message, in place.
+
+        Parameters:
+        - message (dict): A decoded message of a uApi subscription stream.
+
+        Elements without sensor stats, e.g. scene changes, are kept as they are. An element whose sensor stats are
+        all dropped is removed unless it holds other data than its id.
+
+        Returns:
+        - dict: The message without the dropped updates, or None if it held sensor stat updates, none of them is
+        left and there is no other data.
+        """
+        data = message.get("responseData", message)
+        if not isinstance(data, dict):
+            return message
+        seen = 0
+        left = 0
+        for entity, id_key in subscribe._ENTITY_KEYS:
+            elements = data.get(entity)
+            if not elements:
+                continue
+            kept = []
+            for element in elements:
+                sensor_stats = element.get("sensorStats")
+                if not sensor_stats:
+                    kept.append(element)
+                    left += 1
+                    continue
+                seen += 1
+                id_ = element.get(id_key)
+                for stat, value in list(sensor_stats.items()):
+                    instant = value["instant"] if isinstance(value, dict) and "instant" in value else value
+                    if not self.accept(entity, id_, stat, instant):
+                        del sensor_stats[stat]
+                if not sensor_stats:
+                    del element["sensorStats"]
+                    if all(key == id_key for key in element):
+                        continue
+                kept.append(element)
+                left += 1
+            data[entity] = kept
+        return message if left or not seen else None
+
+
+    def reset(self) -> None:
+        """
+        Forgets the last passed values and times, so the next update of every entity and sensor stat passes.
+        """
+        self._last.clear()
+
+
+    def _changed(self, stat: str, last, value, elapsed: float) -> bool:
+        min_interval = self.min_interval.get(stat) if isinstance(self.min_interval, dict) else self.min_interval
+        if min_interval is not None and elapsed < min_interval:
+            return False
+        deadband = self.deadband.get(stat)
+        relative = self.relative.get(stat)
+        if deadband is None and relative is None:
+            return True
+        if not _is_number(value) or not _is_number(last):
+            return value != last
+        change = abs(value - last)
+        if deadband is not None and change < deadband:
+            return False
+        if relative is not None and change < relative * abs(last):
+            return False
+        return change != 0
+
+
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
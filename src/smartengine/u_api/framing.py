@@ -0,0 +1,106 @@
+import json
+
+from .. import instrumentation
+
+
+class StreamFramer:
+    """
+    An incremental framer that splits a uApi subscription stream into JSON messages.
+
+    The smartdirector separates the messages of a subscription stream with a delimiter ("\\r\\n\\r\\n\\r\\n"). The
+    framer collects the received chunks in a single bytes buffer and cuts complete messages out of it, no matter
+    where the chunk boundaries fall, including delimiters that are split across two chunks. Every byte of the
+    stream is searched only once and every message is decoded only once.
+
+    Attributes:
+        delimiter (bytes): The byte sequence separating two messages.
+        max_message_size (int): Maximum number of bytes a single message may have. None disables the limit.
+        tags (dict): Details passed to the instrumentation with every decoded message, e.g. the director's "ip".
+        MessageTooLargeError (int): Custom error code for messages exceeding 'max_message_size'.
+
+    Methods:
+        feed: Adds a chunk to the buffer and returns the raw messages completed by it.
+        messages: Generates decoded messages from an iterable of chunks.
+        decode: Decodes a single raw message and reports it to the instrumentation.
+
+    Example:
+        framer = StreamFramer()
+        for message in framer.messages(response.iter_content(chunk_size=128)):
+            print(message)
+    """
+    def __init__(self, delimiter: bytes=b"\r\n\r\n\r\n", max_message_size: int=16 * 1024 * 1024, tags: dict=None):
+        self.delimiter = delimiter
+        self.max_message_size = max_message_size
+        self.tags = {} if tags is None else tags
+        self.MessageTooLargeError = 6060
+        self._buffer = bytearray()
+        self._search_from = 0
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(delimiter={self.delimiter!r}, max_message_size={self.max_message_size})"
+
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """
+        Adds a chunk of the stream to the buffer and returns every message it completes.
+
+        Parameters:
+        - chunk (bytes): The next chunk of the stream.
+
+        Returns:
+        - list[bytes]: The raw bytes of every completed message, without the delimiter. Empty messages are dropped.
+
+        Raises:
+        - ValueError: If a message grows beyond 'max_message_size'.
+        """
+        buffer = self._buffer
+        buffer += chunk
+        completed = []
+        while True:
+            end = buffer.find(self.delimiter, self._search_from)
+            if end == -1:
+                self._search_from = max(0, len(buffer) - len(self.delimiter) + 1)
+                self._check_size(len(buffer))
+                return completed
+            self._check_size(end)
+            message = bytes(buffer[:end])
+            del buffer[:end + len(self.delimiter)]
+            self._search_from = 0
+            if message.strip():
+                completed.append(message)
+
+
+    def messages(self, chunks) -> dict:
+        """
+        Generates decoded messages from an iterable of chunks.
+
+        Parameters:
+        - chunks (iterable[bytes]): The chunks of the stream, e.g. the result of response.iter_content().
+
+        Yields:
+        - dict: Every complete message of the stream, decoded from JSON.
+        """
+        for chunk in chunks:
+            for message in self.feed(chunk):
+                yield self.decode(message)
+
+
+    def decode(self, message: bytes) -> dict:
+        """
+        Decodes a single raw message from JSON and reports its size and decoding time to the instrumentation.
+        """
+        current = instrumentation.get_instrumentation()
+        current.on_message(self.tags)
+        current.on_bytes("message", len(message), self.tags)
+        with current.span("decode", **self.tags):
+            return json.loads(message.decode("utf-8"))
+
+
+    def _check_size(self, size: int) -> None:
+        if self.max_message_size is not None and size > self.max_message_size:
+            self._buffer.clear()
+            self._search_from = 0
+            raise ValueError(
+                f"Error: {self.MessageTooLargeError} - Streamed message exceeds {self.max_message_size} bytes"
+            )
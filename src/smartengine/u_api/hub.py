@@ -0,0 +1,369 @@
+import queue
+import threading
+
+from . import subscribe
+
+
+class Subscription:
+    """
+    A local subscriber of a SubscriptionHub, receiving the messages of one shared upstream stream.
+
+    Messages are delivered through a bounded queue. If the subscriber falls behind and its queue is full, the oldest
+    queued message is dropped to make room, so a slow subscriber never holds up the upstream or other subscribers.
+    Dropped messages are counted in 'dropped'. Every subscriber gets its own copy of each message, so a subscriber
+    may change the messages it receives, e.g. with StreamFilter.apply, without affecting the others.
+
+    Attributes:
+        key (tuple): The (entity, id, sensor_stat) of the upstream stream.
+        received (int): Number of messages queued for this subscriber.
+        dropped (int): Number of messages dropped because the queue was full.
+        error (Exception): The exception that ended the upstream stream, if any.
+        closed (bool): Whether the subscriber has left the hub.
+
+    Methods:
+        get: Returns the next message.
+        close: Leaves the hub. The upstream stream is closed if this was its last subscriber.
+
+    Example:
+        with hub.subscribe("location", 101, "power") as subscription:
+            for message in subscription:
+                print(message)
+    """
+    def __init__(self, hub, key: tuple, max_queue: int):
+        self.key = key
+        self.received = 0
+        self.dropped = 0
+        self.error = None
+        self.closed = False
+        self._hub = hub
+        self._queue = queue.Queue(maxsize=max_queue)
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.key}, received={self.received}, dropped={self.dropped})"
+
+
+    def __iter__(self):
+        while True:
+            message = self.get()
+            if message is None:
+                return
+            yield message
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def get(self, timeout: float=None) -> dict:
+        """
+        Returns the next message of the upstream stream.
+
+        Parameters:
+        - timeout (float, optional): Maximum number of seconds to wait. None waits until a message arrives.
+
+        Returns:
+        - dict: A copy of the next message that only this subscriber sees, or None once the subscription has ended.
+
+        Raises:
+        - queue.Empty: If no message arrived within 'timeout' seconds.
+        - Exception: The exception that ended the upstream stream, once all messages before it were returned.
+        """
+        if self.closed and self._queue.empty():
+            return None
+        message = self._queue.get(timeout=timeout)
+        if message is _END:
+            self._queue.put(_END)
+            if self.error is not None:
+                raise self.error
+            return None
+        return _copy(message)
+
+
+    def close(self) -> None:
+        """
+        Leaves the hub. The upstream stream is closed if this was its last subscriber.
+        """
+        if not self.closed:
+            self._hub._leave(self)
+
+
+    def _put(self, message) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+
+    def _end(self, error: Exception=None) -> None:
+        self.error = error
+        self.closed = True
+        self._put(_END)
+
+
+
+
+class SubscriptionHub:
+    """
+    Shares uApi subscription streams between any number of local subscribers.
+
+    Every component calling stream_location_data makes the smartdirector hold one more stream. The hub instead opens
+    a single upstream stream per (entity, id, sensor_stat) and fans each message out to all local subscribers of
+    that key through bounded per-subscriber queues. The upstream is started by the first subscriber and closed when
+    the last one leaves. A subscriber joining a running upstream first receives a message with the latest value of
+    every sensor stat seen so far, since the full payload at the start of the stream was already delivered.
+
+    If an upstream stream ends or fails, every subscriber of it ends as well (get returns None or raises the
+    error), and the next subscribe call for the key opens a new upstream. With 'resilient' set, upstreams reconnect
+    on their own as described for resilient.ResilientStream instead.
+
+    Attributes:
+        api (subscribe.ApiSubscription): The ApiSubscription (or uApi) object the upstream streams are opened with.
+        max_queue (int): Default number of messages a subscriber's queue holds before the oldest is dropped.
+        resilient (bool): Whether upstreams reconnect on their own.
+        options (dict): Options passed on to ApiSubscription.resilient_stream, e.g. idle_timeout or max_backoff.
+        started (int): Number of upstream streams opened so far.
+
+    Methods:
+        subscribe: Adds a subscriber for an entity and sensor stat.
+        upstreams: Returns the number of subscribers of every open upstream stream.
+        close: Ends every subscriber and closes every upstream stream.
+
+    Example:
+        hub = SubscriptionHub(uapi, max_queue=100, resilient=True)
+        dashboard = hub.subscribe("location", 101, "power")
+        logger = hub.subscribe("location", 101, "power")
+        print(hub.upstreams())
+        print(dashboard.get(), logger.get())
+        hub.close()
+    """
+    def __init__(self, api: subscribe.ApiSubscription, max_queue: int=1000, resilient: bool=False, **options):
+        if max_queue < 1:
+            raise ValueError(f"Error: max_queue must be at least 1, got {max_queue}")
+        self.api = api
+        self.max_queue = max_queue
+        self.resilient = resilient
+        self.options = options
+        self.started = 0
+        self._upstreams = {}
+        self._lock = threading.Lock()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.api!r}, upstreams={len(self._upstreams)})"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def subscribe(self, entity: str, id_=None, sensor_stat: str=None, max_queue: int=None) -> Subscription:
+        """
+        Adds a subscriber for the sensor stats of a location or fixture, opening the upstream stream if needed.
+
+        Parameters:
+        - entity (str): Either "location" or "fixture".
+        - id_ (int | str): The id of the location or the serial number of the fixture. For locations, None
+        subscribes to every location.
+        - sensor_stat (str, optional): The sensor stat to subscribe to. If None, subscribes to all sensor data.
+        - max_queue (int, optional): Size of this subscriber's queue. Defaults to the hub's max_queue.
+
+        Returns:
+        - Subscription: The new subscriber. Iterate it or call get() to receive messages.
+
+        Raises:
+        - ValueError: If entity is neither "location" nor "fixture", or a fixture's serial number is missing.
+        - ValueError: If the provided 'sensor_stat' is generally not available.
+        """
+        if entity not in _ID_KEYS:
+            raise ValueError(f"Error: entity must be 'location' or 'fixture', got {entity!r}")
+        if entity == "fixture" and id_ is None:
+            raise ValueError(f"Error: {self.api.MissingArgumentError} - Missing fixture Identification (Serialnumber)")
+        if sensor_stat is not None and sensor_stat not in self.api.sensor_stats:
+            raise ValueError(
+                f"Error: {self.api.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available"
+            )
+        key = (entity, id_, sensor_stat)
+        subscriber = Subscription(self, key, self.max_queue if max_queue is None else max_queue)
+        with self._lock:
+            upstream = self._upstreams.get(key)
+            if upstream is None:
+                upstream = _Upstream(self, key)
+                self._upstreams[key] = upstream
+                self.started += 1
+                upstream.add(subscriber)
+                upstream.start()
+            else:
+                upstream.add(subscriber)
+        return subscriber
+
+
+    def upstreams(self) -> dict:
+        """
+        Returns the number of subscribers of every open upstream stream.
+
+        Returns:
+        - dict: Maps (entity, id, sensor_stat) to the number of subscribers.
+        """
+        with self._lock:
+            return {key: len(upstream.subscribers) for key, upstream in self._upstreams.items()}
+
+
+    def close(self, timeout: float=5.0) -> None:
+        """
+        Ends every subscriber and closes every upstream stream.
+
+        Parameters:
+        - timeout (float, optional): Number of seconds to wait for each upstream thread to end. Defaults to 5.
+        """
+        with self._lock:
+            upstreams = list(self._upstreams.values())
+            self._upstreams.clear()
+        for upstream in upstreams:
+            upstream.stop(timeout)
+
+
+    def _leave(self, subscriber: Subscription) -> None:
+        with self._lock:
+            upstream = self._upstreams.get(subscriber.key)
+            last = upstream is not None and upstream.remove(subscriber) == 0
+            if last:
+                del self._upstreams[subscriber.key]
+        if not subscriber.closed:
+            subscriber._end()
+        if last:
+            upstream.stop(timeout=0)
+
+
+    def _ended(self, upstream) -> None:
+        with self._lock:
+            if self._upstreams.get(upstream.key) is upstream:
+                del self._upstreams[upstream.key]
+
+
+
+
+class _Upstream:
+    def __init__(self, hub: SubscriptionHub, key: tuple):
+        self.hub = hub
+        self.key = key
+        self.subscribers = ()
+        self.state = {}
+        self.error = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._response = None
+        self._stream = None
+        self._thread = threading.Thread(target=self._run, name="smartengine-hub", daemon=True)
+
+
+    def start(self) -> None:
+        self._thread.start()
+
+
+    def add(self, subscriber: Subscription) -> None:
+        with self._lock:
+            if self.state:
+                subscriber._put(self._current())
+                subscriber.received += 1
+            self.subscribers = self.subscribers + (subscriber,)
+
+
+    def remove(self, subscriber: Subscription) -> int:
+        with self._lock:
+            self.subscribers = tuple(other for other in self.subscribers if other is not subscriber)
+            return len(self.subscribers)
+
+
+    def stop(self, timeout: float=None) -> None:
+        self._stopping.set()
+        if self._stream is not None:
+            self._stream.close()
+        if self._response is not None:
+            self._response.close()
+        self._end()
+        if timeout and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+
+    def _run(self) -> None:
+        try:
+            for message in self._messages():
+                if self._stopping.is_set():
+                    break
+                with self._lock:
+                    for entity, id_, stat, value in subscribe.iter_updates(message):
+                        self.state.setdefault((entity, id_), {})[stat] = value
+                    for subscriber in self.subscribers:
+                        subscriber._put(message)
+                        subscriber.received += 1
+        except Exception as error:
+            if not self._stopping.is_set():
+                self.error = error
+        finally:
+            self.hub._ended(self)
+            self._end()
+
+
+    def _messages(self):
+        entity, id_, sensor_stat = self.key
+        sensor_stats = [] if sensor_stat is None else [sensor_stat]
+        if self.hub.resilient:
+            self._stream = self.hub.api.resilient_stream(
+                sensor_stats=sensor_stats, **{f"{entity}s": [id_]}, **self.hub.options
+            )
+            if self._stopping.is_set():
+                self._stream.close()
+            return self._stream.messages()
+        payload = self.hub.api._subscribe_payload(sensor_stats=sensor_stats, **{f"{entity}s": [id_]})
+        return self.hub.api._stream(payload, on_response=self._set_response)
+
+
+    def _set_response(self, response) -> None:
+        self._response = response
+        if self._stopping.is_set():
+            response.close()
+
+
+    def _end(self) -> None:
+        with self._lock:
+            subscribers = self.subscribers
+            self.subscribers = ()
+        for subscriber in subscribers:
+            subscriber._end(self.error)
+
+
+    def _current(self) -> dict:
+        data = {}
+        for (entity, id_), stats in self.state.items():
+            sensor_stats = {stat: {"instant": value} for stat, value in stats.items()}
+            data.setdefault(entity, []).append({_ID_KEYS[entity]: id_, "sensorStats": sensor_stats})
+        return {"responseData": data}
+
+
+
+
+_END = object()
+_ID_KEYS = dict(subscribe._ENTITY_KEYS)
+
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
@@ -0,0 +1,249 @@
+import random
+import threading
+import time
+
+import requests
+
+from . import subscribe
+from .. import instrumentation
+
+
+class ResilientStream:
+    """
+    A uApi subscription that reconnects on its own when the connection to the director is lost.
+
+    The stream subscribes to the given locations and fixtures like ApiSubscription.stream_many. When the connection
+    drops, the director ends the stream, a message arrives truncated or garbled, or no data arrives for
+    'idle_timeout' seconds, the subscription is sent
+    again after a jittered exponential backoff: the n-th attempt in a row waits a random time between
+    '(1 - jitter)' and 1 times 'initial_backoff * multiplier ** (n - 1)', capped at 'max_backoff' seconds.
+    Client errors (HTTP 4xx, e.g. wrong credentials) are not retried but raised.
+
+    The stream keeps the latest value of every entity and sensor stat in 'state'. After a reconnect, the uApi sends
+    a full payload with every data point. This payload is merged into 'state', and only the values that changed
+    while the stream was disconnected are passed on as events, so consumers catch up with the updates they missed.
+    Every reconnect and the gap between losing the connection and the first message after the reconnect are
+    counted, and every gap is reported to the instrumentation as "gap" span.
+
+    Attributes:
+        api (ApiSubscription): The object the subscription is sent with.
+        idle_timeout (float): Seconds without any data after which the connection counts as lost. None disables it.
+        connect_timeout (float): Seconds to wait for the connection to the director.
+        initial_backoff (float): Seconds to wait before the first reconnect attempt, before jitter.
+        max_backoff (float): Upper limit of the wait between two reconnect attempts.
+        multiplier (float): Factor the wait grows by with every failed attempt in a row.
+        jitter (float): Fraction of the wait that is randomized, between 0 and 1.
+        max_reconnects (int): Number of reconnect attempts in a row before giving up. None retries forever.
+        on_resync (callable): Called with the list of (entity, id, stat, value) updates that changed while the
+        stream was disconnected, once per reconnect.
+        stream_filter (filters.StreamFilter): Drops uninteresting updates right after decoding, before they reach
+        'state'. None passes every update.
+        state (dict): Maps (entity, id) to a dictionary of the latest value of every sensor stat.
+        reconnects (int): Number of reconnect attempts so far.
+        connected (bool): Whether the stream currently has a connection.
+
+    Methods:
+        messages: Generates the decoded messages of the subscription, across reconnects.
+        events: Generates one event per entity and sensor stat, across reconnects.
+        metrics: Returns the reconnect count and the gap durations.
+        close: Ends the stream and closes the current connection.
+
+    Example:
+        stream = ResilientStream(api, locations=[101, 102], sensor_stats=["power"], idle_timeout=30)
+        for event in stream.events():
+            print(event["id"], event["stat"], event["value"], stream.metrics()["reconnects"])
+    """
+    def __init__(
+        self,
+        api,
+        locations: list=None,
+        fixtures: list[str]=None,
+        sensor_stats: list[str]=None,
+        idle_timeout: float=60.0,
+        connect_timeout: float=10.0,
+        initial_backoff: float=0.5,
+        max_backoff: float=30.0,
+        multiplier: float=2.0,
+        jitter: float=0.5,
+        max_reconnects: int=None,
+        on_resync=None,
+        stream_filter=None
+    ):
+        if not locations and not fixtures:
+            raise ValueError(f"Error: {api.MissingArgumentError} - Missing locations or fixtures to subscribe to")
+        for sensor_stat in sensor_stats or []:
+            if sensor_stat not in api.sensor_stats:
+                raise ValueError(
+                    f"Error: {api.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available"
+                )
+        if not 0 <= jitter <= 1:
+            raise ValueError(f"Error: jitter must be between 0 and 1, got {jitter}")
+        self.api = api
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_reconnects = max_reconnects
+        self.on_resync = on_resync
+        self.stream_filter = stream_filter
+        self.state = {}
+        self.reconnects = 0
+        self.connected = False
+        self._payload = api._subscribe_payload(
+            locations=locations or [], fixtures=fixtures or [], sensor_stats=sensor_stats or []
+        )
+        self._gaps = []
+        self._messages = 0
+        self._response = None
+        self._closed = threading.Event()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}({self.api!r}, reconnects={self.reconnects}, connected={self.connected})"
+
+
+    def __iter__(self):
+        return self.messages()
+
+
+    def messages(self):
+        """
+        Generates the decoded messages of the subscription, reconnecting whenever the connection is lost.
+
+        Yields:
+        - dict: Every message the director sends, including the full payload sent after each reconnect.
+
+        Raises:
+        - requests.HTTPError: If the director answers with a client error (HTTP 4xx).
+        - requests.RequestException | OSError | ValueError: The last error, once 'max_reconnects' attempts in a row
+        failed. A ValueError means a message could not be decoded.
+        """
+        for message, updates in self._run():
+            yield message
+
+
+    def events(self):
+        """
+        Generates one event per entity and sensor stat, reconnecting whenever the connection is lost. After a
+        reconnect, only the values that changed while the stream was disconnected are generated.
+
+        Yields:
+        - dict: {"entity": "location" or "fixture", "id": <id>, "stat": <sensor_stat>, "value": <instant value>}
+        """
+        for message, updates in self._run():
+            for entity, id_, stat, value in updates:
+                yield {"entity": entity, "id": id_, "stat": stat, "value": value}
+
+
+    def metrics(self) -> dict:
+        """
+        Returns the reconnect count and the gap durations of the stream.
+
+        Returns:
+        - dict: The keys "connected", "messages", "reconnects", "gaps" (number of gaps), "last_gap", "longest_gap"
+        and "total_gap" (in seconds, None without gaps).
+        """
+        gaps = list(self._gaps)
+        return {
+            "connected": self.connected,
+            "messages": self._messages,
+            "reconnects": self.reconnects,
+            "gaps": len(gaps),
+            "last_gap": gaps[-1] if gaps else None,
+            "longest_gap": max(gaps) if gaps else None,
+            "total_gap": sum(gaps) if gaps else None,
+        }
+
+
+    def close(self) -> None:
+        """
+        Ends the stream. A generator waiting for data or for the next reconnect attempt returns.
+        """
+        self._closed.set()
+        response = self._response
+        if response is not None:
+            response.close()
+
+
+    def _run(self):
+        attempt = 0
+        lost_at = None
+        while not self._closed.is_set():
+            error = None
+            try:
+                for message in self.api._stream(
+                    self._payload,
+                    on_response=self._connect,
+                    stream_filter=self.stream_filter,
+                    timeout=(self.connect_timeout, self.idle_timeout)
+                ):
+                    updates = list(subscribe.iter_updates(message))
+                    self._messages += 1
+                    if lost_at is not None:
+                        updates = self._resync(updates, time.monotonic() - lost_at)
+                        lost_at = None
+                        attempt = 0
+                    else:
+                        self._merge(updates)
+                    yield message, updates
+            except requests.HTTPError as exception:
+                if exception.response is not None and exception.response.status_code < 500:
+                    raise
+                error = exception
+            except (requests.RequestException, OSError, ValueError) as exception:
+                error = exception
+            finally:
+                self.connected = False
+                self._response = None
+
+            if self._closed.is_set():
+                return
+            if lost_at is None:
+                lost_at = time.monotonic()
+            attempt += 1
+            if self.max_reconnects is not None and attempt > self.max_reconnects:
+                if error is not None:
+                    raise error
+                return
+            if self._closed.wait(self._backoff(attempt)):
+                return
+            self.reconnects += 1
+
+
+    def _connect(self, response: requests.Response) -> None:
+        self._response = response
+        if self._closed.is_set() or not response.ok:
+            response.close()
+        response.raise_for_status()
+        self.connected = True
+
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.initial_backoff * self.multiplier ** (attempt - 1))
+        return random.uniform(delay * (1 - self.jitter), delay)
+
+
+    def _merge(self, updates: list[tuple]) -> None:
+        for entity, id_, stat, value in updates:
+            self.state.setdefault((entity, id_), {})[stat] = value
+
+
+    def _resync(self, updates: list[tuple], gap: float) -> list[tuple]:
+        self._gaps.append(gap)
+        instrumentation.get_instrumentation().on_span("gap", gap, {"ip": self.api.ip, "api": "uApi"})
+        missed = [
+            (entity, id_, stat, value)
+            for entity, id_, stat, value in updates
+            if self.state.get((entity, id_), {}).get(stat, _MISSING) != value
+        ]
+        self._merge(updates)
+        if self.on_resync is not None:
+            self.on_resync(missed)
+        return missed
+
+
+
+
+_MISSING = object()
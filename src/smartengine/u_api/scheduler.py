@@ -0,0 +1,424 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent import futures
+
+from . import set
+from .. import instrumentation
+
+
+class TokenBucket:
+    """
+    A token bucket that limits the rate of commands sent to a director.
+
+    The bucket holds up to 'burst' tokens and is refilled with 'rate' tokens per second. Every command takes one
+    token. The bucket itself is not thread-safe, the CommandScheduler only uses it while holding its lock.
+
+    Attributes:
+        rate (float): Number of tokens added per second. None disables the limit.
+        burst (float): Maximum number of tokens, i.e. the number of commands that may be sent at once after a pause.
+        tokens (float): The number of tokens currently available. Negative after commands that were forced through.
+
+    Methods:
+        wait_time: Returns the number of seconds until a token is available.
+        take: Takes a token, even if none is available.
+    """
+    def __init__(self, rate: float=10.0, burst: float=10.0):
+        if rate is not None and rate <= 0:
+            raise ValueError(f"Error: rate must be positive, got {rate}")
+        if burst < 1:
+            raise ValueError(f"Error: burst must be at least 1, got {burst}")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(rate={self.rate}, burst={self.burst})"
+
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+    def wait_time(self) -> float:
+        """
+        Returns the number of seconds until a token is available, 0 if one is available now.
+        """
+        if self.rate is None:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+    def take(self) -> None:
+        """
+        Takes a token. Taking a token while none is available leaves the bucket in debt, which delays the following
+        commands.
+        """
+        if self.rate is None:
+            return
+        self._refill()
+        self.tokens -= 1
+
+
+
+
+class _Command:
+    """
+    A command waiting in the queue of a director.
+    """
+    __slots__ = ("priority", "sequence", "function", "args", "kwargs", "future", "submitted_at")
+
+    def __init__(self, priority: int, sequence: int, function, args: tuple, kwargs: dict):
+        self.priority = priority
+        self.sequence = sequence
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.future = futures.Future()
+        self.submitted_at = time.monotonic()
+
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+
+
+class _Director:
+    """
+    The queue, token bucket and worker threads of a single director.
+    """
+    def __init__(self, ip: str, bucket: TokenBucket):
+        self.ip = ip
+        self.bucket = bucket
+        self.queue = []
+        self.condition = threading.Condition()
+        self.threads = []
+
+
+
+
+class CommandScheduler:
+    """
+    A rate-limited priority queue in front of the set methods of ApiSetting.
+
+    Commands are not sent by the calling thread but queued per director and sent by worker threads of the scheduler.
+    Every director has its own token bucket, so no more than 'rate' commands per second (after an initial burst of
+    'burst' commands) reach it, no matter how many scripts submit commands. The queue is ordered by priority:
+    EMERGENCY commands are sent before NORMAL ones, which are sent before BULK ones, and commands of the same
+    priority are sent in the order they were submitted. EMERGENCY commands do not wait for a token, so safety
+    relevant scene changes are sent right away even while the bucket is empty.
+
+    The queue of a director holds at most 'max_queue' commands. When it is full, a command of higher priority
+    evicts the newest command of the lowest queued priority, whose future fails. Otherwise the command is rejected
+    with a QueueFullError, or, if 'block' is True, the submitting thread waits until there is room.
+
+    Every submit returns a concurrent.futures.Future with the result of the command, e.g. a requests.Response.
+
+    Attributes:
+        rate (float): Number of commands per second sent to each director. None disables the limit.
+        burst (float): Number of commands that may be sent at once after a pause.
+        max_queue (int): Maximum number of queued commands per director.
+        block (bool): Whether submitting to a full queue waits for room instead of raising a QueueFullError.
+        workers (int): Number of threads sending commands per director.
+        QueueFullError (int): Custom error code for commands rejected because the queue is full.
+
+    Methods:
+        submit: Queues a call of any method of an ApiSetting object.
+        set_scene: Queues ApiSetting.set_scene.
+        set_brightness: Queues ApiSetting.set_brightness.
+        set_many: Queues ApiSetting.set_many.
+        metrics: Returns counts and latency percentiles per priority.
+        close: Stops the worker threads after the queued commands were sent.
+
+    Example:
+        scheduler = CommandScheduler(rate=5, burst=10)
+        api = unified.uApi("admin", "password123", "192.168.1.1")
+        for location in range(100, 200):
+            scheduler.set_brightness(api, location, 30, priority=CommandScheduler.BULK)
+        alarm = scheduler.set_scene(api, 101, "Evacuation", priority=CommandScheduler.EMERGENCY)
+        print(alarm.result().status_code, scheduler.metrics()["EMERGENCY"]["latency"]["p99"])
+    """
+    EMERGENCY = 0
+    NORMAL = 1
+    BULK = 2
+    PRIORITIES = {EMERGENCY: "EMERGENCY", NORMAL: "NORMAL", BULK: "BULK"}
+
+    def __init__(
+        self,
+        rate: float=10.0,
+        burst: float=10.0,
+        max_queue: int=1000,
+        block: bool=False,
+        workers: int=1
+    ):
+        if max_queue < 1:
+            raise ValueError(f"Error: max_queue must be at least 1, got {max_queue}")
+        if workers < 1:
+            raise ValueError(f"Error: workers must be at least 1, got {workers}")
+        if rate is not None and rate <= 0:
+            raise ValueError(f"Error: rate must be positive, got {rate}")
+        if burst < 1:
+            raise ValueError(f"Error: burst must be at least 1, got {burst}")
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.block = block
+        self.workers = workers
+        self.QueueFullError = 3030
+        self._lock = threading.Lock()
+        self._directors = {}
+        self._sequence = itertools.count()
+        self._closed = False
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            priority: {
+                "submitted": 0,
+                "completed": 0,
+                "failed": 0,
+                "rejected": 0,
+                "wait": instrumentation.Histogram(),
+                "latency": instrumentation.Histogram(),
+            }
+            for priority in self.PRIORITIES
+        }
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(rate={self.rate}, burst={self.burst}, max_queue={self.max_queue})"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def submit(
+        self,
+        api: set.ApiSetting,
+        method: str,
+        *args,
+        priority: int=NORMAL,
+        timeout: float=None,
+        **kwargs
+    ) -> futures.Future:
+        """
+        Queues a call of a method of an ApiSetting (or uApi) object.
+
+        Parameters:
+        - api (set.ApiSetting): The object whose method is called. Its 'ip' selects the queue and token bucket.
+        - method (str): The name of the method, e.g. "set_scene".
+        - args, kwargs: The arguments of the method.
+        - priority (int, optional): EMERGENCY, NORMAL or BULK. Defaults to NORMAL.
+        - timeout (float, optional): With 'block', the maximum number of seconds to wait for room in the queue.
+
+        Returns:
+        - concurrent.futures.Future: Resolves with the return value of the method, or fails with its exception.
+
+        Raises:
+        - ValueError: If the priority is unknown or the object has no such method.
+        - RuntimeError: If the queue of the director is full (QueueFullError) or the scheduler was closed.
+        """
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Error: unknown priority {priority}, use one of {sorted(self.PRIORITIES)}")
+        function = getattr(api, method, None)
+        if function is None:
+            raise ValueError(f"Error: {type(api).__name__} has no method {method}")
+
+        director = self._director(api.ip)
+        command = _Command(priority, next(self._sequence), function, args, kwargs)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with director.condition:
+            while len(director.queue) >= self.max_queue and not self._evict(director, priority):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if self._closed or not self.block or (remaining is not None and remaining <= 0):
+                    self._count(priority, "rejected")
+                    raise RuntimeError(f"Error: {self.QueueFullError} - the queue of director {api.ip} is full")
+                director.condition.wait(remaining)
+            if self._closed:
+                raise RuntimeError(f"Error: {__class__.__name__} was closed")
+            heapq.heappush(director.queue, command)
+            director.condition.notify_all()
+        self._count(priority, "submitted")
+        return command.future
+
+
+    def set_scene(self, api: set.ApiSetting, location: int, scene_name: str, priority: int=NORMAL) -> futures.Future:
+        """
+        Queues ApiSetting.set_scene. The future resolves with its requests.Response.
+        """
+        return self.submit(api, "set_scene", location=location, scene_name=scene_name, priority=priority)
+
+
+    def set_brightness(
+        self,
+        api: set.ApiSetting,
+        location: int,
+        brightness: int,
+        priority: int=NORMAL
+    ) -> futures.Future:
+        """
+        Queues ApiSetting.set_brightness. The future resolves with its requests.Response.
+        """
+        return self.submit(api, "set_brightness", location=location, brightness=brightness, priority=priority)
+
+
+    def set_many(
+        self,
+        api: set.ApiSetting,
+        operations: list[dict],
+        batch_size: int=50,
+        priority: int=BULK
+    ) -> futures.Future:
+        """
+        Queues ApiSetting.set_many as a single command. The future resolves with its list of results.
+        """
+        return self.submit(api, "set_many", operations, batch_size=batch_size, priority=priority)
+
+
+    def metrics(self) -> dict:
+        """
+        Returns counts and latency percentiles per priority.
+
+        Returns:
+        - dict: Maps "EMERGENCY", "NORMAL" and "BULK" to dictionaries with the following structure:
+            {
+                "submitted": <int>, "completed": <int>, "failed": <int>, "rejected": <int>, "queued": <int>,
+                "wait": {"count", "mean", "min", "p50", "p90", "p99", "max"},
+                "latency": {"count", "mean", "min", "p50", "p90", "p99", "max"}
+            }
+            'wait' is the time from submit until the command was sent, 'latency' the time until it was answered,
+            both in seconds. Commands that were evicted from a full queue count as rejected.
+        """
+        queued = dict.fromkeys(self.PRIORITIES, 0)
+        with self._lock:
+            directors = list(self._directors.values())
+        for director in directors:
+            with director.condition:
+                for command in director.queue:
+                    queued[command.priority] += 1
+
+        report = {}
+        with self._metrics_lock:
+            for priority, name in self.PRIORITIES.items():
+                metrics = self._metrics[priority]
+                report[name] = {
+                    "submitted": metrics["submitted"],
+                    "completed": metrics["completed"],
+                    "failed": metrics["failed"],
+                    "rejected": metrics["rejected"],
+                    "queued": queued[priority],
+                    "wait": metrics["wait"].summary(),
+                    "latency": metrics["latency"].summary(),
+                }
+        return report
+
+
+    def close(self, cancel_pending: bool=False, timeout: float=None) -> None:
+        """
+        Stops accepting commands and stops the worker threads once the queued commands were sent.
+
+        Parameters:
+        - cancel_pending (bool, optional): Cancel the queued commands instead of sending them. Defaults to False.
+        - timeout (float, optional): Maximum number of seconds to wait for each worker thread.
+        """
+        with self._lock:
+            self._closed = True
+            directors = list(self._directors.values())
+        for director in directors:
+            with director.condition:
+                if cancel_pending:
+                    for command in director.queue:
+                        command.future.cancel()
+                    director.queue.clear()
+                director.condition.notify_all()
+        for director in directors:
+            for thread in director.threads:
+                thread.join(timeout)
+
+
+    def _director(self, ip: str) -> _Director:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Error: {__class__.__name__} was closed")
+            director = self._directors.get(ip)
+            if director is None:
+                director = self._directors[ip] = _Director(ip, TokenBucket(self.rate, self.burst))
+                for number in range(self.workers):
+                    thread = threading.Thread(
+                        target=self._work, args=(director,), name=f"smartengine-scheduler-{ip}-{number}", daemon=True
+                    )
+                    director.threads.append(thread)
+                    thread.start()
+            return director
+
+
+    def _evict(self, director: _Director, priority: int) -> bool:
+        victim = max(director.queue, key=lambda command: (command.priority, command.sequence))
+        if victim.priority <= priority:
+            return False
+        director.queue.remove(victim)
+        heapq.heapify(director.queue)
+        if not victim.future.set_running_or_notify_cancel():
+            return True
+        self._count(victim.priority, "rejected")
+        victim.future.set_exception(RuntimeError(
+            f"Error: {self.QueueFullError} - evicted from the full queue of director {director.ip} by a command of "
+            f"priority {self.PRIORITIES[priority]}"
+        ))
+        return True
+
+
+    def _work(self, director: _Director) -> None:
+        while True:
+            with director.condition:
+                while True:
+                    if not director.queue:
+                        if self._closed:
+                            return
+                        director.condition.wait()
+                        continue
+                    command = director.queue[0]
+                    wait = 0.0 if command.priority == self.EMERGENCY else director.bucket.wait_time()
+                    if wait <= 0:
+                        break
+                    director.condition.wait(wait)
+                heapq.heappop(director.queue)
+                director.condition.notify_all()
+                if not command.future.set_running_or_notify_cancel():
+                    continue
+                director.bucket.take()
+            self._run(command)
+
+
+    def _run(self, command: _Command) -> None:
+        started_at = time.monotonic()
+        try:
+            result = command.function(*command.args, **command.kwargs)
+        except Exception as error:
+            command.future.set_exception(error)
+            outcome = "failed"
+        else:
+            command.future.set_result(result)
+            outcome = "completed"
+        finished_at = time.monotonic()
+        with self._metrics_lock:
+            metrics = self._metrics[command.priority]
+            metrics[outcome] += 1
+            metrics["wait"].add(started_at - command.submitted_at)
+            metrics["latency"].add(finished_at - command.submitted_at)
+
+
+    def _count(self, priority: int, name: str) -> None:
+        with self._metrics_lock:
+            self._metrics[priority][name] += 1
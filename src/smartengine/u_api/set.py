@@ -1,6 +1,9 @@
 import json
 import requests
 
+from . import catalog
+from .. import instrumentation, session
+
 
 class ApiSetting:
     """
@@ -18,12 +21,18 @@ class ApiSetting:
         NotFoundInApiError (int): Custom error code for not found errors in API.
         SensorStatsNotAvailableError (int): Custom error code for unavailable sensor statistics.
         MissingArgumentError (int): Custom error code for missing arguments in method calls.
+        session_pool (session.SessionPool): The pool of keep-alive connections used to talk to the smartdirector. 
+        Pass session.shared_pool or any other pool to share connections between instances.
         sensor_stats (list[str]): List of available sensor statistics.
+        catalog (catalog.SceneCatalog): The scene and location catalog set calls are checked against before they 
+        are sent. None (the default) sends them unchecked.
 
     Methods:
         __repr__: Returns a formal string representation of the ApiSetting instance.
+        load_catalog: Loads the scene and location catalog used to check set calls locally.
         set_scene: Sets a specific scene for a given location in the network system.
         set_policyTrigger: Activates a specific policy for a given location in the network system.
+        set_many: Sets scenes and brightness levels for many locations with as few requests as possible.
 
     The class primarily handles sending structured JSON requests to smartdirectors's uAPI to modify or set various 
     configurations. These configurations include scenes and policies which can be specified for different locations.
@@ -33,11 +42,19 @@ class ApiSetting:
         response = api_setting.set_scenes(location='101', scene_name='Evening')
         print(response)
     """
-    def __init__(self, user: str, password: str, ipv4_adress: str="192.168.1.1"):
+    def __init__(
+        self, 
+        user: str, 
+        password: str, 
+        ipv4_adress: str="192.168.1.1", 
+        session_pool: session.SessionPool=None, 
+        pool_maxsize: int=10
+    ):
         self.ip = ipv4_adress
         self.user = user
         self.__password = password
         self.url = f"https://{ipv4_adress}/uApi"
+        self.session_pool = session.SessionPool(pool_maxsize=pool_maxsize) if session_pool is None else session_pool
         self.NotFoundInApiError = 8080
         self.SensorStatsNotAvailableError = 5050
         self.MissingArgumentError = 2020
@@ -55,13 +72,41 @@ class ApiSetting:
             "pressure",
             "indoorAirQuality",
         ]
+        self.catalog = None
 
 
     def __repr__(self):
         return f"{__class__.__name__}({self.user}, {self.__password}, {self.ip})"
 
 
-    def set_scene(self, location: int=None, scene_name: str=None) -> requests.Response:
+    def load_catalog(self, rapi=None) -> catalog.SceneCatalog:
+        """
+        Loads the scene and location catalog of the smartdirector once and checks every later set call against it.
+
+        With a catalog, location names can be used wherever a location id is expected, scene names are checked 
+        before anything is sent, and scenes can be activated by their order. Call catalog.refresh() after scenes 
+        or locations were changed on the director.
+
+        Parameters:
+        - rapi (LocationsApi, optional): An rApi or LocationsApi object to build the catalog from. If None, the 
+        /rApi document is read with this object's credentials through the shared snapshot cache.
+
+        Returns:
+        - catalog.SceneCatalog: The loaded catalog, also stored in 'self.catalog'.
+
+        Example usage:
+        >>> api.load_catalog()
+        >>> api.set_scene(location="Meeting Room", scene_order=2)
+        """
+        if rapi is None:
+            self.catalog = catalog.SceneCatalog.load(self.user, self.__password, self.ip, self.session_pool)
+        else:
+            self.catalog = catalog.SceneCatalog(rapi)
+        return self.catalog
+
+
+    @instrumentation.instrumented(span=None)
+    def set_scene(self, location: int=None, scene_name: str=None, scene_order: int=None) -> requests.Response:
         """
         Sets the scene for a given location.
 
@@ -73,12 +118,15 @@ class ApiSetting:
         Parameters:
         - location (str, optional): The unique identifier for the location where the scene is to be set.
         - scene_name (str, optional): The name of the scene to activate at the location.
+        - scene_order (int, optional): The order of the scene to activate, used instead of scene_name. Requires a 
+        catalog loaded with load_catalog.
 
         Returns:
         - requests.Response: The response object resulting from the POST request.
 
         Raises:
         - ValueError: If the scene_name is not provided.
+        - ValueError: If a catalog is loaded and the location or scene does not exist. Nothing is sent then.
 
         Note:
         The method disables SSL certificate verification and uses basic authentication
@@ -90,33 +138,17 @@ class ApiSetting:
         >>> response.status_code
         200
         """
-        if scene_name is None:
-            raise ValueError(f"{self.MissingArgumentError}: scene_name argument was not specified")
-        if location is None:
-            raise ValueError(f"{self.MissingArgumentError}: location argument was not specified")
-        payload = {
-            "protocolVersion" : "1",
-            "schemaVersion" : "1.4.0",
-            "requestType" : "set",
-            "requestData" : {
-            "location" : [
-                {
-                "id" : location,
-                "sceneControl" : {
-                    "activeSceneName" : scene_name
-                }
-                }
-            ]
-            }
-        }
+        location, scene_name = self._scene_target(location, scene_name, scene_order)
+        payload = self._set_payload([self._scene_location(location, scene_name)])
         json_payload = json.dumps(payload)
-        response = requests.post(url=self.url, data=json_payload, verify=False, auth=(self.user, self.__password))
+        response = self.session_pool.post(self.ip, url=self.url, data=json_payload, auth=(self.user, self.__password))
         return response
     
     
 
 
 
+    @instrumentation.instrumented(span=None)
     def set_brightness(self, location: int=None, brightness: int=None) -> requests.Response:
         """
         Sends a request to set the brightness level for a specific location.
@@ -137,6 +169,7 @@ class ApiSetting:
 
         Raises:
         - ValueError: If either 'location' or 'brightness' arguments are not provided.
+        - ValueError: If a catalog is loaded and the location does not exist.
 
         Examples:
         >>> response = set_brightness(location=123, brightness=75)
@@ -147,24 +180,163 @@ class ApiSetting:
             raise ValueError(f"{self.MissingArgumentError}: loctaion argument was not specfied")
         if brightness is None:
             raise ValueError(f"{self.MissingArgumentError}: brightness argument was not specified")
-        payload = {
+        location = self._target_location(location)
+        payload = self._set_payload([self._brightness_location(location, brightness)])
+        json_payload = json.dumps(payload)
+        response = self.session_pool.post(self.ip, url=self.url, data=json_payload, auth=(self.user, self.__password))
+        return response
+    
+
+
+
+    @instrumentation.instrumented(span=None)
+    def set_many(self, operations: list[dict], batch_size: int=50) -> list[dict]:
+        """
+        Sets scenes and brightness levels for many locations with as few requests as possible.
+
+        This method packs the given operations into the "location" array of the uApi's set payload, so up to 
+        'batch_size' locations are changed with a single POST request. Scene and brightness operations can be mixed 
+        freely. Operations addressing a location that is already part of the current batch start a new batch, so 
+        every request names each location at most once and operations on the same location are applied in order.
+
+        The uApi answers a set request as a whole, so the results tell which request carried an operation, not 
+        whether the director applied it to that location. All operations of a batch share the same response object, 
+        and an answer with an HTTP error status is reported as a requests.HTTPError in the "error" of every 
+        operation of the batch.
+
+        Parameters:
+        - operations (list[dict]): The operations to send. Each operation is a dictionary with a "location" key and 
+        either a "scene_name" key (or a "scene_order" key if a catalog is loaded), a "brightness" key or both.
+        - batch_size (int, optional): Maximum number of locations sent in a single request. Defaults to 50.
+
+        Returns:
+        - list[dict]: One dictionary per operation, in the order of 'operations'. Each dictionary has the following 
+        structure:
+            {
+                "location": <location_id>,
+                "response": <requests.Response> of the batch, or None if no response arrived,
+                "error": <requests.RequestException> (HTTPError for an error status) or None if the batch succeeded
+            }
+
+        Raises:
+        - ValueError: If an operation has no location or neither a scene_name nor a brightness.
+        - ValueError: If a catalog is loaded and a location or scene does not exist. Nothing is sent then.
+        - ValueError: If batch_size is smaller than 1.
+
+        Example usage:
+        >>> results = set_many([
+        ...     {"location": 101, "scene_name": "Evening"},
+        ...     {"location": 102, "brightness": 40},
+        ... ])
+        >>> [result["response"].status_code for result in results]
+        [200, 200]
+        """
+        entries, batches = self._batch_locations(operations, batch_size)
+        results = [None] * len(entries)
+        for batch in batches:
+            json_payload = json.dumps(self._set_payload([entries[position] for position in batch]))
+            try:
+                response = None
+                response = self.session_pool.post(
+                    self.ip, url=self.url, data=json_payload, auth=(self.user, self.__password)
+                )
+                response.raise_for_status()
+                error = None
+            except requests.RequestException as exception:
+                error = exception
+            for position in batch:
+                results[position] = {"location": entries[position]["id"], "response": response, "error": error}
+        return results
+
+
+    def _batch_locations(self, operations: list[dict], batch_size: int) -> tuple[list[dict], list[list[int]]]:
+        if batch_size < 1:
+            raise ValueError(f"{self.MissingArgumentError}: batch_size must be at least 1")
+
+        entries = []
+        for operation in operations:
+            location = operation.get("location")
+            if location is None:
+                raise ValueError(f"{self.MissingArgumentError}: location argument was not specified")
+            scene_name, scene_order = operation.get("scene_name"), operation.get("scene_order")
+            if scene_name is None and scene_order is None and operation.get("brightness") is None:
+                raise ValueError(f"{self.MissingArgumentError}: scene_name or brightness argument was not specified")
+            if scene_name is None and scene_order is None:
+                location = self._target_location(location)
+            else:
+                location, scene_name = self._scene_target(location, scene_name, scene_order)
+            entry = {"id": location}
+            if scene_name is not None:
+                entry.update(self._scene_location(location, scene_name))
+            if operation.get("brightness") is not None:
+                entry.update(self._brightness_location(location, operation["brightness"]))
+            entries.append(entry)
+
+        batches = []
+        batch = []
+        batch_locations = set()
+        for position, entry in enumerate(entries):
+            if len(batch) >= batch_size or entry["id"] in batch_locations:
+                batches.append(batch)
+                batch = []
+                batch_locations = set()
+            batch.append(position)
+            batch_locations.add(entry["id"])
+        if batch:
+            batches.append(batch)
+        return entries, batches
+
+
+    def _scene_target(self, location: int, scene_name: str, scene_order: int) -> tuple:
+        if scene_name is None and scene_order is not None and location is not None:
+            if self.catalog is None:
+                raise ValueError(f"{self.MissingArgumentError}: scene_order requires a catalog, call load_catalog")
+            scene_name = self.catalog.scene_name(location, scene_order)
+        if scene_name is None:
+            raise ValueError(f"{self.MissingArgumentError}: scene_name argument was not specified")
+        if location is None:
+            raise ValueError(f"{self.MissingArgumentError}: location argument was not specified")
+        if self.catalog is not None:
+            location = self.catalog.check_scene(location, scene_name)
+        return location, scene_name
+
+
+    def _target_location(self, location: int) -> int:
+        if self.catalog is None:
+            return location
+        return self.catalog.resolve(location)
+
+
+    @staticmethod
+    def _set_payload(locations: list[dict]) -> dict:
+        return {
             "protocolVersion" : "1",
             "schemaVersion" : "1.4.0",
             "requestType" : "set",
             "requestData" : {
-            "location" : [
-                {
-                    "id" : location,
-                    "wallSwitch":{
-                    "lowLevelControl":{
-                        "brightness":brightness,
-                        "activated":-9999999
-                    }
-                    }
+                "location" : locations
+            }
+        }
+
+
+    @staticmethod
+    def _scene_location(location: int, scene_name: str) -> dict:
+        return {
+            "id" : location,
+            "sceneControl" : {
+                "activeSceneName" : scene_name
+            }
+        }
+
+
+    @staticmethod
+    def _brightness_location(location: int, brightness: int) -> dict:
+        return {
+            "id" : location,
+            "wallSwitch":{
+                "lowLevelControl":{
+                    "brightness":brightness,
+                    "activated":-9999999
                 }
-            ]
             }
         }
-        json_payload = json.dumps(payload)
-        response = requests.post(url=self.url, data=json_payload, verify=False, auth=(self.user, self.__password))
-        return response
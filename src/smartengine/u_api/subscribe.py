@@ -1,5 +1,7 @@
 import json
-import requests
+
+from . import filters, framing, resilient
+from .. import instrumentation, session
 
 
 class ApiSubscription:
@@ -18,7 +20,11 @@ class ApiSubscription:
         NotFoundInApiError (int): Custom error code for not found errors in API.
         SensorStatsNotAvailableError (int): Custom error code for unavailable sensor statistics.
         MissingArgumentError (int): Custom error code for missing arguments in method calls.
+        session_pool (session.SessionPool): The pool of keep-alive connections used to talk to the smartdirector. 
+        Pass session.shared_pool or any other pool to share connections between instances.
         sensor_stats (list[str]): List of available sensor statistics that can be streamed.
+        chunk_size (int): Number of bytes read from the stream at once. Defaults to 128.
+        max_message_size (int): Maximum size of a single streamed message in bytes. Defaults to 16 MiB.
 
     Methods:
         __repr__: Returns a formal string representation of the ApiSubscription instance.
@@ -26,6 +32,9 @@ class ApiSubscription:
         with updates.
         stream_fixture_data: Streams data for a specified fixture and its data points, yielding dictionaries 
         with updates.
+        stream_many: Streams data for many locations and fixtures over one connection, yielding one event per 
+        entity and sensor stat.
+        resilient_stream: Creates a subscription that reconnects on its own when the connection is lost.
 
     The class provides two primary methods for data streaming: `stream_location_data` and `stream_fixture_data`. 
     Both methods utilize HTTP streaming to continuously receive and yield data updates from the server.
@@ -35,11 +44,19 @@ class ApiSubscription:
         for data in api.stream_location_data(location=101):
             print(data)
     """
-    def __init__(self, user: str, password: str, ipv4_adress: str="192.168.1.1"):
+    def __init__(
+        self, 
+        user: str, 
+        password: str, 
+        ipv4_adress: str="192.168.1.1", 
+        session_pool: session.SessionPool=None, 
+        pool_maxsize: int=10
+    ):
         self.ip = ipv4_adress
         self.user = user
         self.__password = password
         self.url = f"https://{ipv4_adress}/uApi"
+        self.session_pool = session.SessionPool(pool_maxsize=pool_maxsize) if session_pool is None else session_pool
         self.NotFoundInApiError = 8080
         self.SensorStatsNotAvailableError = 5050
         self.MissingArgumentError = 2020
@@ -57,13 +74,18 @@ class ApiSubscription:
             "pressure",
             "indoorAirQuality",
         ]
+        self.chunk_size = 128
+        self.max_message_size = 16 * 1024 * 1024
 
 
     def __repr__(self):
         return f"{__class__.__name__}({self.user}, {self.__password}, {self.ip})"
 
 
-    def stream_location_data(self, location: int=None, sensor_stat: str=None) -> dict:
+    @instrumentation.instrumented(span=None)
+    def stream_location_data(
+        self, location: int=None, sensor_stat: str=None, resilient: bool=False, stream_filter: filters.StreamFilter=None
+    ) -> dict:
         """
         Generates a stream of data for a specified location its datapoints.
 
@@ -77,6 +99,10 @@ class ApiSubscription:
         - location (str, optional): ID of the location. If None, subscribes to to every location.
         - sensor_stat (str, optional): Specific room data to subscribe to. If None, subscribes to sensor data
         for the given location. Raises a ValueError if the specified sensor data is generally not available.
+        - resilient (bool, optional): If True, reconnects with the defaults of resilient_stream whenever the 
+        connection is lost instead of ending the stream. Defaults to False.
+        - stream_filter (filters.StreamFilter, optional): Drops updates that fail its deadbands, minimum interval or 
+        predicates right after each message is decoded. Messages left without updates are not yielded.
 
         Yields:
         - dict: A dictionary containing the streamed data for the specified location and its sensor data.
@@ -88,55 +114,25 @@ class ApiSubscription:
         This method utilizes a streaming HTTP request, and the yielded dictionaries depend on the response structure from 
         the server. It is designed to continuously yield data as long as the server provides it.        
         """
-        if sensor_stat is None:
-            payload = {
-                "protocolVersion" : "1",
-                "schemaVersion" : "1.4.0",
-                "requestType" : "subscribe",
-                "requestData" : {
-                    "location" : [
-                        {
-                            "id" : location,
-                            "sensorStats" : {}
-                        }
-                    ]
-                }
-            }
-        elif sensor_stat not in self.sensor_stats:
+        if sensor_stat is not None and sensor_stat not in self.sensor_stats:
             raise ValueError(f"Error: {self.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available")
-        else:
-            payload = {
-                "protocolVersion" : "1",
-                "schemaVersion" : "1.4.0",
-                "requestType" : "subscribe",
-                "requestData" : {
-                    "location" : [
-                        {
-                            "id" : location,
-                            "sensorStats" : {
-                                sensor_stat : {}
-                            }
-                        }
-                    ]
-                }
-            }
-        json_payload = json.dumps(payload)
-        chunks = ""
-        response = requests.post(self.url, data=json_payload, verify=False, auth=(self.user, self.__password), stream=True)
-        for chunk in response.iter_content(chunk_size=128):
-            chunks += (chunk.decode())
-            if "\r\n\r\n\r\n" in chunk.decode():
-                chunks.replace("\r\n\r\n\r\n", "")
-                chunks = json.loads(chunks)
-                response_object = chunks
-                chunks = ""
-                yield response_object
+        sensor_stats = [] if sensor_stat is None else [sensor_stat]
+        if resilient:
+            yield from self.resilient_stream(
+                locations=[location], sensor_stats=sensor_stats, stream_filter=stream_filter
+            ).messages()
+            return
+        payload = self._subscribe_payload(locations=[location], sensor_stats=sensor_stats)
+        yield from self._stream(payload, stream_filter=stream_filter)
     
 
 
 
 
-    def stream_fixture_data(self, fixture: str=None, sensor_stat: str=None) -> dict:
+    @instrumentation.instrumented(span=None)
+    def stream_fixture_data(
+        self, fixture: str=None, sensor_stat: str=None, resilient: bool=False, stream_filter: filters.StreamFilter=None
+    ) -> dict:
         """
         Generates a stream of data for a specified fixture its data.
 
@@ -149,6 +145,10 @@ class ApiSubscription:
         - fixture (str, optional): Serial number of the fixture. If None, raises a ValueError indicating a missing fixture ID.
         - sensor_stat (str, optional): Specific sensor status to subscribe to. If None, subscribes to all sensor data 
         for the given fixture. Raises a ValueError if the specified sensor data is gerally not available.
+        - resilient (bool, optional): If True, reconnects with the defaults of resilient_stream whenever the 
+        connection is lost instead of ending the stream. Defaults to False.
+        - stream_filter (filters.StreamFilter, optional): Drops updates that fail its deadbands, minimum interval or 
+        predicates right after each message is decoded. Messages left without updates are not yielded.
 
         Yields:
         - dict: A dictionary containing the streamed data for the specified fixture and sensor status.
@@ -162,46 +162,188 @@ class ApiSubscription:
         """
         if fixture is None:
             raise ValueError(f"Error: {self.MissingArgumentError} - Missing fixture Identification (Serialnumber)")
-        if sensor_stat is None:
-            payload = {
-                "protocolVersion" : "1",
-                "schemaVersion" : "1.4.0",
-                "requestType" : "subscribe",
-                "requestData" : {
-                    "fixture" : [
-                        {
-                            "serialNum" : fixture,
-                            "sensorStats" : {}
-                        }
-                    ]
-                }
-            }
-        elif sensor_stat not in self.sensor_stats:
+        if sensor_stat is not None and sensor_stat not in self.sensor_stats:
             raise ValueError(f"Error: {self.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available")
-        else:
-            payload = {
-                "protocolVersion" : "1",
-                "schemaVersion" : "1.4.0",
-                "requestType" : "subscribe",
-                "requestData" : {
-                    "fixture" : [
-                        {
-                            "serialNum" : fixture,
-                            "sensorStats" : {
-                                sensor_stat : {}
-                            }
-                        }
-                    ]
-                }
+        sensor_stats = [] if sensor_stat is None else [sensor_stat]
+        if resilient:
+            yield from self.resilient_stream(
+                fixtures=[fixture], sensor_stats=sensor_stats, stream_filter=stream_filter
+            ).messages()
+            return
+        payload = self._subscribe_payload(fixtures=[fixture], sensor_stats=sensor_stats)
+        yield from self._stream(payload, stream_filter=stream_filter)
+    
+
+
+
+    @instrumentation.instrumented(span=None)
+    def stream_many(
+        self,
+        locations: list=None,
+        fixtures: list[str]=None,
+        sensor_stats: list[str]=None,
+        resilient: bool=False,
+        stream_filter: filters.StreamFilter=None
+    ) -> dict:
+        """
+        Generates one stream of events for many locations, fixtures and sensor stats.
+
+        This method subscribes to all given locations and fixtures with a single subscribe payload, so the 
+        smartdirector keeps only one connection open no matter how many entities are watched. Every message the server 
+        sends is split into one event per entity and sensor stat, so consumers do not need to know the layout of 
+        the uApi's response. As with the single-entity streams, the first payload includes all data points and 
+        later payloads only the changed ones.
+
+        Parameters:
+        - locations (list, optional): IDs of the locations to subscribe to.
+        - fixtures (list[str], optional): Serial numbers of the fixtures to subscribe to.
+        - sensor_stats (list[str], optional): Sensor stats to subscribe to for every location and fixture. If None, 
+        subscribes to all sensor data of the given entities.
+        - resilient (bool, optional): If True, reconnects with the defaults of resilient_stream whenever the 
+        connection is lost. After a reconnect, only the values that changed in the meantime are yielded. 
+        Defaults to False.
+        - stream_filter (filters.StreamFilter, optional): Drops updates that fail its deadbands, minimum interval or 
+        predicates right after each message is decoded. Messages left without updates are not yielded.
+
+        Yields:
+        - dict: One event per entity and sensor stat with the following structure:
+            {
+                "entity": "location" or "fixture",
+                "id": <location_id or fixture_serial_number>,
+                "stat": <sensor_stat>,
+                "value": <instant value of the sensor stat>
             }
+
+        Raises:
+        - ValueError: If neither locations nor fixtures are provided.
+        - ValueError: If one of the provided 'sensor_stats' is generally not available.
+
+        Example:
+        >>> for event in api.stream_many(locations=[101, 102], fixtures=["CSJ00000000001J020143808848"],
+        ...                              sensor_stats=["power", "temperature"]):
+        ...     print(event["entity"], event["id"], event["stat"], event["value"])
+        """
+        if not locations and not fixtures:
+            raise ValueError(f"Error: {self.MissingArgumentError} - Missing locations or fixtures to subscribe to")
+        for sensor_stat in sensor_stats or []:
+            if sensor_stat not in self.sensor_stats:
+                raise ValueError(f"Error: {self.SensorStatsNotAvailableError} - Specified Sensorstat is generally not available")
+        if resilient:
+            yield from self.resilient_stream(
+                locations=locations, fixtures=fixtures, sensor_stats=sensor_stats, stream_filter=stream_filter
+            ).events()
+            return
+        payload = self._subscribe_payload(locations=locations or [], fixtures=fixtures or [], sensor_stats=sensor_stats or [])
+        for message in self._stream(payload, stream_filter=stream_filter):
+            for entity, id_, stat, value in iter_updates(message):
+                yield {"entity": entity, "id": id_, "stat": stat, "value": value}
+
+
+    def resilient_stream(
+        self, locations: list=None, fixtures: list[str]=None, sensor_stats: list[str]=None, **options
+    ) -> "resilient.ResilientStream":
+        """
+        Creates a subscription for many locations and fixtures that reconnects on its own when the connection to the 
+        smartdirector is lost, the stream ends, or no data arrives for a while.
+
+        Parameters:
+        - locations (list, optional): IDs of the locations to subscribe to.
+        - fixtures (list[str], optional): Serial numbers of the fixtures to subscribe to.
+        - sensor_stats (list[str], optional): Sensor stats to subscribe to. If None, subscribes to all sensor data.
+        - **options: Passed on to resilient.ResilientStream, e.g. idle_timeout, initial_backoff, max_backoff, 
+        jitter, max_reconnects, on_resync or stream_filter.
+
+        Returns:
+        - resilient.ResilientStream: The subscription. Iterate its messages() or events() to start it.
+
+        Raises:
+        - ValueError: If neither locations nor fixtures are provided.
+        - ValueError: If one of the provided 'sensor_stats' is generally not available.
+
+        Example:
+        >>> stream = api.resilient_stream(locations=[101], sensor_stats=["power"], idle_timeout=30)
+        >>> for event in stream.events():
+        ...     print(event["id"], event["value"], stream.metrics()["reconnects"])
+        """
+        return resilient.ResilientStream(
+            self, locations=locations, fixtures=fixtures, sensor_stats=sensor_stats, **options
+        )
+
+
+    @staticmethod
+    def _subscribe_payload(locations: list=(), fixtures: list[str]=(), sensor_stats: list[str]=()) -> dict:
+        request_data = {}
+        if len(locations) > 0:
+            request_data["location"] = [
+                {
+                    "id" : location,
+                    "sensorStats" : {sensor_stat : {} for sensor_stat in sensor_stats}
+                }
+                for location in locations
+            ]
+        if len(fixtures) > 0:
+            request_data["fixture"] = [
+                {
+                    "serialNum" : fixture,
+                    "sensorStats" : {sensor_stat : {} for sensor_stat in sensor_stats}
+                }
+                for fixture in fixtures
+            ]
+        return {
+            "protocolVersion" : "1",
+            "schemaVersion" : "1.4.0",
+            "requestType" : "subscribe",
+            "requestData" : request_data
+        }
+
+
+    def _stream(self, payload: dict, on_response=None, stream_filter: filters.StreamFilter=None, **kwargs) -> dict:
         json_payload = json.dumps(payload)
-        chunks = ""
-        response = requests.post(self.url, data=json_payload, verify=False, auth=(self.user, self.__password), stream=True)
-        for chunk in response.iter_content(chunk_size=128):
-            chunks += (chunk.decode())
-            if "\r\n\r\n\r\n" in chunk.decode():
-                chunks.replace("\r\n\r\n\r\n", "")
-                chunks = json.loads(chunks)
-                response_object = chunks
-                chunks = ""
-                yield response_object
+        framer = framing.StreamFramer(max_message_size=self.max_message_size, tags={"ip": self.ip, "api": "uApi"})
+        response = self.session_pool.post(
+            self.ip, url=self.url, data=json_payload, auth=(self.user, self.__password), stream=True, **kwargs
+        )
+        try:
+            if on_response is not None:
+                on_response(response)
+            messages = framer.messages(response.iter_content(chunk_size=self.chunk_size))
+            if stream_filter is None:
+                yield from messages
+            else:
+                for message in messages:
+                    message = stream_filter.apply(message)
+                    if message is not None:
+                        yield message
+        finally:
+            response.close()
+
+
+
+
+_ENTITY_KEYS = (("location", "id"), ("fixture", "serialNum"))
+
+
+def iter_updates(message: dict):
+    """
+    Splits a uApi subscription message into single sensor stat updates.
+
+    The entities of a message are read from its "responseData" section, or from the message itself if it has none. 
+    Sensor stats given as a dictionary with an "instant" key are reduced to that value, all others are passed on 
+    unchanged.
+
+    Parameters:
+    - message (dict): A decoded message of a uApi subscription stream.
+
+    Yields:
+    - tuple: (entity, id, stat, value) where entity is either "location" or "fixture".
+    """
+    data = message.get("responseData", message)
+    if not isinstance(data, dict):
+        return
+    for entity, id_key in _ENTITY_KEYS:
+        for element in data.get(entity) or []:
+            id_ = element.get(id_key)
+            for stat, value in (element.get("sensorStats") or {}).items():
+                if isinstance(value, dict) and "instant" in value:
+                    value = value["instant"]
+                yield entity, id_, stat, value
@@ -0,0 +1,317 @@
+import array
+import collections
+import threading
+import time
+
+from . import subscribe
+
+
+class RingBuffer:
+    """
+    A fixed-size history of (timestamp, value) samples of a single sensor stat.
+
+    Timestamps and values are stored in two preallocated 'array("d")' buffers, so a buffer always occupies the same
+    amount of memory no matter how long the stream runs. Once the buffer is full, every new sample overwrites the
+    oldest one.
+
+    Attributes:
+        capacity (int): The maximum number of samples the buffer holds.
+        nbytes (int): The number of bytes used by the timestamp and value buffers.
+
+    Methods:
+        append: Adds a sample, overwriting the oldest one if the buffer is full.
+        last: Returns the newest samples.
+        since: Returns all samples taken at or after a given time.
+        downsample: Aggregates the samples into fixed-width time buckets.
+
+    Example:
+        buffer = RingBuffer(capacity=3)
+        for value in (1, 2, 3, 4):
+            buffer.append(value)
+        print(buffer.last(2))
+    """
+    def __init__(self, capacity: int=1024):
+        if capacity < 1:
+            raise ValueError(f"Error: capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self._timestamps = array.array("d", bytes(8 * capacity))
+        self._values = array.array("d", bytes(8 * capacity))
+        self._next = 0
+        self._size = 0
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(capacity={self.capacity}, size={self._size})"
+
+
+    def __len__(self):
+        return self._size
+
+
+    def __iter__(self):
+        start = self._next - self._size
+        for position in range(start, self._next):
+            yield self._timestamps[position % self.capacity], self._values[position % self.capacity]
+
+
+    @property
+    def nbytes(self) -> int:
+        return 2 * self._values.itemsize * self.capacity
+
+
+    def append(self, value: float, timestamp: float=None) -> None:
+        """
+        Adds a sample to the buffer, overwriting the oldest sample if the buffer is full.
+
+        Parameters:
+        - value (float): The sensor value.
+        - timestamp (float, optional): UNIX timestamp of the sample. Defaults to the current time.
+        """
+        self._timestamps[self._next] = time.time() if timestamp is None else timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+
+    def last(self, n: int=None) -> list[tuple]:
+        """
+        Returns the newest 'n' samples, oldest first. Without 'n' every sample in the buffer is returned. Only the
+        requested samples are sliced out of the underlying arrays.
+
+        Returns:
+        - list[tuple]: (timestamp, value) pairs.
+        """
+        count = self._size if n is None else max(0, min(n, self._size))
+        start = (self._next - count) % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            timestamps, values = self._timestamps[start:end], self._values[start:end]
+        else:
+            end -= self.capacity
+            timestamps = self._timestamps[start:] + self._timestamps[:end]
+            values = self._values[start:] + self._values[:end]
+        return list(zip(timestamps, values))
+
+
+    def since(self, timestamp: float) -> list[tuple]:
+        """
+        Returns every sample taken at or after the given UNIX timestamp, oldest first.
+
+        Returns:
+        - list[tuple]: (timestamp, value) pairs.
+        """
+        samples = []
+        position = self._next
+        for _ in range(self._size):
+            position = (position - 1) % self.capacity
+            if self._timestamps[position] < timestamp:
+                break
+            samples.append((self._timestamps[position], self._values[position]))
+        samples.reverse()
+        return samples
+
+
+    def downsample(self, bucket: float, since: float=None) -> list[dict]:
+        """
+        Aggregates the samples into time buckets of 'bucket' seconds, aligned to multiples of the bucket width.
+
+        Parameters:
+        - bucket (float): The width of a bucket in seconds.
+        - since (float, optional): Only samples taken at or after this UNIX timestamp are aggregated.
+
+        Returns:
+        - list[dict]: One dictionary per non-empty bucket, oldest first, with the keys "start", "min", "max", "mean"
+        and "count".
+
+        Raises:
+        - ValueError: If the bucket width is not positive.
+        """
+        if bucket <= 0:
+            raise ValueError(f"Error: bucket must be a positive number of seconds, got {bucket}")
+        samples = self if since is None else self.since(since)
+        buckets = []
+        current = None
+        for timestamp, value in samples:
+            start = timestamp - timestamp % bucket
+            if current is None or current["start"] != start:
+                current = {"start": start, "min": value, "max": value, "mean": 0.0, "count": 0}
+                buckets.append(current)
+            current["min"] = min(current["min"], value)
+            current["max"] = max(current["max"], value)
+            current["mean"] += value
+            current["count"] += 1
+        for current in buckets:
+            current["mean"] /= current["count"]
+        return buckets
+
+
+
+
+class TimeSeriesStore:
+    """
+    A fixed-memory store of the sensor values received over uApi subscription streams.
+
+    Every (entity, id, sensor stat) combination gets its own RingBuffer. The total memory of all buffers is bounded by
+    a budget: when a new series would exceed it, the series that was updated least recently is evicted. Values that
+    cannot be converted to a number are ignored. The store is thread-safe, so a stream can be recorded in one thread
+    while others query it. The budget must hold at least one series, otherwise the constructor raises a ValueError.
+
+    Attributes:
+        capacity (int): The number of samples kept per series.
+        max_bytes (int): The memory budget of all series together.
+        nbytes (int): The memory currently used by all series.
+
+    Methods:
+        record: Records every sensor stat of a subscription message.
+        add: Records a single sample.
+        consume: Records the messages of a stream while passing them on.
+        series: Returns the RingBuffer of a series.
+        keys: Returns all recorded series.
+        last: Returns the newest samples of a series.
+        since: Returns the samples of a series taken at or after a given time.
+        downsample: Aggregates the samples of a series into time buckets.
+
+    Example:
+        store = TimeSeriesStore(capacity=3600)
+        for data in store.consume(api.stream_location_data(location=101)):
+            print(store.downsample("location", 101, "power", bucket=60))
+    """
+    def __init__(self, capacity: int=1024, max_bytes: int=64 * 1024 * 1024):
+        series_bytes = RingBuffer(capacity).nbytes
+        if max_bytes < series_bytes:
+            raise ValueError(
+                f"Error: max_bytes must hold at least one series of {series_bytes} bytes (capacity {capacity}), "
+                f"got {max_bytes}"
+            )
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._series = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._series_bytes = series_bytes
+
+
+    def __repr__(self):
+        return f"{__class__.__name__}(capacity={self.capacity}, max_bytes={self.max_bytes}, series={len(self._series)})"
+
+
+    def __len__(self):
+        return len(self._series)
+
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._series) * self._series_bytes
+
+
+    def record(self, message: dict, timestamp: float=None) -> int:
+        """
+        Records every sensor stat of a uApi subscription message.
+
+        Parameters:
+        - message (dict): A decoded message of a uApi subscription stream.
+        - timestamp (float, optional): UNIX timestamp of the samples. Defaults to the current time.
+
+        Returns:
+        - int: The number of recorded samples.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        recorded = 0
+        for entity, id_, stat, value in subscribe.iter_updates(message):
+            recorded += self.add(entity, id_, stat, value, timestamp)
+        return recorded
+
+
+    def add(self, entity: str, id_, stat: str, value: float, timestamp: float=None) -> bool:
+        """
+        Records a single sample.
+
+        Parameters:
+        - entity (str): Either "fixture" or "location".
+        - id_ (str | int): The serial number of the fixture or the id of the location.
+        - stat (str): The sensor stat.
+        - value (float): The sensor value.
+        - timestamp (float, optional): UNIX timestamp of the sample. Defaults to the current time.
+
+        Returns:
+        - bool: False if the value is not numeric and was ignored, True otherwise.
+        """
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return False
+        key = (entity, id_, stat)
+        with self._lock:
+            buffer = self._series.get(key)
+            if buffer is None:
+                while self._series and (len(self._series) + 1) * self._series_bytes > self.max_bytes:
+                    self._series.popitem(last=False)
+                buffer = self._series[key] = RingBuffer(self.capacity)
+            else:
+                self._series.move_to_end(key)
+            buffer.append(value, timestamp)
+        return True
+
+
+    def consume(self, stream):
+        """
+        Records every message of a subscription stream and yields it on unchanged.
+
+        Parameters:
+        - stream (iterable): A generator such as stream_location_data, stream_fixture_data or stream_many. Events of
+        stream_many are recorded as single samples.
+
+        Yields:
+        - dict: The messages of the stream.
+        """
+        for message in stream:
+            if "entity" in message and "stat" in message:
+                self.add(message["entity"], message["id"], message["stat"], message["value"])
+            else:
+                self.record(message)
+            yield message
+
+
+    def series(self, entity: str, id_, stat: str) -> RingBuffer:
+        """
+        Returns the RingBuffer of a series, or None if nothing was recorded for it.
+        """
+        with self._lock:
+            return self._series.get((entity, id_, stat))
+
+
+    def keys(self) -> list[tuple]:
+        """
+        Returns the (entity, id, stat) keys of all recorded series, least recently updated first.
+        """
+        with self._lock:
+            return list(self._series)
+
+
+    def last(self, entity: str, id_, stat: str, n: int=None) -> list[tuple]:
+        """
+        Returns the newest 'n' samples of a series, oldest first. Unknown series yield an empty list.
+        """
+        with self._lock:
+            buffer = self._series.get((entity, id_, stat))
+            return [] if buffer is None else buffer.last(n)
+
+
+    def since(self, entity: str, id_, stat: str, timestamp: float) -> list[tuple]:
+        """
+        Returns every sample of a series taken at or after the given UNIX timestamp. Unknown series yield an empty
+        list.
+        """
+        with self._lock:
+            buffer = self._series.get((entity, id_, stat))
+            return [] if buffer is None else buffer.since(timestamp)
+
+
+    def downsample(self, entity: str, id_, stat: str, bucket: float, since: float=None) -> list[dict]:
+        """
+        Aggregates the samples of a series into time buckets with their min, max and mean. See RingBuffer.downsample.
+        """
+        with self._lock:
+            buffer = self._series.get((entity, id_, stat))
+            return [] if buffer is None else buffer.downsample(bucket, since)
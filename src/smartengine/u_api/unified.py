@@ -1,4 +1,5 @@
 from . import subscribe, set
+from .. import session
 
 
 class uApi(subscribe.ApiSubscription, set.ApiSetting):
@@ -13,6 +14,9 @@ class uApi(subscribe.ApiSubscription, set.ApiSetting):
         Inherits all attributes from both ApiSubscription and ApiSetting, including user credentials, IP address, 
         URL formatting, and specific error codes.
 
+        Both base classes share one session pool, so subscriptions and set calls reuse the same keep-alive 
+        connections to the smartdirector.
+
     Methods:
         __repr__: Returns a formal string representation of the uApi instance.
 
@@ -27,6 +31,18 @@ class uApi(subscribe.ApiSubscription, set.ApiSetting):
             print(data)
     """
 
+    def __init__(
+        self, 
+        user: str, 
+        password: str, 
+        ipv4_adress: str="192.168.1.1", 
+        session_pool: session.SessionPool=None, 
+        pool_maxsize: int=10
+    ):
+        subscribe.ApiSubscription.__init__(self, user, password, ipv4_adress, session_pool, pool_maxsize)
+        set.ApiSetting.__init__(self, user, password, ipv4_adress, self.session_pool)
+
+
     def __repr__(self):
         return f"{__class__.__name__}({self.user}, {self.password}, {self.ip})"
     
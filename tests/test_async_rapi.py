@@ -0,0 +1,71 @@
+import asyncio
+import inspect
+import unittest
+
+from benchmarks import payload
+from smartengine.r_api import asynchronous, cache, restful
+
+
+class _OfflineCache(cache.SnapshotCache):
+    def _fetch(self, *args, **kwargs):
+        raise AssertionError("the /rApi document must not be downloaded synchronously")
+
+
+    def refresh(self, *args, **kwargs):
+        raise AssertionError("the /rApi document must not be refreshed synchronously")
+
+
+
+
+class AsyncRApiInheritedMethodsTest(unittest.TestCase):
+    """
+    The parsing methods AsyncRApi inherits from rApi must work on a fetched snapshot without any blocking download.
+    """
+    def setUp(self):
+        self.document = payload.generate_document(fixtures=200, seed=1)
+        self.snapshot_cache = _OfflineCache()
+        self.snapshot_cache.put(
+            "director", "user", cache.Snapshot(self.document, sections=restful.rApi.sections)
+        )
+        self.api = asynchronous.AsyncRApi("user", "secret", "director", snapshot_cache=self.snapshot_cache)
+        asyncio.run(self.api.fetch())
+
+
+    def test_attributes_match_rapi(self):
+        self.assertEqual(self.api.system_name, self.document["name"])
+        self.assertIsNotNone(self.api.session_pool)
+        rapi = restful.rApi("user", "secret", "director", snapshot_cache=self.snapshot_cache)
+        self.assertEqual(self.api.sensor_stats, rapi.sensor_stats)
+        self.assertEqual(self.api.as_dict, rapi.as_dict)
+
+
+    def test_inherited_getters(self):
+        fixtures = self.api.get_all_fixtures()
+        self.assertEqual(len(fixtures), len(self.document["fixture"]))
+        location = self.document["location"][-1]
+        self.assertEqual(self.api.get_location_stats(location["id"])[0]["id"], location["id"])
+        self.assertEqual(len(self.api.location_tree().descendants(self.document["location"][0]["id"])) + 1, len(
+            self.document["location"]
+        ))
+        self.assertEqual(len(self.api.query().all()), len(self.document["fixture"]))
+
+
+    def test_sensor_frame(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        frame = self.api.sensor_frame()
+        by_location = frame.mean_by("power", by="location")
+        self.assertNotIn(None, by_location)
+        self.assertTrue(numpy.isfinite(list(by_location.values())).all())
+
+
+    def test_refresh_is_awaitable(self):
+        self.assertTrue(inspect.iscoroutinefunction(self.api.refresh))
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+
+from benchmarks import director, payload
+from smartengine.r_api import asynchronous as r_asynchronous, cache
+from smartengine.u_api import asynchronous, filters
+
+
+async def _drain(stream) -> list:
+    return [message async for message in stream]
+
+
+
+
+class AsyncClientsTest(unittest.TestCase):
+    """
+    Streams from and downloads a synthetic director on an event loop. Every stream ends after 10 messages.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.director = director.SyntheticDirector(payload.generate_document(fixtures=40), messages=10, chunk_bytes=64)
+        cls.director.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.director.stop()
+
+
+    def run_with_api(self, function):
+        async def run():
+            async with asynchronous.AsyncUApi("user", "secret", self.director.ip) as api:
+                return await function(api)
+
+        return asyncio.run(run())
+
+
+    def test_streams(self):
+        async def collect(api):
+            location = [message async for message in api.stream_location_data(location=101, sensor_stat="power")]
+            events = [event async for event in api.stream_many(locations=[101, 102], sensor_stats=["power"])]
+            return location, events
+
+        location, events = self.run_with_api(collect)
+        self.assertEqual([message["sequence"] for message in location], list(range(10)))
+        self.assertGreaterEqual(len(events), 10)
+        self.assertTrue(all(event["stat"] == "power" and event["entity"] == "location" for event in events))
+
+
+    def test_many_concurrent_streams(self):
+        async def collect(api):
+            streams = [api.stream_location_data(location=location) for location in range(100, 120)]
+            return await asyncio.gather(*(_drain(stream) for stream in streams))
+
+        before = self.director.requests.get("uApi.subscribe", 0)
+        results = self.run_with_api(collect)
+        self.assertEqual([len(messages) for messages in results], [10] * 20)
+        self.assertEqual(self.director.requests["uApi.subscribe"] - before, 20)
+
+
+    def test_stream_filter(self):
+        quiet = filters.StreamFilter(min_interval=3600)
+
+        async def collect(api):
+            return [message async for message in api.stream_location_data(location=101, stream_filter=quiet)]
+
+        self.assertEqual(len(self.run_with_api(collect)), 1)
+        self.assertGreater(quiet.dropped, 0)
+
+
+    def test_invalid_subscriptions(self):
+        for arguments in ({"fixture": None}, {"fixture": "A", "sensor_stat": "colour"}):
+            async def collect(api, arguments=arguments):
+                return [message async for message in api.stream_fixture_data(**arguments)]
+
+            with self.subTest(arguments=arguments), self.assertRaises(ValueError):
+                self.run_with_api(collect)
+
+        async def collect_many(api):
+            return [event async for event in api.stream_many()]
+
+        with self.assertRaises(ValueError):
+            self.run_with_api(collect_many)
+
+
+    def test_rapi_fetch(self):
+        async def fetch():
+            api = r_asynchronous.AsyncRApi("user", "secret", self.director.ip, snapshot_cache=cache.SnapshotCache())
+            async with api:
+                snapshot = await api.fetch()
+                again = await api.fetch()
+                await api.refresh()
+                return api, snapshot, again
+
+        before = self.director.requests.get("rApi", 0)
+        api, snapshot, again = asyncio.run(fetch())
+        self.assertIs(again, snapshot)
+        self.assertIsNot(api.snapshot, snapshot)
+        self.assertEqual(self.director.requests["rApi"] - before, 2)
+        self.assertEqual(len(api.get_all_fixtures()), 40)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
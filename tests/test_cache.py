@@ -0,0 +1,182 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from benchmarks import payload
+from smartengine.r_api import cache
+
+
+class _Response:
+    def __init__(self, body: bytes):
+        self.body = body
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+    def iter_content(self, chunk_size: int=None):
+        for start in range(0, len(self.body), 1000):
+            yield self.body[start:start + 1000]
+
+
+
+
+class _Pool:
+    def __init__(self, document: dict, gate: threading.Event=None, error: Exception=None):
+        self.body = json.dumps(document).encode()
+        self.gate = gate
+        self.error = error
+        self.requests = 0
+
+
+    def get(self, ip: str, url: str, **kwargs):
+        self.requests += 1
+        if self.gate is not None:
+            self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        return _Response(self.body)
+
+
+
+
+def _wait(condition, timeout: float=10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+
+
+class SnapshotCacheTest(unittest.TestCase):
+    """
+    Serves generated /rApi documents from a fake session pool that counts the downloads.
+    """
+    def setUp(self):
+        self.document = payload.generate_document(fixtures=50)
+        self.pool = _Pool(self.document)
+
+
+    def get(self, snapshot_cache: cache.SnapshotCache, **options) -> cache.Snapshot:
+        return snapshot_cache.get("director", "user", "secret", session_pool=self.pool, **options)
+
+
+    def test_ttl(self):
+        snapshot_cache = cache.SnapshotCache(ttl=60)
+        first = self.get(snapshot_cache)
+        self.assertIs(self.get(snapshot_cache), first)
+        self.assertIsNot(self.get(snapshot_cache, ttl=0), first)
+        self.assertEqual(self.pool.requests, 2)
+
+        snapshot_cache.put("director", "user", cache.Snapshot(self.document, fetched_at=time.time() - 120))
+        self.assertIsNone(snapshot_cache.peek("director", "user"))
+        self.get(snapshot_cache)
+        self.assertEqual(self.pool.requests, 3)
+
+        snapshot_cache.invalidate(user="user")
+        self.assertIsNone(snapshot_cache.peek("director", "user", ttl=None))
+        forever = cache.SnapshotCache(ttl=None)
+        forever.put("director", "user", cache.Snapshot(self.document, fetched_at=0))
+        self.assertIsNotNone(self.get(forever))
+        self.assertEqual(self.pool.requests, 3)
+
+
+    def test_concurrent_lookups_download_once(self):
+        self.pool.gate = threading.Event()
+        snapshot_cache = cache.SnapshotCache()
+        snapshots = []
+        threads = [threading.Thread(target=lambda: snapshots.append(self.get(snapshot_cache))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(_wait(lambda: self.pool.requests == 1))
+        time.sleep(0.05)
+        self.pool.gate.set()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(self.pool.requests, 1)
+        self.assertEqual(len(snapshots), 8)
+        self.assertTrue(all(snapshot is snapshots[0] for snapshot in snapshots))
+
+
+    def test_failed_download_is_raised_to_every_waiter(self):
+        self.pool.gate = threading.Event()
+        self.pool.error = ConnectionError("unreachable")
+        snapshot_cache = cache.SnapshotCache()
+        errors = []
+
+        def lookup():
+            try:
+                self.get(snapshot_cache)
+            except ConnectionError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(_wait(lambda: self.pool.requests == 1))
+        time.sleep(0.05)
+        self.pool.gate.set()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(len(errors), 4)
+        self.assertLessEqual(self.pool.requests, 4)
+
+
+    def test_sections(self):
+        snapshot_cache = cache.SnapshotCache()
+        fixtures = self.get(snapshot_cache, sections=("name", "fixture"))
+        self.assertNotIn("location", fixtures.json_)
+        self.assertEqual(fixtures.json_["fixture"], self.document["fixture"])
+        self.assertIs(self.get(snapshot_cache, sections=("fixture",)), fixtures)
+
+        both = self.get(snapshot_cache, sections=("location",))
+        self.assertEqual(both.sections, {"name", "fixture", "location"})
+        self.assertTrue(both.covers(("fixture", "location")))
+        self.assertFalse(both.covers(None))
+        self.assertIs(self.get(snapshot_cache, sections=("name", "fixture")), both)
+        self.assertEqual(self.pool.requests, 2)
+
+
+    def test_snapshot_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.get(cache.SnapshotCache(directory=directory))
+            self.assertTrue(os.path.exists(cache.SnapshotCache(directory=directory).path("director", "user")))
+
+            self.pool.error = ConnectionError("unreachable")
+            offline = cache.SnapshotCache(directory=directory)
+            stale = self.get(offline)
+            self.assertTrue(stale.stale)
+            self.assertEqual(stale.json_, self.document)
+            self.assertIs(self.get(offline), stale)
+
+            self.pool.error = None
+            online = cache.SnapshotCache(directory=directory)
+            self.assertTrue(self.get(online).stale)
+            self.assertTrue(_wait(lambda: not online.peek("director", "user").stale))
+
+
+    def test_damaged_snapshot_files_are_ignored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_cache = cache.SnapshotCache(directory=directory)
+            with open(snapshot_cache.path("director", "user"), "wb") as file:
+                file.write(b"SESNAP\x02garbage")
+            snapshot = self.get(snapshot_cache)
+            self.assertFalse(snapshot.stale)
+            self.assertEqual(self.pool.requests, 1)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import copy
+import unittest
+
+from benchmarks import director, payload
+from smartengine.r_api import cache, locations
+from smartengine.u_api import catalog, unified
+
+
+class _Rapi:
+    def __init__(self, document: dict):
+        self.snapshot = cache.Snapshot(document)
+        self.documents = []
+
+
+    def refresh(self):
+        self.snapshot = cache.Snapshot(self.documents.pop(0))
+
+
+
+
+class SceneCatalogTest(unittest.TestCase):
+    """
+    Checks location and scene lookups of a catalog built from a generated document.
+    """
+    def setUp(self):
+        self.document = payload.generate_document(fixtures=40, fixtures_per_room=10)
+        self.room = self.document["location"][-1]
+        self.document["location"].append({"id": 900, "name": "Kitchen", "childLocation": [], "childFixture": []})
+        self.document["location"].append({"id": 901, "name": "Kitchen", "childLocation": [], "childFixture": []})
+        self.rapi = _Rapi(self.document)
+        self.catalog = catalog.SceneCatalog(self.rapi)
+
+
+    def test_resolve(self):
+        self.assertEqual(self.catalog.resolve(self.room["id"]), self.room["id"])
+        self.assertEqual(self.catalog.resolve(str(self.room["id"])), self.room["id"])
+        self.assertEqual(self.catalog.resolve(self.room["name"]), self.room["id"])
+        self.assertIn(self.room["name"], self.catalog)
+        for location in ("Kitchen", "Nowhere", 12345, ["unhashable"]):
+            with self.subTest(location=location):
+                self.assertNotIn(location, self.catalog)
+                with self.assertRaises(ValueError):
+                    self.catalog.resolve(location)
+
+
+    def test_scenes(self):
+        expected = {scene["name"]: scene["order"] for scene in self.room["sceneControl"]["scene"]}
+        self.assertEqual(self.catalog.scenes(self.room["name"]), expected)
+        self.assertEqual(self.catalog.check_scene(self.room["name"], "Evening"), self.room["id"])
+        self.assertEqual(self.catalog.scene_name(self.room["id"], expected["Evening"]), "Evening")
+        self.assertEqual(self.catalog.scenes(900), {})
+        with self.assertRaises(ValueError):
+            self.catalog.check_scene(self.room["id"], "Disco")
+        with self.assertRaises(ValueError):
+            self.catalog.scene_name(self.room["id"], 99)
+
+
+    def test_refresh(self):
+        changed = copy.deepcopy(self.document)
+        changed["location"][-3]["sceneControl"]["scene"].append({"name": "Disco", "order": 9})
+        self.rapi.documents.append(changed)
+        self.catalog.refresh()
+        self.assertEqual(self.catalog.scene_name(self.room["id"], 9), "Disco")
+        self.assertEqual(self.catalog.loaded_at, self.rapi.snapshot.fetched_at)
+
+
+
+
+class CatalogSetTest(unittest.TestCase):
+    """
+    Sends checked set calls to a synthetic director.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.director = director.SyntheticDirector(payload.generate_document(fixtures=20))
+        cls.director.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.director.stop()
+
+
+    def setUp(self):
+        self.api = unified.uApi("user", "secret", self.director.ip)
+        rapi = locations.LocationsApi("user", "secret", self.director.ip, snapshot_cache=cache.SnapshotCache())
+        self.room = rapi.snapshot.json_["location"][-1]
+        self.api.load_catalog(rapi)
+
+
+    def test_names_and_orders_are_resolved(self):
+        response = self.api.set_scene(location=self.room["name"], scene_order=2)
+        sent = response.json()["responseData"]["location"][0]
+        self.assertEqual(sent["id"], self.room["id"])
+        self.assertEqual(sent["sceneControl"]["activeSceneName"], self.room["sceneControl"]["scene"][1]["name"])
+
+
+    def test_unknown_scenes_send_nothing(self):
+        before = dict(self.director.requests)
+        with self.assertRaises(ValueError):
+            self.api.set_scene(location=self.room["id"], scene_name="Disco")
+        with self.assertRaises(ValueError):
+            self.api.set_brightness(location="Nowhere", brightness=10)
+        with self.assertRaises(ValueError):
+            self.api.set_many([
+                {"location": self.room["id"], "brightness": 10}, {"location": "Nowhere", "brightness": 5}
+            ])
+        self.assertEqual(self.director.requests, before)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from concurrent import futures
+
+from benchmarks import director, payload
+from smartengine.u_api import coalesce, unified
+
+
+class _BrokenCatalog:
+    def __init__(self, broken: int):
+        self.broken = broken
+
+
+    def resolve(self, location):
+        return location
+
+
+    def check_scene(self, location, scene_name: str):
+        if location == self.broken:
+            raise KeyError(location)
+        return location
+
+
+
+
+class CoalescingWriterTest(unittest.TestCase):
+    """
+    Coalesces scene and brightness changes sent to a synthetic director.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.director = director.SyntheticDirector(payload.generate_document(fixtures=20))
+        cls.director.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.director.stop()
+
+
+    def setUp(self):
+        self.api = unified.uApi("user", "secret", self.director.ip)
+
+
+    def test_only_the_latest_value_is_sent(self):
+        before = self.director.requests.get("uApi.set", 0)
+        with coalesce.CoalescingWriter(self.api, window=60) as writer:
+            waiting = [writer.set_brightness(101, brightness) for brightness in range(0, 101, 10)]
+            waiting.append(writer.set_scene(102, "Evening"))
+            self.assertTrue(writer.flush(timeout=10))
+        self.assertEqual(self.director.requests["uApi.set"] - before, 1)
+        self.assertEqual((writer.submitted, writer.sent), (12, 2))
+        self.assertEqual(len({id(future.result()) for future in waiting}), 1)
+        sent = waiting[0].result().json()["responseData"]["location"]
+        self.assertEqual([entry["id"] for entry in sent], [101, 102])
+        self.assertEqual(sent[0]["wallSwitch"]["lowLevelControl"]["brightness"], 100)
+        self.assertEqual(sent[1]["sceneControl"]["activeSceneName"], "Evening")
+
+
+    def test_cancelled_values_are_withdrawn(self):
+        with coalesce.CoalescingWriter(self.api, window=60) as writer:
+            cancelled = writer.set_brightness(101, 10)
+            kept = writer.set_brightness(102, 20)
+            self.assertTrue(cancelled.cancel())
+            self.assertTrue(writer.flush(timeout=10))
+        sent = kept.result().json()["responseData"]["location"]
+        self.assertEqual([entry["id"] for entry in sent], [102])
+        self.assertEqual(writer.sent, 1)
+
+
+    def test_failing_location_check_fails_only_its_futures(self):
+        with coalesce.CoalescingWriter(self.api, window=60) as writer:
+            broken = writer.set_scene(101, "Evening")
+            fine = writer.set_scene(102, "Evening")
+            self.api.catalog = _BrokenCatalog(broken=101)
+            writer.flush(timeout=10)
+            self.assertIsInstance(broken.exception(timeout=10), KeyError)
+            self.assertEqual(fine.result(timeout=10).status_code, 200)
+            self.api.catalog = None
+            future = writer.set_brightness(101, 50)
+            self.assertTrue(writer.flush(timeout=10))
+            self.assertEqual(future.result().status_code, 200)
+
+
+    def test_request_errors_fail_the_futures(self):
+        self.api.url = f"https://{self.director.ip}/missing"
+        with coalesce.CoalescingWriter(self.api, window=0) as writer:
+            future = writer.set_brightness(101, 10)
+            self.assertIsNotNone(future.exception(timeout=10))
+
+
+    def test_closed_writer_rejects_values(self):
+        writer = coalesce.CoalescingWriter(self.api)
+        writer.close()
+        with self.assertRaises(RuntimeError):
+            writer.set_brightness(101, 10)
+        with self.assertRaises(ValueError):
+            coalesce.CoalescingWriter(self.api, window=-1)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
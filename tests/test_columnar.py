@@ -0,0 +1,96 @@
+import math
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from benchmarks import director, payload
+from smartengine.r_api import cache, columnar, hierarchy, locations
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class LocationFrameTest(unittest.TestCase):
+    """
+    Aggregates the location frame of a synthetic building by parent location and compares it with plain Python.
+    """
+    @classmethod
+    def setUpClass(cls):
+        document = payload.generate_document(fixtures=200, fixtures_per_room=5, rooms_per_floor=4)
+        cls.director = director.SyntheticDirector(document)
+        cls.director.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.director.stop()
+
+
+    def setUp(self):
+        self.api = locations.LocationsApi("user", "secret", self.director.ip, snapshot_cache=cache.SnapshotCache())
+        self.frame = self.api.location_frame()
+        self.tree = hierarchy.of(self.api.snapshot)
+
+
+    def expected(self, stat: str) -> dict:
+        groups = {}
+        for element in self.api.snapshot.json_["location"]:
+            value = (element.get("sensorStats") or {}).get(stat, {}).get("instant")
+            values = groups.setdefault(self.tree.parent(element["id"]), [])
+            if value is not None:
+                values.append(float(value))
+        return groups
+
+
+    def test_grouped_by_parent(self):
+        self.assertEqual(list(self.frame.groups), ["parent"])
+        expected = self.expected("power")
+        self.assertEqual(set(self.frame.mean_by("power")), set(expected))
+        aggregates = zip(
+            self.frame.mean_by("power", by="parent").items(), self.frame.min_by("power").values(),
+            self.frame.max_by("power").values()
+        )
+        for (parent, mean), minimum, maximum in aggregates:
+            values = expected[parent]
+            if values:
+                self.assertAlmostEqual(mean, sum(values) / len(values))
+                self.assertEqual((minimum, maximum), (min(values), max(values)))
+            else:
+                self.assertTrue(math.isnan(mean) and math.isnan(minimum) and math.isnan(maximum))
+
+
+    def test_unknown_grouping(self):
+        with self.assertRaises(ValueError):
+            self.frame.mean_by("power", by="type")
+
+
+    def test_updates_are_written_into_the_frame(self):
+        room = self.tree.children(self.tree.children(self.tree.roots[0])[0])[0]
+        self.api.snapshot.update_stats("location", room, {"power": {"instant": 1e6}})
+        self.assertIs(self.api.location_frame(), self.frame)
+        self.assertEqual(self.frame.column("power")[self.frame.position(room)], 1e6)
+        self.assertEqual(self.frame.max_by("power")[self.tree.parent(room)], 1e6)
+        self.assertEqual(list(self.frame.select(self.frame.mask("power", ge=1e6))), [room])
+
+
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class FixtureFrameTest(unittest.TestCase):
+    """
+    Builds a fixture frame from a generated snapshot and checks the default grouping.
+    """
+    def test_grouped_by_type_and_location(self):
+        snapshot = cache.Snapshot(payload.generate_document(fixtures=40, fixtures_per_room=10))
+        frame = columnar.fixture_frame(snapshot, ["power"])
+        self.assertEqual(list(frame.groups), ["type", "location"])
+        self.assertEqual(frame.mean_by("power"), frame.mean_by("power", by="type"))
+        self.assertNotIn(None, frame.mean_by("power", by="location"))
+        self.assertEqual(sum(1 for _ in frame.mean_by("power", by="location")), 4)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
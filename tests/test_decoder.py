@@ -0,0 +1,56 @@
+import json
+import random
+import unittest
+
+from smartengine.r_api import decoder
+
+
+class SectionDecoderChunkTest(unittest.TestCase):
+    """
+    Feeds /rApi-like documents to the SectionDecoder in chunks of every size from 1 to 12 bytes, so chunk borders
+    fall inside every token, in particular inside floats and exponents.
+    """
+    documents = [
+        '{"fixture": [-1.5e-07, 5, 123456]}',
+        '{"name": 1.25E+10, "fixture": [0.5, -0, 1e5, 2.5e-3], "policy": [-3.75, 1E-2]}',
+        '{"fixture": [{"a": -1.5}, 3.14159, true, null, false], "location": 12.5, "name": -0.001}',
+    ]
+
+
+    def setUp(self):
+        generator = random.Random(0)
+        self.documents = list(self.documents)
+        for _ in range(50):
+            values = [
+                generator.choice([
+                    generator.uniform(-1e6, 1e6),
+                    generator.random() * 10 ** generator.randint(-12, 12),
+                    generator.randint(-10 ** 9, 10 ** 9),
+                ])
+                for _ in range(8)
+            ]
+            self.documents.append(json.dumps({"fixture": values, "name": generator.uniform(-5, 5), "policy": values}))
+
+
+    def test_chunk_size_sweep(self):
+        for document in self.documents:
+            raw = document.encode()
+            for sections in (None, {"name", "fixture"}):
+                expected = json.loads(document)
+                if sections is not None:
+                    expected = {key: value for key, value in expected.items() if key in sections}
+                for size in range(1, 13):
+                    with self.subTest(document=document, size=size, sections=sections):
+                        chunks = [raw[start:start + size] for start in range(0, len(raw), size)]
+                        self.assertEqual(decoder.decode(chunks, sections), expected)
+
+
+    def test_truncated_number_is_rejected(self):
+        with self.assertRaises(json.JSONDecodeError):
+            decoder.decode([b'{"fixture": [-1.'], {"fixture"})
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from smartengine.u_api import filters
+
+
+def _message(*locations: dict) -> dict:
+    return {"responseType": "subscribe", "responseData": {"location": list(locations)}}
+
+
+def _location(id_: int, **stats) -> dict:
+    return {"id": id_, "sensorStats": {stat: {"instant": value} for stat, value in stats.items()}}
+
+
+
+
+class StreamFilterTest(unittest.TestCase):
+    """
+    Passes sequences of sensor stat updates through StreamFilter and checks which of them are kept.
+    """
+    def passed(self, stream_filter: filters.StreamFilter, stat: str, values: list) -> list:
+        return [value for value in values if stream_filter.accept("location", 101, stat, value)]
+
+
+    def test_deadband_compares_with_the_last_passed_value(self):
+        quiet = filters.StreamFilter(deadband={"power": 1.0})
+        self.assertEqual(self.passed(quiet, "power", [10, 10.4, 10.8, 11.1, 11.1, 9.9, "off", "off", 3]), [
+            10, 11.1, 9.9, "off", 3
+        ])
+        self.assertEqual(self.passed(quiet, "humidity", [40, 40, 40.1]), [40, 40, 40.1])
+        self.assertEqual((quiet.passed, quiet.dropped), (8, 4))
+
+
+    def test_relative_change(self):
+        quiet = filters.StreamFilter(relative={"illuminance": 0.1})
+        self.assertEqual(self.passed(quiet, "illuminance", [100, 105, 111, 120, 0, 0]), [100, 111, 0])
+
+
+    def test_min_interval(self):
+        quiet = filters.StreamFilter(min_interval={"power": 3600})
+        self.assertEqual(self.passed(quiet, "power", [1, 2, 3]), [1])
+        self.assertEqual(self.passed(quiet, "humidity", [1, 2, 3]), [1, 2, 3])
+        quiet.reset()
+        self.assertEqual(self.passed(quiet, "power", [4, 5]), [4])
+        self.assertEqual(self.passed(filters.StreamFilter(min_interval=3600), "humidity", [1, 2]), [1])
+
+
+    def test_predicates(self):
+        positive = filters.StreamFilter(predicates=[lambda entity, id_, stat, value: value > 0])
+        self.assertEqual(self.passed(positive, "power", [1, -1, 2, 0]), [1, 2])
+
+
+    def test_apply_removes_dropped_updates(self):
+        quiet = filters.StreamFilter(deadband={"power": 1.0, "humidity": 5})
+        self.assertIsNotNone(quiet.apply(_message(_location(101, power=10, humidity=40), _location(102, power=5))))
+        message = quiet.apply(_message(_location(101, power=12, humidity=41), _location(102, power=5.5)))
+        self.assertEqual(message["responseData"]["location"], [_location(101, power=12)])
+        self.assertIsNone(quiet.apply(_message(_location(101, power=12.5), _location(102, power=5))))
+
+
+    def test_apply_keeps_data_other_than_sensor_stats(self):
+        quiet = filters.StreamFilter(predicates=[lambda entity, id_, stat, value: False])
+        scene = {"id": 101, "sceneControl": {"activeSceneName": "Evening"}}
+        self.assertEqual(quiet.apply(_message(dict(scene)))["responseData"]["location"], [scene])
+        mixed = quiet.apply(_message(dict(scene, sensorStats={"power": {"instant": 1}}), _location(102, power=2)))
+        self.assertEqual(mixed["responseData"]["location"], [scene])
+        self.assertEqual(quiet.apply({"responseType": "subscribe", "responseData": "ok"})["responseData"], "ok")
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import socket
+import time
+import unittest
+
+from benchmarks import director, payload
+from smartengine import fleet
+from smartengine.r_api import cache
+
+
+class FleetTest(unittest.TestCase):
+    """
+    Runs a fleet of two synthetic directors, one unreachable site and one site that never answers.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.directors = {
+            "Berlin": director.SyntheticDirector(payload.generate_document(fixtures=10, seed=1)),
+            "Hamburg": director.SyntheticDirector(payload.generate_document(fixtures=20, seed=2)),
+        }
+        for site in cls.directors.values():
+            site.start()
+        cls.silent = socket.socket()
+        cls.silent.bind(("127.0.0.1", 0))
+        cls.silent.listen(8)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.silent.close()
+        for site in cls.directors.values():
+            site.stop()
+
+
+    def fleet(self, *extra: tuple, timeout: float=10.0) -> fleet.Fleet:
+        sites = [(site, running.ip) for site, running in self.directors.items()] + list(extra)
+        return fleet.Fleet(
+            [{"site": site, "user": "user", "password": "secret", "ipv4_adress": ip} for site, ip in sites],
+            timeout=timeout,
+            snapshot_cache=cache.SnapshotCache()
+        )
+
+
+    def test_merged_getters(self):
+        with self.fleet() as sites:
+            self.assertEqual(sites.errors, {})
+            fixtures = sites.get_all_fixtures()
+            self.assertEqual(len(fixtures), 30)
+            self.assertEqual(sum(fixture["site"] == "Berlin" for fixture in fixtures), 10)
+            self.assertEqual({entry["site"] for entry in sites.get_location_stats()}, {"Berlin", "Hamburg"})
+            self.assertEqual(len(sites.get_all_fixtures(sites=["Hamburg"])), 20)
+            with self.assertRaises(ValueError):
+                sites.get_all_fixtures(sites=["Munich"])
+
+
+    def test_failing_sites_are_reported(self):
+        with self.fleet(("Offline", "127.0.0.1:9")) as sites:
+            self.assertEqual(list(sites.errors), ["Offline"])
+            self.assertEqual(len(sites.get_all_fixtures()), 30)
+            self.assertEqual(list(sites.errors), ["Offline"])
+            self.assertEqual(sites.refresh(sites=["Berlin"]), ["Berlin"])
+            self.assertEqual(sites.errors, {})
+
+
+    def test_slow_sites_time_out(self):
+        started = time.monotonic()
+        with self.fleet(("Silent", f"127.0.0.1:{self.silent.getsockname()[1]}"), timeout=0.5) as sites:
+            self.assertEqual(list(sites.errors), ["Silent"])
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertEqual(sorted(sites.set_brightness(101, 50, sites=["Berlin", "Hamburg"])), ["Berlin", "Hamburg"])
+
+
+    def test_set_calls_are_fanned_out(self):
+        with self.fleet() as sites:
+            before = {site: running.requests.get("uApi.set", 0) for site, running in self.directors.items()}
+            responses = sites.set_scene(101, "Evening")
+            self.assertEqual({site: response.status_code for site, response in responses.items()}, {
+                "Berlin": 200, "Hamburg": 200
+            })
+            results = sites.set_many([{"location": 101, "brightness": 10}], sites=["Hamburg"])
+            self.assertIsNone(results["Hamburg"][0]["error"])
+            self.assertEqual(self.directors["Berlin"].requests["uApi.set"] - before["Berlin"], 1)
+            self.assertEqual(self.directors["Hamburg"].requests["uApi.set"] - before["Hamburg"], 2)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
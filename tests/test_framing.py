@@ -0,0 +1,58 @@
+import json
+import unittest
+
+from smartengine.u_api import framing
+
+
+DELIMITER = b"\r\n\r\n\r\n"
+
+
+class StreamFramerTest(unittest.TestCase):
+    """
+    Feeds a stream to the framer in chunks of every size, so every chunk boundary and split delimiter is covered.
+    """
+    def setUp(self):
+        self.messages = [{"sequence": sequence, "text": "x" * sequence} for sequence in range(12)]
+        self.stream = DELIMITER + DELIMITER.join(json.dumps(message).encode() for message in self.messages) + DELIMITER
+
+
+    def test_every_chunk_size(self):
+        for size in range(1, len(self.stream) + 1):
+            chunks = [self.stream[start:start + size] for start in range(0, len(self.stream), size)]
+            with self.subTest(size=size):
+                self.assertEqual(list(framing.StreamFramer().messages(chunks)), self.messages)
+
+
+    def test_feed_returns_completed_messages_only(self):
+        framer = framing.StreamFramer()
+        first = json.dumps(self.messages[0]).encode()
+        self.assertEqual(framer.feed(first + DELIMITER[:4]), [])
+        self.assertEqual(framer.feed(DELIMITER[4:] + b"  " + DELIMITER + b'{"a"'), [first])
+        self.assertEqual(framer.feed(b": 1}" + DELIMITER), [b'{"a": 1}'])
+
+
+    def test_custom_delimiter(self):
+        framer = framing.StreamFramer(delimiter=b"\n")
+        self.assertEqual(list(framer.messages([b'{"a": 1}\n{"b"', b': 2}\n'])), [{"a": 1}, {"b": 2}])
+
+
+    def test_oversized_messages_are_rejected(self):
+        framer = framing.StreamFramer(max_message_size=16)
+        with self.assertRaises(ValueError):
+            framer.feed(b'{"text": "' + b"x" * 20 + b'"}' + DELIMITER)
+        with self.assertRaises(ValueError):
+            for _ in range(10):
+                framer.feed(b"x" * 5)
+        self.assertEqual(framer.feed(b'{"a": 1}' + DELIMITER), [b'{"a": 1}'])
+        self.assertEqual(framing.StreamFramer(max_message_size=None).feed(b"x" * 100 + DELIMITER), [b"x" * 100])
+
+
+    def test_garbled_messages_raise(self):
+        with self.assertRaises(ValueError):
+            list(framing.StreamFramer().messages([b'{"responseData": {"loc' + DELIMITER]))
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
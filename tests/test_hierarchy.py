@@ -0,0 +1,117 @@
+import random
+import unittest
+
+from smartengine.r_api import cache, hierarchy
+
+
+def _location(id_: int, children: list[int]=(), fixtures: list[str]=(), **stats) -> dict:
+    return {
+        "id": id_,
+        "name": f"Room {id_}",
+        "childLocation": [f"/rApi/location/{child}" for child in children],
+        "childFixture": [f"/fixture/{serial}" for serial in fixtures],
+        "sensorStats": {stat: {"instant": value} for stat, value in stats.items()},
+    }
+
+
+def _snapshot(locations: list[dict]) -> cache.Snapshot:
+    return cache.Snapshot({"name": "test", "fixture": [], "location": locations})
+
+
+def _brute_force(locations: list[dict], tree: hierarchy.LocationTree, id_, stat: str) -> tuple:
+    by_id = {location["id"]: location for location in locations}
+    values = []
+    for location in [id_, *tree.descendants(id_)]:
+        value = tree._numeric_stats(by_id[location]).get(stat)
+        if value is not None:
+            values.append(value)
+    if not values:
+        return (None, 0, None, None)
+    return (sum(values), len(values), min(values), max(values))
+
+
+def _summary(tree: hierarchy.LocationTree, id_, stat: str) -> tuple:
+    aggregate = tree.aggregate(id_, stat)
+    return (aggregate["sum"], aggregate["count"], aggregate["min"], aggregate["max"])
+
+
+
+
+class LocationTreeTest(unittest.TestCase):
+    """
+    Builds small location trees and checks the subtree aggregates against a full rebuild.
+    """
+    def setUp(self):
+        self.locations = [
+            _location(1, [2, 3], power=1.0),
+            _location(2, [4, 5], ["A"], power=10.0),
+            _location(3, [], ["B"], power="2.5"),
+            _location(4, [], ["C", "A"], power=-4.0, motion=True),
+            _location(5, [], [], power="n/a", humidity=40),
+        ]
+        self.snapshot = _snapshot(self.locations)
+        self.tree = hierarchy.of(self.snapshot)
+
+
+    def test_structure(self):
+        self.assertEqual(self.tree.roots, [1])
+        self.assertEqual(self.tree.children(1), [2, 3])
+        self.assertEqual(self.tree.parent(4), 2)
+        self.assertEqual(self.tree.ancestors(4), [2, 1])
+        self.assertEqual(self.tree.descendants(1), [2, 4, 5, 3])
+        self.assertEqual(self.tree.fixtures(1), ("A", "C", "B"))
+
+
+    def test_aggregates(self):
+        self.assertEqual(_summary(self.tree, 1, "power"), (9.5, 4, -4.0, 10.0))
+        self.assertEqual(_summary(self.tree, 2, "power"), (6.0, 2, -4.0, 10.0))
+        self.assertEqual(_summary(self.tree, 1, "humidity"), (40.0, 1, 40.0, 40.0))
+        self.assertEqual(self.tree.aggregate(1, "motion")["count"], 0)
+        self.assertEqual(self.tree.aggregate(3, "power")["mean"], 2.5)
+
+
+    def test_update_of_minimum_and_maximum_matches_rebuild(self):
+        self.snapshot.update_stats("location", 2, {"power": {"instant": 3.0}})
+        self.snapshot.update_stats("location", 4, {"power": {"instant": "7"}})
+        self.snapshot.update_stats("location", 5, {"humidity": {"instant": None}})
+        self.assertIs(hierarchy.of(self.snapshot), self.tree)
+        rebuilt = hierarchy.LocationTree(self.snapshot)
+        for id_ in (1, 2, 3, 4, 5):
+            for stat in ("power", "humidity"):
+                self.assertEqual(_summary(self.tree, id_, stat), _summary(rebuilt, id_, stat))
+        self.assertEqual(_summary(self.tree, 1, "power"), (13.5, 4, 1.0, 7.0))
+
+
+    def test_shared_locations_and_cycles(self):
+        for seed in range(200):
+            generator = random.Random(seed)
+            count = generator.randint(1, 15)
+            locations = [
+                _location(
+                    id_,
+                    generator.sample(range(count), min(count, generator.randint(0, 3))),
+                    [f"F{generator.randint(0, 20)}" for _ in range(generator.randint(0, 2))],
+                    power=generator.choice([generator.randint(0, 9), None, "x"]),
+                )
+                for id_ in range(count)
+            ]
+            snapshot = _snapshot(locations)
+            tree = hierarchy.of(snapshot)
+            for step in range(5):
+                for id_ in range(count):
+                    with self.subTest(seed=seed, step=step, id_=id_):
+                        self.assertEqual(_summary(tree, id_, "power"), _brute_force(locations, tree, id_, "power"))
+                snapshot.update_stats("location", generator.randrange(count), {"power": generator.randint(0, 9)})
+
+
+    def test_deep_chain(self):
+        locations = [_location(id_, [id_ + 1] if id_ < 4999 else [], power=id_) for id_ in range(5000)]
+        tree = hierarchy.LocationTree(_snapshot(locations))
+        self.assertEqual(tree.aggregate(0, "power")["count"], 5000)
+        self.assertEqual(len(tree.ancestors(4999)), 4999)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import time
+import unittest
+
+from benchmarks import director, payload
+from smartengine.u_api import filters, hub, unified
+
+
+class SubscriptionHubTest(unittest.TestCase):
+    """
+    Shares the subscription streams of a synthetic director, which ends every stream after 20 messages.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.director = director.SyntheticDirector(payload.generate_document(fixtures=20), messages=20, chunk_bytes=128)
+        cls.director.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.director.stop()
+
+
+    def setUp(self):
+        self.api = unified.uApi("user", "secret", self.director.ip)
+
+
+    def test_one_upstream_for_many_subscribers(self):
+        before = self.director.requests.get("uApi.subscribe", 0)
+        with hub.SubscriptionHub(self.api) as shared:
+            first = shared.subscribe("location", 101, "power")
+            second = shared.subscribe("location", 101, "power")
+            first_messages = list(first)
+            second_messages = list(second)
+        self.assertEqual(self.director.requests["uApi.subscribe"] - before, 1)
+        self.assertEqual(len(first_messages), 20)
+        self.assertEqual(second_messages[-1], first_messages[-1])
+
+
+    def test_subscribers_get_their_own_copies(self):
+        with hub.SubscriptionHub(self.api) as shared:
+            changing = shared.subscribe("location", 101, "power")
+            watching = shared.subscribe("location", 101, "power")
+            quiet = filters.StreamFilter(predicates=[lambda entity, id_, stat, value: False])
+            for message in changing:
+                self.assertIsNone(quiet.apply(message))
+            watched = list(watching)
+        self.assertGreater(len(watched), 0)
+        for message in watched:
+            self.assertIn("power", message["responseData"]["location"][0]["sensorStats"])
+
+
+    def test_slow_subscribers_drop_the_oldest_messages(self):
+        with hub.SubscriptionHub(self.api, max_queue=3) as shared:
+            subscription = shared.subscribe("location", 102, "power")
+            deadline = time.monotonic() + 10
+            while not subscription.closed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            messages = list(subscription)
+        self.assertEqual(len(messages) + subscription.dropped, subscription.received)
+        self.assertLessEqual(len(messages), 3)
+        self.assertEqual(messages[-1]["sequence"], 19)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
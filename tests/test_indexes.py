@@ -0,0 +1,63 @@
+import unittest
+
+from benchmarks import payload
+from smartengine.r_api import cache, indexes
+
+
+class SnapshotIndexTest(unittest.TestCase):
+    """
+    Compares the hash indexes of a snapshot with linear scans of its document.
+    """
+    def setUp(self):
+        self.document = payload.generate_document(fixtures=120, fixtures_per_room=10, rooms_per_floor=3)
+        room = self.document["location"][-1]
+        room["childFixture"].append(room["childFixture"][0])
+        self.document["location"].append({"id": 900, "name": room["name"], "childLocation": [], "childFixture": []})
+        self.document["location"].append({"id": "Lobby", "name": "Lobby", "childLocation": [], "childFixture": []})
+        self.snapshot = cache.Snapshot(self.document)
+        self.index = indexes.of(self.snapshot)
+
+
+    def test_fixture_indexes(self):
+        fixtures = self.document["fixture"]
+        self.assertEqual(len(self.index.fixtures_by_serial), len(fixtures))
+        for element in fixtures:
+            self.assertIs(self.index.fixtures_by_serial[element["serialNum"]], element)
+        for type_, elements in self.index.fixtures_by_type.items():
+            self.assertEqual(elements, [element for element in fixtures if element["type"] == type_])
+
+
+    def test_location_indexes(self):
+        locations = self.document["location"]
+        for element in locations:
+            self.assertIs(self.index.locations_by_id[element["id"]], element)
+            self.assertEqual(
+                self.index.locations_by_name[element["name"]],
+                [other for other in locations if other["name"] == element["name"]]
+            )
+        room = locations[-3]
+        serial = room["childFixture"][0][9:]
+        self.assertEqual(self.index.locations_by_fixture[serial], [room])
+        self.assertEqual(len(self.index.fixtures_in_location[room["id"]]), len(room["childFixture"]))
+
+
+    def test_find_locations(self):
+        room = self.document["location"][-3]
+        self.assertEqual(self.index.find_locations(room["id"]), [room])
+        self.assertEqual([element["id"] for element in self.index.find_locations(room["name"])], [room["id"], 900])
+        self.assertEqual(len(self.index.find_locations("Lobby")), 1)
+        self.assertEqual(self.index.find_locations("Nowhere"), [])
+        self.assertEqual(self.index.find_locations(["unhashable"]), [])
+
+
+    def test_built_once_per_snapshot(self):
+        self.assertIs(indexes.of(self.snapshot), self.index)
+        self.snapshot.update_stats("fixture", self.document["fixture"][0]["serialNum"], {"power": {"instant": 1.0}})
+        self.assertIs(indexes.of(self.snapshot), self.index)
+        self.assertIsNot(indexes.of(cache.Snapshot(self.document)), self.index)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import time
+import unittest
+
+from benchmarks import director, payload
+from smartengine.r_api import cache, fixtures, mirror, restful
+from smartengine.u_api import unified
+
+
+def _wait(condition, timeout: float=10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+
+
+class SnapshotMirrorTest(unittest.TestCase):
+    """
+    Mirrors the snapshot of a synthetic director, whose subscription streams end after a few messages.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.director = director.SyntheticDirector(payload.generate_document(fixtures=40), messages=5, chunk_bytes=256)
+        cls.director.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.director.stop()
+
+
+    def setUp(self):
+        self.snapshot_cache = cache.SnapshotCache()
+        self.uapi = unified.uApi("user", "secret", self.director.ip)
+
+
+    def test_applies_updates_and_reconnects(self):
+        rapi = restful.rApi("user", "secret", self.director.ip, snapshot_cache=self.snapshot_cache)
+        live = mirror.SnapshotMirror(rapi, self.uapi, sensor_stats=["power"], initial_backoff=0.01)
+        with live:
+            self.assertTrue(_wait(lambda: live.stream.reconnects >= 2))
+            self.assertTrue(live.running)
+            self.assertIsNone(live.error)
+            self.assertGreater(live.version, 0)
+            self.assertIs(rapi.snapshot, live.snapshot)
+        self.assertFalse(live.running)
+        self.assertIs(rapi.snapshot_cache, self.snapshot_cache)
+
+
+    def test_pinned_snapshot_covers_sensor_frame(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy is not installed")
+        api = fixtures.FixturesApi("user", "secret", self.director.ip, snapshot_cache=self.snapshot_cache)
+        with mirror.SnapshotMirror(api, self.uapi, initial_backoff=0.01) as live:
+            frame = api.sensor_frame()
+            self.assertNotIn(None, frame.mean_by("power", by="location"))
+            self.assertIs(api.snapshot, live.snapshot)
+            with self.assertRaises(RuntimeError):
+                api.refresh()
+            self.assertIs(api.snapshot, live.snapshot)
+
+
+    def test_ended_stream_is_reported(self):
+        rapi = restful.rApi("user", "secret", self.director.ip, snapshot_cache=self.snapshot_cache)
+        with mirror.SnapshotMirror(rapi, self.uapi, max_reconnects=0) as live:
+            self.assertTrue(_wait(lambda: not live.running))
+            self.assertIsInstance(live.error, RuntimeError)
+            with self.assertRaises(RuntimeError):
+                live.check()
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import fnmatch
+import itertools
+import unittest
+
+from benchmarks import payload
+from smartengine.r_api import cache, hierarchy, restful
+
+
+def _api(document: dict) -> restful.rApi:
+    snapshot_cache = cache.SnapshotCache(ttl=None)
+    snapshot_cache.put("director", "user", document)
+    return restful.rApi("user", "secret", "director", snapshot_cache=snapshot_cache)
+
+
+def _power(element: dict) -> float:
+    try:
+        return float(element["sensorStats"]["power"]["instant"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+
+
+class QueryTest(unittest.TestCase):
+    """
+    Runs queries over a generated building and compares them with linear scans of the document.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.document = payload.generate_document(fixtures=300, fixtures_per_room=10, rooms_per_floor=5)
+        cls.document["fixture"][3]["sensorStats"]["power"]["instant"] = None
+        cls.document["fixture"][4]["sensorStats"]["power"]["instant"] = "12.5"
+        cls.api = _api(cls.document)
+        cls.tree = hierarchy.of(cls.api.snapshot)
+
+
+    def fixtures_below(self, location: str) -> set:
+        id_ = next(element["id"] for element in self.document["location"] if element["name"] == location)
+        return set(self.tree.fixtures(id_))
+
+
+    def test_filters_match_a_scan(self):
+        floors = [element["name"] for element in self.document["location"] if element["name"].startswith("Floor")]
+        combinations = itertools.product(
+            [None, ("SENSOR",), ("LUMINAIRE", "WALL_SWITCH_5B")], [None, floors[0]], [None, True, False],
+            [None, "Luminaire 1*"], [None, (10, 30)]
+        )
+        for types, location, beacon, pattern, bounds in combinations:
+            query = self.api.query()
+            expected = self.document["fixture"]
+            if types is not None:
+                query = query.of_type(*types)
+                expected = [element for element in expected if element["type"] in types]
+            if location is not None:
+                query = query.in_location(location)
+                serials = self.fixtures_below(location)
+                expected = [element for element in expected if element["serialNum"] in serials]
+            if beacon is not None:
+                query = query.beacon(beacon)
+                expected = [element for element in expected if element["beaconSupported"] is beacon]
+            if pattern is not None:
+                query = query.named(pattern)
+                expected = [element for element in expected if fnmatch.fnmatchcase(element.get("name", ""), pattern)]
+            if bounds is not None:
+                query = query.stat("power", ge=bounds[0], lt=bounds[1])
+                expected = [
+                    element for element in expected
+                    if _power(element) is not None and bounds[0] <= _power(element) < bounds[1]
+                ]
+            with self.subTest(types=types, location=location, beacon=beacon, pattern=pattern, bounds=bounds):
+                serials = [result["serial_number"] for result in query]
+                self.assertEqual(sorted(serials), sorted(element["serialNum"] for element in expected))
+                self.assertEqual(query.count(), len(expected))
+
+
+    def test_of_type_keeps_the_given_order(self):
+        for types in (("SENSOR", "LUMINAIRE"), ("LUMINAIRE", "SENSOR"), ("WALL_SWITCH_5B", "SENSOR", "LUMINAIRE")):
+            expected = [
+                element["serialNum"] for type_ in types for element in self.document["fixture"]
+                if element["type"] == type_
+            ]
+            with self.subTest(types=types):
+                self.assertEqual([result["serial_number"] for result in self.api.query().of_type(*types)], expected)
+        self.assertEqual(self.api.query().of_type("SENSOR", "LUMINAIRE").of_type("LUMINAIRE").count(), 180)
+
+
+    def test_order_by_and_limit(self):
+        present = [element for element in self.document["fixture"] if _power(element) is not None]
+        missing = [element["serialNum"] for element in self.document["fixture"] if _power(element) is None]
+        descending = [element["serialNum"] for element in sorted(present, key=_power, reverse=True)] + missing
+        query = self.api.query().select("serial_number", "power").order_by("power", "DESC")
+        self.assertEqual([result["serial_number"] for result in query], descending)
+        self.assertEqual([result["serial_number"] for result in query.limit(5)], descending[:5])
+        ascending = [result["serial_number"] for result in self.api.query().order_by("power").all()]
+        self.assertEqual(ascending[-1], missing[-1])
+        self.assertEqual(self.api.query().order_by("power").first()["serial_number"], ascending[0])
+
+
+    def test_location_queries(self):
+        floor = next(element for element in self.document["location"] if element["name"].startswith("Floor"))
+        ids = [result["id"] for result in self.api.query("location").in_location(floor["name"])]
+        self.assertEqual(ids, [floor["id"], *self.tree.descendants(floor["id"])])
+        self.assertEqual(self.api.query("location").in_location(floor["id"], subtree=False).all(), [
+            {"id": floor["id"], "name": floor["name"]}
+        ])
+        self.assertEqual(self.api.query("location").named("Room 1").explain()["source"], "name index 'Room 1'")
+
+
+    def test_invalid_queries(self):
+        with self.assertRaises(ValueError):
+            self.api.query("scene")
+        with self.assertRaises(ValueError):
+            self.api.query("location").of_type("LUMINAIRE")
+        with self.assertRaises(ValueError):
+            self.api.query().in_location("Nowhere").all()
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
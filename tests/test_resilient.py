@@ -0,0 +1,109 @@
+import json
+import unittest
+
+import requests
+
+from smartengine.u_api import subscribe
+
+
+DELIMITER = b"\r\n\r\n\r\n"
+
+
+class _Response:
+    def __init__(self, status_code: int, chunks: list[bytes]=()):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.chunks = list(chunks)
+        self.closed = False
+
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Server Error", response=self)
+
+
+    def iter_content(self, chunk_size: int=None):
+        yield from self.chunks
+
+
+    def close(self):
+        self.closed = True
+
+
+
+
+class _ScriptedPool:
+    def __init__(self, responses: list[_Response]):
+        self.responses = list(responses)
+        self.sent = []
+
+
+    def post(self, ip: str, url: str, **kwargs):
+        response = self.responses.pop(0)
+        self.sent.append(response)
+        return response
+
+
+
+
+def _message(power: float) -> bytes:
+    location = {"id": 101, "sensorStats": {"power": {"instant": power}}}
+    return json.dumps({"responseData": {"location": [location]}}).encode()
+
+
+
+
+class ResilientStreamTest(unittest.TestCase):
+    """
+    Runs a ResilientStream against scripted responses to check which failures are retried and that every response
+    is closed.
+    """
+    def stream(self, responses: list[_Response], **options):
+        pool = _ScriptedPool(responses)
+        api = subscribe.ApiSubscription("user", "secret", "director", session_pool=pool)
+        options.setdefault("initial_backoff", 0.001)
+        return api.resilient_stream(locations=[101], sensor_stats=["power"], **options), pool
+
+
+    def test_server_errors_are_retried_and_closed(self):
+        stream, pool = self.stream(
+            [_Response(503), _Response(502), _Response(200, [_message(1.0) + DELIMITER])], max_reconnects=3
+        )
+        events = stream.events()
+        self.assertEqual(next(events)["value"], 1.0)
+        stream.close()
+        self.assertEqual(stream.reconnects, 2)
+        self.assertTrue(all(response.closed for response in pool.sent))
+
+
+    def test_client_errors_are_raised(self):
+        stream, pool = self.stream([_Response(401)])
+        with self.assertRaises(requests.HTTPError):
+            next(stream.messages())
+        self.assertTrue(pool.sent[0].closed)
+
+
+    def test_garbled_frames_are_retried(self):
+        stream, pool = self.stream([
+            _Response(200, [_message(1.0) + DELIMITER, b'{"responseData": {"loc' + DELIMITER]),
+            _Response(200, [_message(1.0) + DELIMITER + _message(2.0) + DELIMITER]),
+        ])
+        events = stream.events()
+        self.assertEqual([next(events)["value"], next(events)["value"]], [1.0, 2.0])
+        stream.close()
+        self.assertEqual(stream.reconnects, 1)
+        self.assertEqual(stream.metrics()["gaps"], 1)
+        self.assertTrue(all(response.closed for response in pool.sent))
+
+
+    def test_last_error_is_raised_after_max_reconnects(self):
+        stream, pool = self.stream([_Response(500), _Response(500)], max_reconnects=1)
+        with self.assertRaises(requests.HTTPError):
+            list(stream.messages())
+        self.assertTrue(all(response.closed for response in pool.sent))
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import threading
+import time
+import unittest
+
+from smartengine.u_api import scheduler
+
+
+class _Director:
+    def __init__(self, ip: str="director"):
+        self.ip = ip
+        self.sent = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+
+    def hold(self):
+        self.started.set()
+        self.gate.wait(10)
+        return "held"
+
+
+    def set_brightness(self, location: int=None, brightness: int=None):
+        if brightness is None:
+            raise ValueError("brightness argument was not specified")
+        self.sent.append(location)
+        return location
+
+
+
+
+class CommandSchedulerTest(unittest.TestCase):
+    """
+    Queues commands for fake directors, holding the worker thread where the queue order matters.
+    """
+    def setUp(self):
+        self.director = _Director()
+
+
+    def hold(self, commands: scheduler.CommandScheduler):
+        future = commands.submit(self.director, "hold", priority=commands.EMERGENCY)
+        self.assertTrue(self.director.started.wait(10))
+        return future
+
+
+    def test_priority_order(self):
+        with scheduler.CommandScheduler(rate=None) as commands:
+            self.hold(commands)
+            priorities = (commands.BULK, commands.NORMAL, commands.EMERGENCY, commands.NORMAL)
+            waiting = [
+                commands.set_brightness(self.director, location, 10, priority=priority)
+                for location, priority in enumerate(priorities, start=1)
+            ]
+            self.director.gate.set()
+            self.assertEqual([future.result(10) for future in waiting], [1, 2, 3, 4])
+        self.assertEqual(self.director.sent, [3, 2, 4, 1])
+
+
+    def test_rate_limit_spares_emergency_commands(self):
+        with scheduler.CommandScheduler(rate=20, burst=1) as commands:
+            started = time.monotonic()
+            waiting = [commands.set_brightness(self.director, location, 10) for location in range(6)]
+            for future in waiting:
+                future.result(10)
+            self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+        with scheduler.CommandScheduler(rate=0.01, burst=1) as commands:
+            commands.set_brightness(self.director, 1, 10).result(10)
+            started = time.monotonic()
+            for location in range(5):
+                commands.set_brightness(self.director, location, 10, priority=commands.EMERGENCY).result(10)
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertEqual(commands.metrics()["EMERGENCY"]["completed"], 5)
+            commands.close(cancel_pending=True)
+
+
+    def test_full_queue_evicts_lower_priorities(self):
+        with scheduler.CommandScheduler(rate=None, max_queue=2) as commands:
+            self.hold(commands)
+            first = commands.set_brightness(self.director, 1, 10, priority=commands.BULK)
+            second = commands.set_brightness(self.director, 2, 10, priority=commands.BULK)
+            urgent = commands.set_brightness(self.director, 3, 10, priority=commands.NORMAL)
+            self.assertIsInstance(second.exception(10), RuntimeError)
+            with self.assertRaises(RuntimeError):
+                commands.set_brightness(self.director, 4, 10, priority=commands.BULK)
+            self.director.gate.set()
+            self.assertEqual((first.result(10), urgent.result(10)), (1, 3))
+        self.assertEqual(self.director.sent, [3, 1])
+        self.assertEqual(commands.metrics()["BULK"]["rejected"], 2)
+
+
+    def test_blocking_submit_times_out(self):
+        with scheduler.CommandScheduler(rate=None, max_queue=1, block=True) as commands:
+            self.hold(commands)
+            commands.set_brightness(self.director, 1, 10)
+            started = time.monotonic()
+            with self.assertRaises(RuntimeError):
+                commands.submit(self.director, "set_brightness", 2, 10, timeout=0.1)
+            self.assertGreaterEqual(time.monotonic() - started, 0.1)
+            self.director.gate.set()
+
+
+    def test_directors_have_their_own_queues(self):
+        other = _Director("other")
+        with scheduler.CommandScheduler(rate=None) as commands:
+            self.hold(commands)
+            self.assertEqual(commands.set_brightness(other, 1, 10).result(10), 1)
+            self.director.gate.set()
+
+
+    def test_errors_and_close(self):
+        commands = scheduler.CommandScheduler(rate=None)
+        self.assertIsInstance(commands.submit(self.director, "set_brightness", 1).exception(10), ValueError)
+        self.assertEqual(commands.metrics()["NORMAL"]["failed"], 1)
+        with self.assertRaises(ValueError):
+            commands.submit(self.director, "set_color")
+        with self.assertRaises(ValueError):
+            commands.set_brightness(self.director, 1, 10, priority=7)
+
+        held = self.hold(commands)
+        queued = commands.set_brightness(self.director, 1, 10)
+        threading.Timer(0.1, self.director.gate.set).start()
+        commands.close(cancel_pending=True, timeout=10)
+        self.assertEqual(held.result(10), "held")
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(self.director.sent, [])
+        with self.assertRaises(RuntimeError):
+            commands.set_brightness(self.director, 1, 10)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+
+import requests
+
+from benchmarks import director, payload
+from smartengine.u_api import asynchronous, unified
+
+
+class SetManyTest(unittest.TestCase):
+    """
+    Sends batched set requests to a synthetic director, which echoes the "requestData" of every request.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.director = director.SyntheticDirector(payload.generate_document(fixtures=20))
+        cls.director.start()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.director.stop()
+
+
+    def setUp(self):
+        self.api = unified.uApi("user", "secret", self.director.ip)
+
+
+    def test_batches(self):
+        operations = [{"location": location, "brightness": location} for location in range(5)]
+        operations.append({"location": 0, "scene_name": "Evening"})
+        results = self.api.set_many(operations, batch_size=2)
+
+        self.assertEqual([result["location"] for result in results], [0, 1, 2, 3, 4, 0])
+        self.assertTrue(all(result["error"] is None for result in results))
+        responses = [result["response"] for result in results]
+        self.assertIs(responses[0], responses[1])
+        self.assertIsNot(responses[1], responses[2])
+        self.assertIs(responses[4], responses[5])
+        self.assertEqual(len({id(response) for response in responses}), 3)
+        sent = responses[2].json()["responseData"]["location"]
+        self.assertEqual([entry["id"] for entry in sent], [2, 3])
+
+
+    def test_same_location_starts_a_new_batch(self):
+        results = self.api.set_many([
+            {"location": 7, "brightness": 10},
+            {"location": 7, "brightness": 20},
+        ])
+        self.assertIsNot(results[0]["response"], results[1]["response"])
+
+
+    def test_error_status_is_reported_per_batch(self):
+        self.api.url = f"https://{self.director.ip}/missing"
+        results = self.api.set_many([{"location": 1, "brightness": 10}, {"location": 2, "brightness": 10}])
+        for result in results:
+            self.assertIsInstance(result["error"], requests.HTTPError)
+            self.assertEqual(result["response"].status_code, 404)
+
+
+    def test_connection_errors_are_reported(self):
+        api = unified.uApi("user", "secret", "127.0.0.1:9")
+        results = api.set_many([{"location": 1, "brightness": 10}])
+        self.assertIsNone(results[0]["response"])
+        self.assertIsInstance(results[0]["error"], requests.RequestException)
+
+
+    def test_invalid_operations_send_nothing(self):
+        before = dict(self.director.requests)
+        for operations, batch_size in (([{"location": 1}], 50), ([{"brightness": 1}], 50), ([], 0)):
+            with self.assertRaises(ValueError):
+                self.api.set_many(operations, batch_size=batch_size)
+        self.assertEqual(self.director.requests, before)
+
+
+    def test_async_set_many(self):
+        async def run(url: str=None):
+            async with asynchronous.AsyncUApi("user", "secret", self.director.ip) as api:
+                if url is not None:
+                    api.url = url
+                return await api.set_many([{"location": 1, "brightness": 5}, {"location": 2, "brightness": 5}])
+
+        results = asyncio.run(run())
+        self.assertTrue(all(result["error"] is None for result in results))
+        self.assertIs(results[0]["response"], results[1]["response"])
+        self.assertEqual(results[0]["response"].status, 200)
+
+        results = asyncio.run(run(f"https://{self.director.ip}/missing"))
+        self.assertTrue(all(result["error"] is not None for result in results))
+        self.assertEqual(results[0]["error"].status, 404)
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
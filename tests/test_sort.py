@@ -0,0 +1,81 @@
+import itertools
+import unittest
+
+from benchmarks import payload
+from smartengine.r_api import cache, fixtures
+
+
+def _api(document: dict, **options) -> fixtures.FixturesApi:
+    snapshot_cache = cache.SnapshotCache(ttl=None)
+    snapshot_cache.put("director", "user", document)
+    return fixtures.FixturesApi("user", "secret", "director", snapshot_cache=snapshot_cache, **options)
+
+
+def _value(element: dict, stat: str) -> float:
+    try:
+        return float(element["sensorStats"][stat]["instant"])
+    except KeyError:
+        return float("inf")
+
+
+
+
+class SortFixturesTest(unittest.TestCase):
+    """
+    Compares the heap-selected top entries of sort_fixtures with a full stable sort of the document.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.document = payload.generate_document(fixtures=200, seed=3)
+        del cls.document["fixture"][5]["sensorStats"]["power"]
+        for element in cls.document["fixture"][10:20]:
+            element["sensorStats"]["power"]["instant"] = 42.0
+        cls.api = _api(cls.document)
+
+
+    def expected(self, elements: list[dict], keys: list[tuple]) -> list[str]:
+        def key(element):
+            return [-_value(element, stat) if descending else _value(element, stat) for stat, descending in keys]
+
+        return [element["serialNum"] for element in sorted(elements, key=key)]
+
+
+    def test_top_k_matches_a_full_sort(self):
+        sort_keys = ["power", "brightness", [("power", "DESC"), ("temperature", "ASC")]]
+        for sort_by, order, limit in itertools.product(sort_keys, ("ASC", "DESC"), (None, 0, 1, 7, 1000)):
+            if isinstance(sort_by, str):
+                keys = [(sort_by, order == "DESC")]
+            else:
+                keys = [(stat, key_order == "DESC") for stat, key_order in sort_by]
+            expected = self.expected(self.document["fixture"], keys)
+            with self.subTest(sort_by=sort_by, order=order, limit=limit):
+                result = self.api.sort_fixtures(sort_by=sort_by, order=order, limit=limit)
+                self.assertEqual([entry["serial_number"] for entry in result], expected[:limit])
+
+
+    def test_ties_keep_document_order(self):
+        tied = [element["serialNum"] for element in self.document["fixture"][10:20]]
+        result = self.api.sort_fixtures(*tied, sort_by="power", order="DESC", limit=4)
+        self.assertEqual([entry["serial_number"] for entry in result], tied[:4])
+
+
+    def test_lazy_and_record_views(self):
+        expected = self.api.sort_fixtures(sort_by="temperature", order="DESC", limit=10)
+        lazy = self.api.sort_fixtures(sort_by="temperature", order="DESC", limit=10, lazy=True)
+        self.assertNotIsInstance(lazy, list)
+        self.assertEqual(list(lazy), expected)
+        views = _api(self.document, as_dict=False).sort_fixtures(sort_by="temperature", order="DESC", limit=10)
+        self.assertEqual([view["serial_number"] for view in views], [entry["serial_number"] for entry in expected])
+        self.assertEqual([view["temperature"] for view in views], [entry["temperature"] for entry in expected])
+
+
+    def test_invalid_arguments_fall_back_to_defaults(self):
+        default = self.api.sort_fixtures(limit=5)
+        self.assertEqual(self.api.sort_fixtures(sort_by="unknown", order="SIDEWAYS", limit=5), default)
+        self.assertEqual(self.api.sort_fixtures("missing", limit=5), [])
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()
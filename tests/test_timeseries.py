@@ -0,0 +1,82 @@
+import unittest
+
+from smartengine.u_api import timeseries
+
+
+class RingBufferTest(unittest.TestCase):
+    """
+    Fills ring buffers past their capacity and compares the slices with the full history.
+    """
+    def test_last_across_the_wrap_around(self):
+        for capacity in (1, 2, 5):
+            for appended in range(12):
+                buffer = timeseries.RingBuffer(capacity)
+                for value in range(appended):
+                    buffer.append(value, timestamp=100 + value)
+                history = [(100.0 + value, float(value)) for value in range(appended)][-capacity:]
+                with self.subTest(capacity=capacity, appended=appended):
+                    self.assertEqual(list(buffer), history)
+                    self.assertEqual(buffer.last(), history)
+                    for n in range(capacity + 2):
+                        self.assertEqual(buffer.last(n), history[max(0, len(history) - n):] if n else [])
+                    self.assertEqual(buffer.last(-1), [])
+
+
+    def test_since_and_downsample(self):
+        buffer = timeseries.RingBuffer(4)
+        for value in range(6):
+            buffer.append(value, timestamp=10 * value)
+        self.assertEqual(buffer.since(35), [(40.0, 4.0), (50.0, 5.0)])
+        self.assertEqual(
+            [(bucket["start"], bucket["count"], bucket["mean"]) for bucket in buffer.downsample(20)],
+            [(20.0, 2, 2.5), (40.0, 2, 4.5)],
+        )
+        with self.assertRaises(ValueError):
+            buffer.downsample(0)
+
+
+    def test_capacity_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            timeseries.RingBuffer(0)
+
+
+
+
+class TimeSeriesStoreTest(unittest.TestCase):
+    """
+    Records samples into small stores and checks the memory budget and the eviction order.
+    """
+    def test_least_recently_updated_series_is_evicted(self):
+        store = timeseries.TimeSeriesStore(capacity=4, max_bytes=2 * timeseries.RingBuffer(4).nbytes)
+        store.add("location", 1, "power", 1.0)
+        store.add("location", 2, "power", 2.0)
+        store.add("location", 1, "power", 3.0)
+        store.add("location", 3, "power", 4.0)
+        self.assertEqual(store.keys(), [("location", 1, "power"), ("location", 3, "power")])
+        self.assertLessEqual(store.nbytes, store.max_bytes)
+        self.assertEqual([value for _, value in store.last("location", 1, "power")], [1.0, 3.0])
+
+
+    def test_budget_below_one_series_is_rejected(self):
+        with self.assertRaises(ValueError):
+            timeseries.TimeSeriesStore(capacity=1024, max_bytes=1024)
+        store = timeseries.TimeSeriesStore(capacity=4, max_bytes=timeseries.RingBuffer(4).nbytes)
+        for id_ in range(3):
+            store.add("location", id_, "power", id_)
+        self.assertEqual(store.keys(), [("location", 2, "power")])
+        self.assertLessEqual(store.nbytes, store.max_bytes)
+
+
+    def test_record_ignores_non_numeric_values(self):
+        store = timeseries.TimeSeriesStore(capacity=4)
+        message = {"responseData": {"location": [{"id": 101, "sensorStats": {"power": {"instant": "12.5"},
+                                                                            "scene": {"instant": "Evening"}}}]}}
+        self.assertEqual(store.record(message, timestamp=1.0), 1)
+        self.assertEqual(store.last("location", 101, "power"), [(1.0, 12.5)])
+        self.assertIsNone(store.series("location", 101, "scene"))
+
+
+
+
+if __name__ == "__main__":
+    unittest.main()